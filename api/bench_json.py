@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from src.fastjson import FastJSONResponse, orjson
+
+WORDS = ("Standardize", "Brokoli", "Tozu", "Kapsül", "Gıda", "Takviyesi", "içerik", "kullanım", "önerisi",
+         "günde", "bir", "adet", "tüketiniz", "Helal", "Sertifikalı", "Jelatin", "Çinko", "Magnezyum", "şişe")
+
+
+def description_html(rng: random.Random) -> str:
+    # Scraped descriptions are 4-29 KB of nested tab markup, ~9 KB on average.
+    size = min(29000, max(3900, int(rng.lognormvariate(9.0, 0.35))))
+    parts = ['<div class="product-detail-tab">\n<div class="product-detail-tab-header">']
+    length = len(parts[0])
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+        part = f'\n<div class="tab-content"><p><strong>{rng.choice(WORDS)}:</strong> {sentence}.</p></div>'
+        parts.append(part)
+        length += len(part)
+    return "".join(parts) + "\n</div></div>"
+
+
+def synthetic_catalogue(count: int, seed: int = 1):
+    """Products shaped like SQLiteConnector.iter_products() output."""
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        sku = f"{product_id:06d}-A"
+        products.append({
+            "id": product_id, "sku": sku, "barcode": sku,
+            "name": f"NOP {rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randint(30, 200)} Kapsül",
+            "url": f"https://www.sepenatural.com.tr/urun/{sku.lower()}",
+            "price": round(rng.uniform(50, 1500), 2), "currency": "TL",
+            "description_html": description_html(rng),
+            "usage_text": " ".join(rng.choice(WORDS) for _ in range(30)),
+            "warnings_text": "", "storage_text": "",
+            "created_at": "2026-02-12 13:17:12", "updated_at": "2026-02-12 13:17:12",
+            "categories": ["Gıda Takviyeleri", "Kapsül Gıda Takviyeleri", "NOP"],
+            "attributes": {"Marka": "Sepe Natural", "Stok Kodu": sku, "Fiyat": f"{rng.randint(50, 1500)},00 TL  + KDV"},
+            "ingredients": [
+                {"id": product_id * 10 + i, "product_id": product_id, "raw_text": f"{rng.choice(WORDS)} 340 mg",
+                 "ingredient_name": rng.choice(WORDS), "amount": "340", "unit": "mg", "percentage": None}
+                for i in range(rng.randint(1, 6))
+            ],
+        })
+    return products
+
+
+def best_of(rounds: int, run) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def build_apps(products):
+    """An ingestion-like app serving the catalogue both ways, and a gateway-like app proxying it both ways."""
+    ingestion = FastAPI(default_response_class=JSONResponse)
+
+    @ingestion.get("/default")
+    def default():
+        return products
+
+    @ingestion.get("/fast")
+    def fast():
+        return FastJSONResponse(products)
+
+    gateway = FastAPI(default_response_class=JSONResponse)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=ingestion), base_url="http://ingestion")
+
+    @gateway.get("/reencode")
+    async def reencode():
+        return (await client.get("/default")).json()
+
+    @gateway.get("/relay")
+    async def relay():
+        resp = await client.get("/fast")
+        return Response(content=resp.content, media_type="application/json")
+
+    return gateway
+
+
+async def time_requests(app, paths, rounds):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+        timings = {}
+        for path in paths:
+            best = float("inf")
+            for _ in range(rounds):
+                started = time.perf_counter()
+                resp = await client.get(path)
+                resp.raise_for_status()
+                best = min(best, time.perf_counter() - started)
+            timings[path] = best
+        return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON serialisation benchmark on a synthetic product catalogue")
+    parser.add_argument("--products", type=int, default=10000, help="Catalogue size")
+    parser.add_argument("--rounds", type=int, default=3, help="Timing rounds per path (best is reported)")
+    args = parser.parse_args()
+
+    products = synthetic_catalogue(args.products)
+    body = FastJSONResponse(products).body
+    if body != JSONResponse(products).body:
+        print("MISMATCH: FastJSONResponse output differs from JSONResponse")
+        return 1
+    print(f"{len(products)} products, {len(body) / 1e6:.1f} MB of JSON, orjson {'on' if orjson else 'not installed'}")
+
+    serialisation = {
+        "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(products)),
+        "FastJSONResponse": lambda: FastJSONResponse(products),
+        "gateway decode + re-encode": lambda: JSONResponse(jsonable_encoder(json.loads(body))),
+    }
+    for name, run in serialisation.items():
+        print(f"{name:>32}: {best_of(args.rounds, run) * 1000:8.1f} ms")
+
+    timings = asyncio.run(time_requests(build_apps(products), ["/reencode", "/relay"], args.rounds))
+    print(f"{'end to end, default path':>32}: {timings['/reencode'] * 1000:8.1f} ms")
+    print(f"{'end to end, orjson + relay':>32}: {timings['/relay'] * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
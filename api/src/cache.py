@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional; without it responses are cached in process memory.
+    aioredis = None
+
+logger = logging.getLogger("API_Gateway")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A downstream response as the gateway relays it: status, body bytes and the headers worth keeping."""
+    status_code: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({"status_code": self.status_code, "headers": self.headers}).encode()
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        meta, body = data.split(b"\n", 1)
+        return cls(body=body, **json.loads(meta))
+
+
+class MemoryCache:
+    """
+    Bounded LRU of CachedResponses with a per-entry expiry, local to this process.
+    Also serves as the in-process stand-in for RedisCache, which has the same interface.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedResponse, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    async def close(self):
+        self._entries.clear()
+
+
+class RedisCache:
+    """
+    Responses cached in Redis, shared by all gateway workers. Expiry is Redis' own (SET EX);
+    eviction of excess entries is left to the server's maxmemory policy.
+    """
+    def __init__(self, url: str, namespace: str = "gateway:cache:"):
+        if aioredis is None:
+            raise RuntimeError("Redis caching needs the `redis` package")
+        self.namespace = namespace
+        self.redis = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        data = await self.redis.get(self.namespace + key)
+        return CachedResponse.from_bytes(data) if data is not None else None
+
+    async def set(self, key: str, value: CachedResponse, ttl: float):
+        await self.redis.set(self.namespace + key, value.to_bytes(), px=max(1, int(ttl * 1000)))
+
+    async def invalidate(self, prefix: str) -> int:
+        pattern = self.namespace + prefix.replace("*", r"\*").replace("?", r"\?").replace("[", r"\[") + "*"
+        removed = 0
+        async for key in self.redis.scan_iter(match=pattern, count=500):
+            removed += await self.redis.delete(key)
+        return removed
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller starts the call,
+    later callers wait for its result (or exception). The call runs as its own task, so a
+    caller that goes away does not cancel it for the others.
+    """
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, call: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+
+class ResponseCache:
+    """
+    Read-through response cache with request coalescing in front of a MemoryCache or RedisCache.
+    Only successful (200) responses are stored; a TTL of 0 disables storing but still coalesces.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.flight = SingleFlight()
+
+    async def fetch(self, key: str, ttl: float, load: Callable[[], Awaitable[CachedResponse]]) -> CachedResponse:
+        if ttl > 0:
+            try:
+                cached = await self.backend.get(key)
+            except Exception as e:  # a cache outage must not take the gateway down
+                logger.warning(f"Response cache read failed: {e}")
+                cached = None
+            if cached is not None:
+                return cached
+
+        async def load_and_store() -> CachedResponse:
+            response = await load()
+            if ttl > 0 and response.status_code == 200:
+                try:
+                    await self.backend.set(key, response, ttl)
+                except Exception as e:
+                    logger.warning(f"Response cache write failed: {e}")
+            return response
+
+        return await self.flight.do(key, load_and_store)
+
+    async def invalidate(self, prefix: str) -> int:
+        return await self.backend.invalidate(prefix)
+
+    async def close(self):
+        await self.backend.close()
@@ -1,15 +1,112 @@
-from fastapi import FastAPI, HTTPException, Header, Request, Depends
+from fastapi import FastAPI, HTTPException, Header, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import QueryParams
+from pydantic import BaseModel, Field
+from .cache import CachedResponse, MemoryCache, RedisCache, ResponseCache
+from .deadline import DeadlineMiddleware, remaining_time
+from .fastjson import FastJSONResponse, dumps, loads
+from .observability import REQUEST_ID_HEADER, ObservabilityMiddleware, metrics_response, record_timing
+from .pipeline import Stage, run_stages
+from .resilience import CircuitBreaker, DownstreamTransport
 import os
 import httpx
 import asyncio
+import json
 import logging
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote, urlencode
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("API_Gateway")
 
-app = FastAPI(title="Antigravity API Gateway")
+INGESTION_URL = os.getenv("INGESTION_SERVICE_URL", "http://ingestion:8001")
+SEMANTIC_URL = os.getenv("SEMANTIC_SERVICE_URL", "http://semantic-layer:8002")
+BRAIN_URL = os.getenv("BRAIN_SERVICE_URL", "http://brain:8003")
+
+# Downstream services: base URL and read timeout in seconds.
+DOWNSTREAM_SERVICES = {
+    "ingestion": (INGESTION_URL, float(os.getenv("INGESTION_TIMEOUT", "30"))),
+    "semantic": (SEMANTIC_URL, float(os.getenv("SEMANTIC_TIMEOUT", "30"))),
+    "brain": (BRAIN_URL, float(os.getenv("BRAIN_TIMEOUT", "30"))),
+}
+CONNECT_TIMEOUT = 5.0
+# Connection pool of each downstream client.
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+GATEWAY_MAX_KEEPALIVE = int(os.getenv("GATEWAY_MAX_KEEPALIVE", "20"))
+GATEWAY_KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "60"))
+# Only useful when the downstream (or a proxy in front of it) speaks HTTP/2; uvicorn does not.
+GATEWAY_HTTP2 = os.getenv("GATEWAY_HTTP2", "false").lower() == "true"
+
+# Pooled keep-alive clients, one per downstream service, shared by all requests.
+clients: Dict[str, httpx.AsyncClient] = {}
+
+# Time budget of a gateway request in seconds (clients may ask for less with X-Deadline-Ms).
+# The remaining budget is passed on to every downstream call.
+GATEWAY_REQUEST_TIMEOUT = float(os.getenv("GATEWAY_REQUEST_TIMEOUT", "30"))
+# Consecutive failures after which calls to a service fail fast, and for how many seconds.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+# Milliseconds after which a slow GET is sent a second time (first answer wins); unset disables hedging.
+GATEWAY_HEDGE_AFTER_MS = os.getenv("GATEWAY_HEDGE_AFTER_MS")
+# Upper bound for the optional RAG answer, so a slow LLM cannot hold up the rest of the analysis.
+RAG_TIMEOUT = float(os.getenv("RAG_TIMEOUT", "20"))
+
+breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT) for name in DOWNSTREAM_SERVICES
+}
+
+# Seconds a successful response is reused, per route. 0 disables caching but still
+# collapses concurrent identical requests into one downstream call.
+CACHE_TTLS = {
+    "products": float(os.getenv("CACHE_TTL_PRODUCTS", "30")),
+    "production-orders": float(os.getenv("CACHE_TTL_PRODUCTION_ORDERS", "15")),
+    "analysis": float(os.getenv("CACHE_TTL_ANALYSIS", "60")),
+}
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+# e.g. redis://redis:6379/1 to share cached responses between gateway workers; in-memory otherwise.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+# Downstream headers kept with cached responses and relayed to clients.
+RELAYED_HEADERS = ("X-Next-After-Id", "ETag")
+
+response_cache = ResponseCache(RedisCache(CACHE_REDIS_URL) if CACHE_REDIS_URL else MemoryCache(CACHE_MAX_ENTRIES))
+
+
+def create_client(service: str, base_url: str, timeout: float) -> httpx.AsyncClient:
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=GATEWAY_MAX_CONNECTIONS,
+            max_keepalive_connections=GATEWAY_MAX_KEEPALIVE,
+            keepalive_expiry=GATEWAY_KEEPALIVE_EXPIRY,
+        ),
+        http2=GATEWAY_HTTP2,
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+        transport=DownstreamTransport(
+            service,
+            transport,
+            breakers[service],
+            hedge_after=float(GATEWAY_HEDGE_AFTER_MS) / 1000 if GATEWAY_HEDGE_AFTER_MS else None,
+        ),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for name, (base_url, timeout) in DOWNSTREAM_SERVICES.items():
+        clients[name] = create_client(name, base_url, timeout)
+    try:
+        yield
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients.values()))
+        clients.clear()
+        await response_cache.close()
+
+
+app = FastAPI(title="Antigravity API Gateway", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,14 +114,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "ETag", "Server-Timing", REQUEST_ID_HEADER],
 )
-
-INGESTION_URL = os.getenv("INGESTION_SERVICE_URL", "http://ingestion:8001")
-SEMANTIC_URL = os.getenv("SEMANTIC_SERVICE_URL", "http://semantic-layer:8002")
-BRAIN_URL = os.getenv("BRAIN_SERVICE_URL", "http://brain:8003")
-
-TIMEOUT = httpx.Timeout(30.0, connect=5.0)
-
+app.add_middleware(DeadlineMiddleware, default_timeout=GATEWAY_REQUEST_TIMEOUT)
+app.add_middleware(ObservabilityMiddleware)
 
 async def get_tenant_id(x_tenant_id: Optional[str] = Header(None)) -> str:
     if not x_tenant_id:
@@ -43,120 +136,301 @@ async def add_tenant_context(request: Request, call_next):
     return response
 
 
+def cache_key(tenant_id: str, route: str, path: str, params: Optional[QueryParams] = None) -> str:
+    query = urlencode(sorted(params.multi_items())) if params else ""
+    return f"{tenant_id}:{route}:{path}?{query}"
+
+
+async def cached_get(route: str, tenant_id: str, path: str, params: Optional[QueryParams] = None) -> CachedResponse:
+    """
+    GET from the ingestion service through the response cache (per tenant, TTL of `route`).
+    Concurrent identical requests share one downstream call.
+    """
+    async def load() -> CachedResponse:
+        resp = await clients["ingestion"].get(path, headers={"X-Tenant-ID": tenant_id}, params=params)
+        headers = {name: resp.headers[name] for name in RELAYED_HEADERS if name in resp.headers}
+        return CachedResponse(resp.status_code, resp.content, headers)
+
+    try:
+        return await response_cache.fetch(cache_key(tenant_id, route, path, params), CACHE_TTLS[route], load)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+
+
+def relay_cached(cached: CachedResponse) -> Response:
+    """Returns a cached downstream JSON response as is; error responses become HTTPExceptions."""
+    if cached.status_code >= 400:
+        try:
+            detail = json.loads(cached.body).get("detail")
+        except (ValueError, AttributeError):
+            detail = cached.body.decode("utf-8", "replace")
+        raise HTTPException(status_code=cached.status_code, detail=detail)
+    return Response(
+        content=cached.body, status_code=cached.status_code, media_type="application/json", headers=cached.headers
+    )
+
+
+def relay_response(resp: httpx.Response) -> Response:
+    """Forwards a downstream response body as is, without decoding and re-encoding the JSON."""
+    return Response(
+        content=resp.content, status_code=resp.status_code,
+        media_type=resp.headers.get("content-type", "application/json"),
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/")
 def read_root():
     return {
         "service": "api-gateway",
         "status": "ready",
-        "endpoints": ["/analyze/full/{order_id}", "/products/sepenatural"],
+        "endpoints": [
+            "/analyze/full/{order_id}",
+            "/analyze/full",
+            "/products/sepenatural",
+            "/products/sepenatural/search",
+            "/products/sepenatural/stream",
+        ],
     }
 
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "circuits": {name: breaker.snapshot() for name, breaker in breakers.items()}}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Request and downstream latency histograms, in Prometheus text format."""
+    return metrics_response()
 
 
 @app.get("/products/sepenatural")
-async def get_sepenatural_products(tenant_id: str = Depends(get_tenant_id)):
+async def get_sepenatural_products(request: Request, tenant_id: str = Depends(get_tenant_id)):
+    """
+    Pagination (after_id, limit), projection (fields) and filters (category, skus, updated_since)
+    are passed through to the ingestion service. Responses are cached; If-None-Match is
+    answered here against the ETag of the cached catalogue.
+    """
+    cached = await cached_get("products", tenant_id, "/ingest/sepenatural/products", request.query_params)
+    if cached.status_code == 200 and etag_matches(request.headers.get("If-None-Match"), cached.headers.get("ETag")):
+        return Response(status_code=304, headers={"ETag": cached.headers["ETag"]})
+    return relay_cached(cached)
+
+
+@app.get("/products/sepenatural/search")
+async def search_sepenatural_products(request: Request, tenant_id: str = Depends(get_tenant_id)):
+    """
+    Ranked product search (q, ingredient, limit), answered by the ingestion service's full-text index.
+    """
+    headers = {"X-Tenant-ID": tenant_id}
+    client = clients["ingestion"]
+    try:
+        resp = await client.get("/ingest/sepenatural/search", headers=headers, params=request.query_params)
+        resp.raise_for_status()
+        return relay_response(resp)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+
+
+@app.get("/products/sepenatural/stream")
+async def stream_sepenatural_products(request: Request, tenant_id: str = Depends(get_tenant_id)):
+    """
+    Relays the ingestion service's NDJSON product stream chunk by chunk, without buffering it.
+    """
     headers = {"X-Tenant-ID": tenant_id}
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+    client = clients["ingestion"]
+    try:
+        upstream = client.build_request(
+            "GET", "/ingest/sepenatural/products/stream", headers=headers, params=request.query_params
+        )
+        resp = await client.send(upstream, stream=True)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+
+    if resp.is_error:
+        await resp.aread()
+        await resp.aclose()
+        raise HTTPException(status_code=resp.status_code, detail=resp.text)
+
+    async def relay():
         try:
-            resp = await client.get(f"{INGESTION_URL}/ingest/sepenatural/products", headers=headers)
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=str(e))
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+            async for chunk in resp.aiter_bytes():
+                yield chunk
+        finally:
+            await resp.aclose()
+
+    return StreamingResponse(relay(), media_type=resp.headers.get("content-type", "application/x-ndjson"))
 
 
 @app.get("/ingestion/production-orders")
 async def get_production_orders(tenant_id: str = Depends(get_tenant_id)):
-    headers = {"X-Tenant-ID": tenant_id}
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        try:
-            resp = await client.get(f"{INGESTION_URL}/ingest/production-orders", headers=headers)
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+    return relay_cached(await cached_get("production-orders", tenant_id, "/ingest/production-orders"))
+
+
+@app.get("/ingestion/production-orders/{order_id}")
+async def get_production_order(order_id: str, tenant_id: str = Depends(get_tenant_id)):
+    return relay_cached(
+        await cached_get("production-orders", tenant_id, f"/ingest/production-orders/{quote(order_id, safe='')}")
+    )
+
+
+RAG_QUERY = "Are there any material shortages or risks?"
+
+
+async def rag_retrieve(headers: Dict[str, str]) -> Optional[Dict]:
+    """
+    RAG retrieval for RAG_QUERY, run ahead of the answer. None if it failed;
+    /brain/rag/analyze then retrieves by itself.
+    """
+    try:
+        r = await clients["brain"].post("/brain/rag/retrieve", json={"query": RAG_QUERY}, headers=headers)
+        if r.status_code == 200:
+            return r.json().get("retrieved")
+    except httpx.HTTPError as e:
+        logger.warning(f"RAG retrieval failed: {e}")
+    return None
+
+
+# Kept back from the request deadline for everything that follows the RAG answer.
+RAG_DEADLINE_RESERVE = 1.0
+
+
+def rag_timeout() -> float:
+    remaining = remaining_time()
+    if remaining is None:
+        return RAG_TIMEOUT
+    return max(0.0, min(RAG_TIMEOUT, remaining - RAG_DEADLINE_RESERVE))
+
+
+async def rag_insight(domain_order: Dict, headers: Dict[str, str], retrieved: Optional[Dict] = None) -> str:
+    """
+    RAG answer for one mapped order; failures become a message instead of failing the analysis.
+    Gives up after RAG_TIMEOUT, or earlier when the request deadline is close.
+    """
+    payload = {"query": RAG_QUERY, "context": domain_order}
+    if retrieved is not None:
+        payload["retrieved"] = retrieved
+    try:
+        r = await asyncio.wait_for(
+            clients["brain"].post("/brain/rag/analyze", json=payload, headers=headers), rag_timeout()
+        )
+        if r.status_code == 200:
+            return r.json().get("response")
+        return "RAG Service Unavailable"
+    except asyncio.TimeoutError:
+        return "RAG Service Unavailable (timed out)"
+    except Exception as e:
+        return f"RAG Error: {str(e)}"
 
 
 @app.get("/analyze/full/{order_id}")
 async def full_analysis(order_id: str, tenant_id: str = Depends(get_tenant_id)):
     """
-    Orchestrates the full SAP PP Analysis Pipeline.
-    Steps 3 (Brain Analysis) and 4 (RAG) run in parallel for performance.
+    Full analysis of one order. Results are cached per tenant for CACHE_TTL_ANALYSIS seconds,
+    and concurrent requests for the same order share one pipeline run.
+    """
+    async def load() -> CachedResponse:
+        result = await run_full_analysis(order_id, tenant_id)
+        return CachedResponse(200, dumps(result))
+
+    cached = await response_cache.fetch(cache_key(tenant_id, "analysis", order_id), CACHE_TTLS["analysis"], load)
+    return relay_cached(cached)
+
+
+async def run_full_analysis(order_id: str, tenant_id: str) -> Dict:
+    """
+    Orchestrates the full SAP PP Analysis Pipeline as a graph of stages, each started as soon as
+    its inputs are ready: RAG retrieval only needs the query, so it runs alongside ingestion;
+    brain analysis and the RAG answer both start once the order is mapped.
+    `pipeline_trace` has the start offset and duration of every stage.
     """
     headers = {"X-Tenant-ID": tenant_id}
     logger.info(f"Processing Order {order_id} for Tenant: {tenant_id}")
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        # Step 1: Ingest
+    async def ingest() -> Dict:
         try:
-            ingest_resp = await client.get(f"{INGESTION_URL}/ingest/production-orders", headers=headers)
-            ingest_resp.raise_for_status()
+            resp = await clients["ingestion"].get(
+                f"/ingest/production-orders/{quote(order_id, safe='')}", headers=headers
+            )
         except httpx.RequestError as e:
             raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+        if resp.status_code == 404:
+            raise HTTPException(status_code=404, detail="Order not found in SAP")
+        if resp.is_error:
+            raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {resp.text}")
+        return resp.json()
 
-        all_orders = ingest_resp.json()
-        raw_order = next((o for o in all_orders if o["Aufnr"] == order_id), None)
-        if not raw_order:
-            raise HTTPException(status_code=404, detail="Order not found in SAP (Mock)")
-
-        # Step 2: Semantic Map
+    async def map_order(ingestion: Dict) -> Dict:
         try:
-            map_resp = await client.post(f"{SEMANTIC_URL}/semantic/map/order", json=raw_order, headers=headers)
-            map_resp.raise_for_status()
-            domain_order = map_resp.json()
-        except httpx.RequestError as e:
+            resp = await clients["semantic"].post("/semantic/map/order", json=ingestion, headers=headers)
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPError as e:
             raise HTTPException(status_code=502, detail=f"Semantic Layer Error: {str(e)}")
 
-        # Steps 3 & 4: Brain Analysis + RAG — parallel
-        rag_payload = {"query": "Are there any material shortages or risks?", "context": domain_order}
+    async def analyze(semantic_mapping: Dict) -> Dict:
+        try:
+            resp = await clients["brain"].post("/brain/analyze/order", json=semantic_mapping, headers=headers)
+            resp.raise_for_status()
+            return resp.json()
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Brain Service Error: {str(e)}")
+
+    async def answer(semantic_mapping: Dict, rag_retrieval: Optional[Dict]) -> str:
+        return await rag_insight(semantic_mapping, headers, rag_retrieval)
 
-        async def call_brain():
-            try:
-                r = await client.post(f"{BRAIN_URL}/brain/analyze/order", json=domain_order, headers=headers)
-                r.raise_for_status()
-                return r.json()
-            except Exception as e:
-                raise HTTPException(status_code=502, detail=f"Brain Service Error: {str(e)}")
+    results, trace = await run_stages([
+        Stage("ingestion", ingest),
+        Stage("rag_retrieval", lambda: rag_retrieve(headers)),
+        Stage("semantic_mapping", map_order, ("ingestion",)),
+        Stage("brain_analysis", analyze, ("semantic_mapping",)),
+        Stage("rag_analysis", answer, ("semantic_mapping", "rag_retrieval")),
+    ])
+    for entry in trace:
+        record_timing(f"stage-{entry['stage']}", entry["duration_ms"] / 1000)
+
+    return {
+        "tenant_id": tenant_id,
+        "order_id": order_id,
+        "status": "Success",
+        "pipeline_trace": trace,
+        "raw_data_summary": f"SystemStatus: {results['ingestion'].get('SystemStatus')}",
+        "semantic_data": results["semantic_mapping"],
+        "core_analysis": results["brain_analysis"].get("analysis"),
+        "rag_insight": results["rag_analysis"],
+    }
 
-        async def call_rag():
-            try:
-                r = await client.post(f"{BRAIN_URL}/brain/rag/analyze", json=rag_payload, headers=headers)
-                if r.status_code == 200:
-                    return r.json().get("response")
-                return "RAG Service Unavailable"
-            except Exception as e:
-                return f"RAG Error: {str(e)}"
-
-        analysis_result, rag_result = await asyncio.gather(call_brain(), call_rag())
-
-        return {
-            "tenant_id": tenant_id,
-            "order_id": order_id,
-            "status": "Success",
-            "pipeline_trace": ["Ingestion", "Semantic Mapping", "Brain Analysis + RAG (parallel)"],
-            "raw_data_summary": f"SystemStatus: {raw_order.get('SystemStatus')}",
-            "semantic_data": domain_order,
-            "core_analysis": analysis_result.get("analysis"),
-            "rag_insight": rag_result,
-        }
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(route: Optional[str] = None, tenant_id: str = Depends(get_tenant_id)):
+    """
+    Drops the tenant's cached responses for one route (products, production-orders, analysis) or all of them.
+    """
+    if route is not None and route not in CACHE_TTLS:
+        raise HTTPException(status_code=400, detail=f"Unknown route; use one of {', '.join(CACHE_TTLS)}")
+    removed = await response_cache.invalidate(f"{tenant_id}:{route}:" if route else f"{tenant_id}:")
+    return {"tenant_id": tenant_id, "route": route, "removed": removed}
 
 
 @app.post("/brain/analyze/order")
 async def proxy_analyze_order(order_data: dict, tenant_id: str = Depends(get_tenant_id)):
     headers = {"X-Tenant-ID": tenant_id}
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        try:
-            resp = await client.post(f"{BRAIN_URL}/brain/analyze/order", json=order_data, headers=headers)
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"Brain Service Error: {str(e)}")
+    client = clients["brain"]
+    try:
+        resp = await client.post("/brain/analyze/order", json=order_data, headers=headers)
+        resp.raise_for_status()
+        return relay_response(resp)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Brain Service Error: {str(e)}")
 
 
 @app.post("/brain/rag/analyze")
@@ -166,10 +440,142 @@ async def proxy_rag_analyze(
     x_google_api_key: Optional[str] = Header(None),
 ):
     headers = {"X-Tenant-ID": tenant_id, "x-google-api-key": x_google_api_key or ""}
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+    client = clients["brain"]
+    try:
+        resp = await client.post("/brain/rag/analyze", json=payload, headers=headers)
+        resp.raise_for_status()
+        return relay_response(resp)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Brain Service Error: {str(e)}")
+
+
+# Orders per semantic/brain call in batch analysis, and how many such calls run at once.
+ANALYZE_BATCH_SIZE = int(os.getenv("ANALYZE_BATCH_SIZE", "50"))
+ANALYZE_CONCURRENCY = int(os.getenv("ANALYZE_CONCURRENCY", "4"))
+ANALYZE_MAX_ORDERS = int(os.getenv("ANALYZE_MAX_ORDERS", "1000"))
+# RAG is one LLM call per order, so it is opt-in for batches and limited separately.
+ANALYZE_RAG_CONCURRENCY = int(os.getenv("ANALYZE_RAG_CONCURRENCY", "4"))
+
+
+class BatchAnalysisRequest(BaseModel):
+    order_ids: Optional[List[str]] = Field(None, description="Order numbers (AUFNR) to analyse")
+    filter: Optional[str] = Field(None, description="OData $filter selecting the orders instead")
+    include_rag: bool = Field(False, description="Also ask the RAG engine about each order")
+
+
+async def fetch_orders(batch: BatchAnalysisRequest, headers: Dict[str, str]) -> List[Dict]:
+    """All requested raw orders in one ingestion call."""
+    ingestion = clients["ingestion"]
+    try:
+        if batch.order_ids:
+            resp = await ingestion.post("/ingest/production-orders/lookup", json=batch.order_ids, headers=headers)
+        else:
+            resp = await ingestion.get("/ingest/production-orders", params={"$filter": batch.filter}, headers=headers)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {str(e)}")
+    if resp.status_code == 404:
+        return []
+    if resp.is_error:
+        raise HTTPException(status_code=502, detail=f"Ingestion Service Error: {resp.text}")
+    return loads(resp.content)
+
+
+async def post_json(client: httpx.AsyncClient, path: str, payload: Any, headers: Dict[str, str]) -> Any:
+    resp = await client.post(
+        path, content=dumps(payload), headers={**headers, "Content-Type": "application/json"}
+    )
+    resp.raise_for_status()
+    return loads(resp.content)
+
+
+@app.post("/analyze/full")
+async def full_analysis_batch(batch: BatchAnalysisRequest, tenant_id: str = Depends(get_tenant_id)):
+    """
+    Full analysis of many orders, selected by `order_ids` or an OData `filter`.
+    Orders are fetched in one ingestion call, then mapped and analysed ANALYZE_BATCH_SIZE at a time
+    (one semantic and one brain call per batch). Streams one NDJSON result per order as its batch finishes.
+    """
+    if not batch.order_ids and not batch.filter:
+        raise HTTPException(status_code=400, detail="Provide order_ids or filter")
+    if batch.order_ids and len(batch.order_ids) > ANALYZE_MAX_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {ANALYZE_MAX_ORDERS} orders per request")
+    headers = {"X-Tenant-ID": tenant_id}
+
+    raw_orders = await fetch_orders(batch, headers)
+    if len(raw_orders) > ANALYZE_MAX_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Filter matches more than {ANALYZE_MAX_ORDERS} orders")
+    found = {order.get("Aufnr") for order in raw_orders}
+    missing = [order_id for order_id in dict.fromkeys(batch.order_ids or []) if order_id not in found]
+    logger.info(f"Batch analysis of {len(raw_orders)} orders for Tenant: {tenant_id}")
+
+    batch_slots = asyncio.Semaphore(ANALYZE_CONCURRENCY)
+    rag_slots = asyncio.Semaphore(ANALYZE_RAG_CONCURRENCY)
+
+    # RAG_QUERY is the same for every order, so retrieval runs once for the whole request.
+    retrieval = asyncio.create_task(rag_retrieve(headers)) if batch.include_rag else None
+
+    async def limited_rag(domain_order: Dict) -> str:
+        retrieved = await asyncio.shield(retrieval)
+        async with rag_slots:
+            return await rag_insight(domain_order, headers, retrieved)
+
+    async def analyze(chunk: List[Dict]) -> List[Dict]:
+        async with batch_slots:
+            try:
+                mappings = await post_json(clients["semantic"], "/semantic/map/orders", chunk, headers)
+                # Orders that could not be mapped are reported on their own; the rest go on to the brain.
+                domain_orders = [mapping["order"] for mapping in mappings if mapping.get("error") is None]
+                analyses = (
+                    await post_json(clients["brain"], "/brain/analyze/orders", domain_orders, headers)
+                    if domain_orders else []
+                )
+            except httpx.HTTPError as e:
+                return [{"order_id": o.get("Aufnr"), "status": "Error", "detail": str(e)} for o in chunk]
+        if batch.include_rag:
+            rag_results = await asyncio.gather(*(limited_rag(order) for order in domain_orders))
+        else:
+            rag_results = [None] * len(domain_orders)
+
+        results = []
+        analysed = iter(zip(domain_orders, analyses, rag_results))
+        for raw_order, mapping in zip(chunk, mappings):
+            if mapping.get("error") is not None:
+                results.append({
+                    "tenant_id": tenant_id,
+                    "order_id": raw_order.get("Aufnr"),
+                    "status": "Error",
+                    "detail": mapping["error"],
+                })
+                continue
+            domain_order, analysis, rag_result = next(analysed)
+            result = {
+                "tenant_id": tenant_id,
+                "order_id": raw_order.get("Aufnr"),
+                "status": "Error" if "error" in analysis else "Success",
+                "raw_data_summary": f"SystemStatus: {raw_order.get('SystemStatus')}",
+                "semantic_data": domain_order,
+                "core_analysis": analysis.get("analysis"),
+                "rag_insight": rag_result,
+            }
+            if "error" in analysis:
+                result["detail"] = analysis["error"]
+            results.append(result)
+        return results
+
+    async def stream():
+        for order_id in missing:
+            yield dumps({"order_id": order_id, "status": "Not Found"}) + b"\n"
+        tasks = [
+            asyncio.create_task(analyze(raw_orders[i:i + ANALYZE_BATCH_SIZE]))
+            for i in range(0, len(raw_orders), ANALYZE_BATCH_SIZE)
+        ]
         try:
-            resp = await client.post(f"{BRAIN_URL}/brain/rag/analyze", json=payload, headers=headers)
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"Brain Service Error: {str(e)}")
+            for finished in asyncio.as_completed(tasks):
+                for result in await finished:
+                    yield dumps(result) + b"\n"
+        finally:
+            # Client went away: stop the remaining batches.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from .deadline import DEADLINE_EXCEEDED_HEADER, DEADLINE_HEADER, remaining_time
+from .observability import REQUEST_ID_HEADER, current_request_id, observe_downstream
+
+logger = logging.getLogger(__name__)
+
+# A downstream service answering 502/504 is up; what failed is one hop further away (ingestion
+# answers 502 while SAP is down). Tripping its circuit would also cut off its routes that do
+# not need that dependency, so these neither count as failures nor reset the failure count.
+UPSTREAM_FAILURE_STATUSES = frozenset({502, 504})
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling a downstream service whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-downstream circuit breaker. After `failure_threshold` consecutive failures (transport
+    errors, timeouts, 5xx other than UPSTREAM_FAILURE_STATUSES) the circuit opens and calls
+    fail immediately for `reset_timeout` seconds. Then a single trial call is let through:
+    success closes the circuit, failure opens it again.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+            logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def record_ignored(self):
+        """
+        The call says nothing about the service's health (cancelled, out of the caller's deadline,
+        or failed further upstream): the failure count is kept, and the next call may be the trial.
+        """
+        self._trial_running = False
+
+    def snapshot(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+def _close_abandoned(task: asyncio.Task):
+    # Done-callback for the losing attempt of a hedged request.
+    if task.cancelled() or task.exception() is not None:
+        return
+    asyncio.ensure_future(task.result().aclose())
+
+
+class DownstreamTransport(httpx.AsyncBaseTransport):
+    """
+    Transport for one downstream service:
+    - fails fast with CircuitOpenError while the service's circuit is open;
+    - forwards the current X-Request-ID and the remaining request budget as X-Deadline-Ms;
+    - if `hedge_after` is set, sends a second copy of a GET that has not answered within that many
+      seconds and uses whichever response arrives first (GETs are idempotent);
+    - times every call (until its response headers arrive) into the downstream latency histogram
+      and Server-Timing.
+    """
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport, breaker: CircuitBreaker,
+                 hedge_after: Optional[float] = None):
+        self.service = service
+        self.transport = transport
+        self.breaker = breaker
+        self.hedge_after = hedge_after
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request_id = current_request_id()
+        if request_id and REQUEST_ID_HEADER not in request.headers:
+            request.headers[REQUEST_ID_HEADER] = request_id
+        remaining = remaining_time()
+        if remaining is not None:
+            request.headers[DEADLINE_HEADER] = str(max(0, int(remaining * 1000)))
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.service} circuit is open", request=request)
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            if self.hedge_after is not None and request.method == "GET":
+                response = await self._hedged(request)
+            else:
+                response = await self.transport.handle_async_request(request)
+            status = response.status_code
+        except asyncio.CancelledError:
+            self.breaker.record_ignored()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            observe_downstream(self.service, request.method, status, time.perf_counter() - started)
+
+        if response.headers.get(DEADLINE_EXCEEDED_HEADER) or response.status_code in UPSTREAM_FAILURE_STATUSES:
+            self.breaker.record_ignored()
+        elif response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def _hedged(self, request: httpx.Request) -> httpx.Response:
+        pending = {asyncio.create_task(self.transport.handle_async_request(request))}
+        errors = []
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                pending.add(asyncio.create_task(self.transport.handle_async_request(request)))
+            while True:
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    for extra in succeeded[1:]:
+                        await extra.result().aclose()
+                    return succeeded[0].result()
+                errors.extend(task.exception() for task in done)
+                if not pending:
+                    raise errors[0]
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_close_abandoned)
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import main
+
+
+@pytest.fixture
+def ingestion(monkeypatch):
+    """Sets how the fake ingestion service answers the gateway's order queries."""
+    answer = {"response": httpx.Response(200, json=[])}
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: answer["response"]),
+                               base_url="http://ingestion")
+    monkeypatch.setitem(main.clients, "ingestion", client)
+    return answer
+
+
+def analyze(payload):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://gateway") as client:
+            return await client.post("/analyze/full", json=payload)
+    return asyncio.run(run())
+
+
+def test_filter_query_reports_sap_outage_instead_of_an_empty_stream(ingestion):
+    ingestion["response"] = httpx.Response(502, json={"detail": "SAP OData Error: connection refused"})
+
+    response = analyze({"filter": "SystemStatus eq 'REL'"})
+
+    assert response.status_code == 502
+    assert "SAP OData Error" in response.json()["detail"]
+
+
+def test_filter_matching_no_orders_is_an_empty_stream(ingestion):
+    ingestion["response"] = httpx.Response(404, json={"detail": "No orders found"})
+
+    response = analyze({"filter": "SystemStatus eq 'XXXX'"})
+
+    assert response.status_code == 200 and response.content == b""
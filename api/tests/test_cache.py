@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import cache, main
+from src.cache import CachedResponse, MemoryCache, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+class Loader:
+    """A downstream call that answers `status` after `delay` seconds and counts its calls."""
+    def __init__(self, status=200, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return CachedResponse(self.status, f"body {self.calls}".encode())
+
+
+def test_concurrent_identical_calls_share_one_downstream_call():
+    response_cache = ResponseCache(MemoryCache())
+    load = Loader(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(response_cache.fetch("t:products:/p?", 30, load) for _ in range(10)))
+
+    responses = asyncio.run(run())
+
+    assert load.calls == 1
+    assert {response.body for response in responses} == {b"body 1"}
+
+
+def test_zero_ttl_coalesces_without_storing():
+    response_cache = ResponseCache(MemoryCache())
+    load = Loader(delay=0.05)
+
+    async def run():
+        await asyncio.gather(*(response_cache.fetch("key", 0, load) for _ in range(5)))
+        await response_cache.fetch("key", 0, load)
+
+    asyncio.run(run())
+
+    assert load.calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    response_cache = ResponseCache(MemoryCache())
+    load = Loader(delay=0.05)
+
+    async def run():
+        first = asyncio.create_task(response_cache.fetch("key", 30, load))
+        second = asyncio.create_task(response_cache.fetch("key", 30, load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()).body == b"body 1"
+    assert load.calls == 1
+
+
+def test_entries_expire_after_their_ttl(clock):
+    response_cache = ResponseCache(MemoryCache())
+    load = Loader()
+
+    async def fetch():
+        return (await response_cache.fetch("key", 30, load)).body
+
+    assert asyncio.run(fetch()) == b"body 1"
+    clock.now += 29
+    assert asyncio.run(fetch()) == b"body 1"
+    clock.now += 1
+    assert asyncio.run(fetch()) == b"body 2"
+
+
+def test_memory_cache_evicts_the_least_recently_used_entry():
+    backend = MemoryCache(max_entries=2)
+
+    async def run():
+        for key in ("a", "b"):
+            await backend.set(key, CachedResponse(200, key.encode()), 30)
+        await backend.get("a")
+        await backend.set("c", CachedResponse(200, b"c"), 30)
+        return [await backend.get(key) is not None for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [True, False, True]
+
+
+@pytest.mark.parametrize("status", [404, 500, 502])
+def test_error_responses_are_not_stored(status):
+    response_cache = ResponseCache(MemoryCache())
+    load = Loader(status=status)
+
+    async def run():
+        for _ in range(3):
+            assert (await response_cache.fetch("key", 30, load)).status_code == status
+
+    asyncio.run(run())
+
+    assert load.calls == 3
+
+
+class FakeIngestion:
+    """Stands in for the ingestion service behind the gateway's pooled client."""
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        tenant_id = request.headers["X-Tenant-ID"]
+        self.requests.append((tenant_id, request.url.path))
+        return httpx.Response(200, json=[{"tenant": tenant_id, "call": len(self.requests)}])
+
+
+@pytest.fixture
+def ingestion(monkeypatch):
+    fake = FakeIngestion()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake), base_url="http://ingestion")
+    monkeypatch.setitem(main.clients, "ingestion", client)
+    monkeypatch.setattr(main, "response_cache", ResponseCache(MemoryCache()))
+    return fake
+
+
+def gateway(*requests):
+    """Sends (method, path, tenant) requests to the gateway app in order and returns the responses."""
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://gateway") as client:
+            return [await client.request(method, path, headers={"X-Tenant-ID": tenant}) for method, path, tenant in requests]
+    return asyncio.run(run())
+
+
+def test_cached_responses_are_per_tenant(ingestion):
+    responses = gateway(
+        ("GET", "/ingestion/production-orders", "acme"),
+        ("GET", "/ingestion/production-orders", "globex"),
+        ("GET", "/ingestion/production-orders", "acme"),
+    )
+
+    assert [r.json()[0]["tenant"] for r in responses] == ["acme", "globex", "acme"]
+    assert ingestion.requests == [("acme", "/ingest/production-orders"), ("globex", "/ingest/production-orders")]
+
+
+def test_invalidate_drops_one_route_of_one_tenant(ingestion):
+    orders, products = "/ingestion/production-orders", "/products/sepenatural"
+    gateway(("GET", orders, "acme"), ("GET", products, "acme"), ("GET", orders, "globex"))
+
+    invalidated = gateway(("POST", "/cache/invalidate?route=production-orders", "acme"))[0]
+    gateway(("GET", orders, "acme"), ("GET", products, "acme"), ("GET", orders, "globex"))
+
+    assert invalidated.json() == {"tenant_id": "acme", "route": "production-orders", "removed": 1}
+    assert ingestion.requests[3:] == [("acme", "/ingest/production-orders")]
+
+
+def test_invalidate_rejects_unknown_routes(ingestion):
+    assert gateway(("POST", "/cache/invalidate?route=nope", "acme"))[0].status_code == 400
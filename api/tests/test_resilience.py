@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.deadline import DEADLINE_EXCEEDED_HEADER, DEADLINE_HEADER, DeadlineMiddleware
+from src.resilience import CircuitBreaker, CircuitOpenError, DownstreamTransport
+
+
+def client_for(handler, breaker):
+    transport = DownstreamTransport("ingestion", httpx.MockTransport(handler), breaker)
+    return httpx.AsyncClient(transport=transport, base_url="http://ingestion")
+
+
+def call(handler, breaker, times):
+    async def run():
+        async with client_for(handler, breaker) as client:
+            return [(await client.get("/products")).status_code for _ in range(times)]
+    return asyncio.run(run())
+
+
+def test_server_errors_open_the_circuit():
+    breaker = CircuitBreaker("ingestion", failure_threshold=3)
+
+    assert call(lambda request: httpx.Response(500), breaker, times=3) == [500, 500, 500]
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        call(lambda request: httpx.Response(200), breaker, times=1)
+
+
+def test_transport_errors_open_the_circuit():
+    breaker = CircuitBreaker("ingestion", failure_threshold=3)
+
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            call(refuse, breaker, times=1)
+
+    assert breaker.state == "open"
+
+
+def test_deadline_exceeded_responses_do_not_open_the_circuit():
+    # What a downstream DeadlineMiddleware answers to a caller whose budget was already spent.
+    downstream = DeadlineMiddleware(Starlette(routes=[Route("/products", lambda request: PlainTextResponse("[]"))]))
+    breaker = CircuitBreaker("ingestion", failure_threshold=3)
+
+    async def run():
+        transport = DownstreamTransport("ingestion", httpx.ASGITransport(app=downstream), breaker)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ingestion") as client:
+            return [await client.get("/products", headers={DEADLINE_HEADER: "0"}) for _ in range(10)]
+
+    responses = asyncio.run(run())
+
+    assert {(r.status_code, r.headers[DEADLINE_EXCEEDED_HEADER]) for r in responses} == {(504, "true")}
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_upstream_dependency_failures_do_not_open_the_circuit():
+    # Ingestion answers 502 while SAP is down; its other routes still work.
+    breaker = CircuitBreaker("ingestion", failure_threshold=3)
+
+    assert call(lambda request: httpx.Response(502, json={"detail": "SAP unavailable"}), breaker, times=10) == [502] * 10
+
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_ignored_responses_keep_the_failure_count():
+    breaker = CircuitBreaker("ingestion", failure_threshold=3)
+    statuses = iter([500, 500, 502, 504, 500])
+
+    call(lambda request: httpx.Response(next(statuses)), breaker, times=5)
+
+    assert breaker.state == "open"
+
+
+def test_ignored_trial_lets_the_next_call_be_the_trial():
+    breaker = CircuitBreaker("ingestion", failure_threshold=1, reset_timeout=0)
+    call(lambda request: httpx.Response(500), breaker, times=1)
+    assert breaker.state == "half-open"
+
+    call(lambda request: httpx.Response(502), breaker, times=1)
+    assert breaker.state == "half-open"
+
+    call(lambda request: httpx.Response(200), breaker, times=1)
+    assert breaker.state == "closed"
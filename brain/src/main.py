@@ -3,10 +3,13 @@ from typing import Dict, Any, List, Optional
 from .analyzer import SAPAnalyzer
 from .vector_store.client import VectorStoreClient
 from .rag_engine.engine import RAGEngine
+from .fastjson import FastJSONResponse
+from .deadline import DEADLINE_EXCEEDED_HEADER, DeadlineMiddleware, deadline_exceeded
+from .observability import ObservabilityMiddleware, metrics_response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-app = FastAPI(title="Antigravity Brain Service")
+app = FastAPI(title="Antigravity Brain Service", default_response_class=FastJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -16,6 +19,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ObservabilityMiddleware)
 
 analyzer = SAPAnalyzer()
 
@@ -36,6 +41,10 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 @app.post("/brain/analyze/order")
 def analyze_order(order_data: Dict[str, Any], x_tenant_id: Optional[str] = Header(None)):
     """
@@ -53,6 +62,23 @@ def analyze_order(order_data: Dict[str, Any], x_tenant_id: Optional[str] = Heade
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/brain/analyze/orders")
+def analyze_orders(orders: List[Dict[str, Any]], x_tenant_id: Optional[str] = Header(None)):
+    """
+    Analyzes many Domain Order objects in one call. One result per order, in request order;
+    an order that cannot be analyzed gets an "error" instead of an "analysis".
+    """
+    tenant_id = x_tenant_id or "default_tenant"
+    results = []
+    for order_data in orders:
+        result = {"tenant_id": tenant_id, "order_id": order_data.get("order_id")}
+        try:
+            result["analysis"] = analyzer.analyze_order(order_data)
+        except Exception as e:
+            result["error"] = str(e)
+        results.append(result)
+    return results
+
 @app.post("/brain/rag/analyze")
 def rag_analyze(
     payload: Dict[str, Any], 
@@ -68,9 +94,27 @@ def rag_analyze(
     tenant_id = x_tenant_id or "default_tenant"
     query = payload.get("query")
     context = payload.get("context", {})
+
+    # The caller has already given up (e.g. the request queued behind others); skip the LLM call.
+    if deadline_exceeded():
+        raise HTTPException(status_code=504, detail="Deadline exceeded", headers={DEADLINE_EXCEEDED_HEADER: "true"})
     
-    # Pass API Key dynamically
-    response = rag_engine.analyze_with_context(query, context, tenant_id=tenant_id, api_key=x_google_api_key)
+    # Pass API Key dynamically; "retrieved" comes from /brain/rag/retrieve when the caller ran it ahead.
+    response = rag_engine.analyze_with_context(
+        query, context, tenant_id=tenant_id, api_key=x_google_api_key, retrieved=payload.get("retrieved")
+    )
     return {"tenant_id": tenant_id, "response": response}
 
+@app.post("/brain/rag/retrieve")
+def rag_retrieve(payload: Dict[str, Any], x_tenant_id: Optional[str] = Header(None)):
+    """
+    Retrieval step of RAG only. It depends on the query alone, so the gateway can run it while the
+    order is still being fetched and mapped, then pass the result to /brain/rag/analyze as "retrieved".
+    """
+    if not rag_engine:
+         raise HTTPException(status_code=503, detail="RAG Engine not initialized")
+
+    tenant_id = x_tenant_id or "default_tenant"
+    return {"tenant_id": tenant_id, "retrieved": rag_engine.retrieve(payload.get("query", ""), tenant_id=tenant_id)}
+
 
@@ -20,9 +20,17 @@ class RAGEngine:
             logger.warning("GOOGLE_API_KEY not found. RAG will fail if called.")
             self.model = None
 
-    def analyze_with_context(self, query: str, context_data: Dict, tenant_id: str = "default_tenant", api_key: Optional[str] = None) -> str:
+    def retrieve(self, query: str, tenant_id: str = "default_tenant") -> Dict:
         """
-        1. Retrieve relevant data from Mock SAP Data (Mirror).
+        Retrieval step on its own, so callers can start it before the rest of the context is ready.
+        """
+        # For this phase, we rely heavily on the Mock Data Mirror
+        return retrieve_relevant_data(query)
+
+    def analyze_with_context(self, query: str, context_data: Dict, tenant_id: str = "default_tenant", api_key: Optional[str] = None,
+                             retrieved: Optional[Dict] = None) -> str:
+        """
+        1. Retrieve relevant data from Mock SAP Data (Mirror), unless `retrieved` (from `retrieve`) is given.
         2. Construct Prompt.
         3. Call Gemini.
         """
@@ -40,8 +48,7 @@ class RAGEngine:
 
 
         # 1. Retrieve Context (Hybrid: Mock Data + Vector DB if needed)
-        # For this phase, we rely heavily on the Mock Data Mirror
-        relevant_sap_data = retrieve_relevant_data(query)
+        relevant_sap_data = retrieved if retrieved is not None else self.retrieve(query, tenant_id)
         
         # 2. Construct Prompt
         prompt = f"""
@@ -1,38 +1,370 @@
 import requests
+import json
 import logging
-from typing import List, Dict, Optional
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, List, Dict, Iterator, Optional, Sequence, Tuple
+from urllib.parse import quote, urlencode, urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..deadline import remaining_time
 
 logger = logging.getLogger(__name__)
 
+# Entities requested per page via `Prefer: odata.maxpagesize` (servers may use their own size).
+DEFAULT_PAGE_SIZE = 1000
+# Most SAP Gateway configurations accept far more, but large batches time out as one unit.
+BATCH_MAX_PARTS = 20
+
+# Key property of each entity set in the mock data.
+MOCK_KEYS = {"ProductionOrder": "Aufnr", "Material": "Matnr"}
+
+BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.I)
+
 class ODataConnector:
     """
     Generic OData Connector for fetching SAP data.
+
+    Uses one pooled keep-alive `requests.Session` for all calls and follows
+    server-driven paging: `d.__next` (OData V2, SAP Gateway) or `@odata.nextLink`
+    (V4). Pages can be consumed as they arrive with `iter_pages`/`iter_entities`.
+    Timeouts are capped by the time left until the current request's deadline (deadline.py).
+    With `mock=True` no requests are made and built-in sample data is returned.
     """
-    def __init__(self, base_url: str, auth: tuple = None):
+    def __init__(self, base_url: str, auth: tuple = None, mock: bool = False,
+                 page_size: int = DEFAULT_PAGE_SIZE, timeout: Tuple[float, float] = (5.0, 60.0),
+                 pool_size: int = 10, retries: int = 3, version: int = 2, concurrency: int = 4):
         self.base_url = base_url.rstrip('/')
         self.auth = auth
+        self.mock = mock
+        self.page_size = page_size
+        self.timeout = timeout
+        self.version = version
+        self.concurrency = concurrency
+        self._csrf_token: Optional[str] = None
+
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers.update({"Accept": "application/json"})
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=frozenset({"GET"}))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
 
-    def get_entity_set(self, entity_set_name: str, filters: str = None, top: int = 100) -> List[Dict]:
+    def _timeout(self) -> Tuple[float, float]:
         """
-        Fetch a list of entities from an OData service.
+        The (connect, read) timeouts, each at most the time left until the current request's
+        deadline. Raises requests.Timeout once it has passed. The read timeout applies to each
+        socket read, so a call may still overrun a deadline that is not yet exhausted.
         """
-        url = f"{self.base_url}/{entity_set_name}"
-        params = {
-            "$format": "json",
-            "$top": top
-        }
+        remaining = remaining_time()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise requests.Timeout("Deadline exceeded before the SAP call")
+        return min(self.timeout[0], remaining), min(self.timeout[1], remaining)
+
+    def _query_params(self, select: Optional[Sequence[str]] = None, filters: Optional[str] = None,
+                      expand: Optional[Sequence[str]] = None, top: Optional[int] = None,
+                      orderby: Optional[str] = None, skip: Optional[int] = None,
+                      count: bool = False) -> Dict[str, str]:
+        params = {"$format": "json"}
+        if select:
+            params["$select"] = ",".join(select)
         if filters:
             params["$filter"] = filters
+        if expand:
+            params["$expand"] = ",".join(expand)
+        if orderby:
+            params["$orderby"] = orderby
+        if skip:
+            params["$skip"] = str(skip)
+        if top is not None:
+            params["$top"] = str(top)
+        if count:
+            if self.version >= 4:
+                params["$count"] = "true"
+            else:
+                params["$inlinecount"] = "allpages"
+        return params
+
+    @staticmethod
+    def _total_count(payload: Dict) -> Optional[int]:
+        """Total entity count requested with $inlinecount (V2 `d.__count`) or $count (V4 `@odata.count`)."""
+        count = payload["d"].get("__count") if isinstance(payload.get("d"), dict) else payload.get("@odata.count")
+        return int(count) if count is not None else None
+
+    @staticmethod
+    def _parse_page(payload: Dict) -> Tuple[List[Dict], Optional[str]]:
+        """Returns (entities, next link) for V2 (`d.results`/`d.__next`) and V4 (`value`/`@odata.nextLink`) payloads."""
+        if "d" in payload:
+            d = payload["d"]
+            if isinstance(d, list):
+                return d, None
+            if "results" in d:
+                return d["results"], d.get("__next")
+            return [d], None  # single entity
+        if "value" in payload:
+            return payload["value"], payload.get("@odata.nextLink")
+        return [payload], None
+
+    def _get(self, url: str, params: Optional[Dict[str, str]] = None, track_changes: bool = False) -> Dict:
+        prefer = [f"odata.maxpagesize={self.page_size}"] if self.page_size else []
+        if track_changes:
+            prefer.append("odata.track-changes")
+        headers = {"Prefer": ", ".join(prefer)} if prefer else None
+        response = self.session.get(url, params=params, headers=headers, timeout=self._timeout())
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_csrf_token(self) -> str:
+        response = self.session.get(f"{self.base_url}/", headers={"X-CSRF-Token": "Fetch"}, timeout=self._timeout())
+        self._csrf_token = response.headers.get("X-CSRF-Token", "")
+        return self._csrf_token
 
+    def batch(self, requests_: Sequence[Tuple[str, Optional[Dict[str, str]]]]) -> List[Dict]:
+        """
+        Sends several GET requests in one `$batch` round trip. Each request is
+        (resource path relative to the service root, query params). Returns the
+        JSON payloads in request order; raises requests.HTTPError if any part failed.
+        """
+        boundary = f"batch_{uuid.uuid4().hex}"
+        lines = []
+        for path, params in requests_:
+            target = f"{path}?{urlencode(params, quote_via=quote, safe='$,')}" if params else path
+            lines += [
+                f"--{boundary}",
+                "Content-Type: application/http",
+                "Content-Transfer-Encoding: binary",
+                "",
+                f"GET {target} HTTP/1.1",
+                "Accept: application/json",
+                "",
+                "",
+            ]
+        lines.append(f"--{boundary}--")
+        body = "\r\n".join(lines).encode("utf-8")
+
+        # SAP Gateway rejects modifying methods (and so $batch) without a CSRF token.
+        for attempt in range(2):
+            headers = {
+                "Content-Type": f"multipart/mixed; boundary={boundary}",
+                "X-CSRF-Token": self._csrf_token or self._fetch_csrf_token(),
+            }
+            response = self.session.post(f"{self.base_url}/$batch", data=body, headers=headers, timeout=self._timeout())
+            if response.status_code == 403 and response.headers.get("X-CSRF-Token", "").lower() == "required" \
+                    and attempt == 0:
+                self._csrf_token = None
+                continue
+            break
+        response.raise_for_status()
+        return self._parse_batch_response(response)
+
+    @staticmethod
+    def _parse_batch_response(response: requests.Response) -> List[Dict]:
+        match = BOUNDARY_RE.search(response.headers.get("Content-Type", ""))
+        if not match:
+            raise requests.HTTPError("$batch response is not multipart", response=response)
+        payloads = []
+        for part in response.text.split(f"--{match.group(1)}")[1:]:
+            if part.startswith("--"):
+                break
+            # Part headers, then the embedded HTTP response: status line and headers, body.
+            sections = re.split(r"\r?\n\r?\n", part.strip(), maxsplit=2)
+            head = sections[1] if len(sections) > 1 else ""
+            payload = sections[2] if len(sections) > 2 else ""
+            status = int(head.split(None, 2)[1])
+            if status >= 400:
+                raise requests.HTTPError(f"$batch part failed with {status}: {payload[:200]}", response=response)
+            payloads.append(json.loads(payload) if payload.strip() else {})
+        return payloads
+
+    def _fetch_pages(self, page_requests: List[Tuple[str, Dict[str, str]]], use_batch: bool) -> List[Dict]:
+        """Fetches independent page requests concurrently, in $batch groups or as separate GETs."""
+        if not page_requests:
+            return []
+        # Pool threads run in copies of the caller's context, so they see its deadline.
+        context = copy_context()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            if use_batch:
+                groups = [page_requests[i:i + BATCH_MAX_PARTS] for i in range(0, len(page_requests), BATCH_MAX_PARTS)]
+                return [payload for payloads in pool.map(lambda group: context.copy().run(self.batch, group), groups)
+                        for payload in payloads]
+            return list(pool.map(
+                lambda request: context.copy().run(self._get, f"{self.base_url}/{request[0]}", request[1]),
+                page_requests,
+            ))
+
+    def fetch_entity_sets(self, queries: Dict[str, Dict[str, Any]], use_batch: bool = True) -> Dict[str, List[Dict]]:
+        """
+        Fetches several entity sets completely in a few round trips.
+
+        `queries` maps entity set names to `iter_pages` options (select, filters, expand, top)
+        plus `orderby`, which should name the key so that $skip pages are stable.
+
+        The first page of every set is requested together with its total count (one
+        $batch, or concurrent GETs with `use_batch=False`). The remaining pages are then
+        addressed with $skip/$top in steps of the first page's size, which is the server's
+        page size when it caps pages below `page_size`, and fetched concurrently (up to
+        `concurrency` requests in flight), in $batch groups of up to BATCH_MAX_PARTS pages.
+        A page that still comes back short has its next link followed. Sets whose server
+        does not report a count fall back to following next links.
+        """
+        if self.mock:
+            return {name: self._mock_data(name)[:query.get("top")] for name, query in queries.items()}
+
+        names = list(queries)
+        page_size = self.page_size or DEFAULT_PAGE_SIZE
+
+        def page_request(name: str, skip: int = 0, size: int = page_size) -> Tuple[str, Dict[str, str]]:
+            query = queries[name]
+            top = query.get("top")
+            size = size if top is None else min(size, top - skip)
+            params = self._query_params(query.get("select"), query.get("filters"), query.get("expand"),
+                                        top=size, orderby=query.get("orderby"), skip=skip, count=skip == 0)
+            return name, params
+
+        results: Dict[str, List[Dict]] = {}
+        followups: List[Tuple[str, int, int]] = []
+        chained: Dict[str, str] = {}
+        for name, payload in zip(names, self._fetch_pages([page_request(name) for name in names], use_batch)):
+            entities, next_link = self._parse_page(payload)
+            results[name] = list(entities)
+            count = self._total_count(payload)
+            top = queries[name].get("top")
+            if count is not None and entities:
+                total = count if top is None else min(count, top)
+                step = len(entities)
+                followups += [(name, skip, step) for skip in range(step, total, step)]
+            elif next_link:
+                chained[name] = next_link
+
+        pages = self._fetch_pages([page_request(name, skip, step) for name, skip, step in followups], use_batch)
+        for (name, _, _), payload in zip(followups, pages):
+            entities, next_link = self._parse_page(payload)
+            results[name].extend(entities)
+            if next_link:
+                results[name].extend(self._follow_next_links(next_link))
+
+        for name, next_link in chained.items():
+            results[name].extend(self._follow_next_links(next_link))
+            results[name] = results[name][:queries[name].get("top")]
+        return results
+
+    def _follow_next_links(self, next_link: str) -> List[Dict]:
+        """All entities from `next_link` and the next links after it."""
+        entities: List[Dict] = []
+        while next_link:
+            page, next_link = self._parse_page(self._get(urljoin(f"{self.base_url}/", next_link)))
+            entities.extend(page)
+        return entities
+
+    def fetch_changes(self, entity_set_name: str, delta_link: Optional[str] = None,
+                      **query) -> Tuple[List[Dict], List[Dict], Optional[str]]:
+        """
+        Change tracking via OData delta links. Returns (changed, deleted, next delta link).
+
+        Without `delta_link` this is an initial load of the whole set (with `iter_pages`
+        options in `query`) that asks the server to track changes; with it, only entities
+        changed or deleted since that link was issued are returned. Deleted entities come from
+        `d.__deleted` (SAP Gateway V2) or `@removed` entries (V4). The returned delta link is
+        None if the service does not support change tracking. A server that has expired the
+        link answers with an HTTP error (usually 404/410); callers should then reload fully.
+        """
+        if self.mock:
+            return self._mock_data(entity_set_name), [], None
+
+        if delta_link:
+            url, params = urljoin(f"{self.base_url}/", delta_link), None
+        else:
+            url = f"{self.base_url}/{entity_set_name}"
+            params = self._query_params(query.get("select"), query.get("filters"), query.get("expand"))
+        changed, deleted, new_delta_link = [], [], None
+        while url:
+            payload = self._get(url, params, track_changes=True)
+            entities, next_link = self._parse_page(payload)
+            for entity in entities:
+                if "@removed" in entity or "@odata.removed" in entity:
+                    deleted.append(entity)
+                else:
+                    changed.append(entity)
+            if isinstance(payload.get("d"), dict):
+                deleted.extend(payload["d"].get("__deleted", []))
+                new_delta_link = payload["d"].get("__delta", new_delta_link)
+            else:
+                new_delta_link = payload.get("@odata.deltaLink", new_delta_link)
+            url = urljoin(f"{self.base_url}/", next_link) if next_link else None
+            params = None
+        return changed, deleted, new_delta_link
+
+    def iter_pages(self, entity_set_name: str, select: Optional[Sequence[str]] = None,
+                   filters: Optional[str] = None, expand: Optional[Sequence[str]] = None,
+                   top: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Yields pages of entities as they arrive, following the server's next links until the
+        set (or `top` entities) is exhausted. Raises requests exceptions on failure.
+        """
+        if self.mock:
+            yield self._mock_data(entity_set_name)[:top]
+            return
+
+        url = f"{self.base_url}/{entity_set_name}"
+        params = self._query_params(select, filters, expand, top)
+        remaining = top
+        while url:
+            logger.info(f"Fetching {entity_set_name} page from {url}")
+            entities, next_link = self._parse_page(self._get(url, params))
+            if remaining is not None:
+                entities = entities[:remaining]
+                remaining -= len(entities)
+            if entities:
+                yield entities
+            if remaining == 0 or not next_link:
+                break
+            # Next links already carry the query (and skip token); they may be relative.
+            url, params = urljoin(f"{self.base_url}/", next_link), None
+
+    def iter_entities(self, entity_set_name: str, **query) -> Iterator[Dict]:
+        """Yields entities one by one across all pages. Accepts the same arguments as `iter_pages`."""
+        for page in self.iter_pages(entity_set_name, **query):
+            yield from page
+
+    def get_entity(self, entity_set_name: str, key: str, select: Optional[Sequence[str]] = None,
+                   expand: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """
+        Reads one entity by its (single, string) key: `EntitySet('key')`. Returns None if it
+        does not exist; raises requests exceptions on other failures.
+        """
+        if self.mock:
+            key_property = MOCK_KEYS.get(entity_set_name)
+            return next((e for e in self._mock_data(entity_set_name) if e.get(key_property) == key), None)
+
+        literal = quote("'" + key.replace("'", "''") + "'", safe="'")
+        response = self.session.get(
+            f"{self.base_url}/{entity_set_name}({literal})",
+            params=self._query_params(select, expand=expand), timeout=self._timeout(),
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        entities, _ = self._parse_page(response.json())
+        return entities[0] if entities else None
+
+    def get_entity_set(self, entity_set_name: str, filters: str = None, top: Optional[int] = None,
+                       select: Optional[Sequence[str]] = None, expand: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Fetch a list of entities from an OData service (all pages, or the first `top` entities).
+        Failures are logged and return []; use `iter_entities` to tell them from an empty result.
+        """
         try:
-            logger.info(f"Fetching {entity_set_name} from {url}")
-            # In a real scenario, we would make the request:
-            # response = requests.get(url, auth=self.auth, params=params)
-            # response.raise_for_status()
-            # return response.json()['d']['results']
-            
-            # MOCK IMPLEMENTATION FOR SPRINT 1
-            return self._mock_data(entity_set_name)
+            return list(self.iter_entities(entity_set_name, select=select, filters=filters, expand=expand, top=top))
         except Exception as e:
             logger.error(f"Failed to fetch {entity_set_name}: {e}")
             return []
@@ -1,46 +1,306 @@
 import sqlite3
-import os
-from typing import List, Dict
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Child collections attached to every product; each is one extra query when selected.
+PRODUCT_CHILDREN = ('categories', 'attributes', 'ingredients')
+
+# Same folding as the scraper applies when indexing (scraper/search_index.py); keep in sync.
+TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i', 'Ş': 's', 'ş': 's', 'Ğ': 'g', 'ğ': 'g',
+    'Ç': 'c', 'ç': 'c', 'Ö': 'o', 'ö': 'o', 'Ü': 'u', 'ü': 'u',
+})
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+# bm25 column weights for product_search(name, sku, ingredients, body)
+SEARCH_WEIGHTS = (10.0, 8.0, 4.0, 1.0)
+
+# Read-side tuning applied to every pooled connection.
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",   # 256 MB memory-mapped reads
+    "PRAGMA cache_size = -32000",     # 32 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+)
+
+class ReadConnectionPool:
+    """
+    Pool of long-lived, read-only SQLite connections (`mode=ro`, `query_only`).
+
+    Connections keep their page cache, mmap and prepared-statement cache across
+    requests instead of being opened per request. They are created with
+    `check_same_thread=False` and handed to one thread at a time, so the pool can
+    be shared by FastAPI's threadpool. Up to `size` idle connections are kept;
+    when all are busy a new one is opened rather than making the caller wait.
+    """
+    def __init__(self, db_path: str, size: int = 8, cached_statements: int = 256):
+        self.db_path = db_path
+        self.size = size
+        self.cached_statements = cached_statements
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        # mode=ro fails instead of creating an empty database when the file does not exist yet.
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Returns an idle connection or opens a new one. Raises sqlite3.OperationalError if the DB is missing."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
 
 class SQLiteConnector:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool_size: int = 8):
         self.db_path = db_path
+        self.pool = ReadConnectionPool(db_path, size=pool_size)
+
+    def _acquire(self) -> Optional[sqlite3.Connection]:
+        """Pooled connection, or None while the scraper has not created the database yet."""
+        try:
+            return self.pool.acquire()
+        except sqlite3.OperationalError:
+            return None
 
     def get_all_products(self) -> List[Dict]:
         """
         Fetches all products with their categories and ingredients.
         """
-        if not os.path.exists(self.db_path):
-            return []
+        return list(self.iter_products())
 
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def get_products(self, **query) -> List[Dict]:
+        """
+        Fetches a page of products. Accepts the same arguments as `iter_products`.
+        """
+        return list(self.iter_products(**query))
+
+    def search_products(self, text: Optional[str] = None, ingredient: Optional[str] = None,
+                        limit: int = 20) -> List[Dict]:
+        """
+        Ranked full-text search over the scraper's FTS5 index (`product_search`).
+
+        `text` matches name, SKU/barcode, ingredients, categories and usage/warnings/storage text;
+        `ingredient` matches ingredient names only. Every word must match, as a prefix. Both are
+        folded like the index, so "mürver", "MÜRVER" and "murver" are equivalent.
+        Best matches come first. Raises LookupError if the index has not been built yet.
+        """
+        clauses = []
+        if text and _match_terms(text):
+            clauses.append(_match_terms(text))
+        if ingredient and _match_terms(ingredient):
+            clauses.append(f"ingredients : ({_match_terms(ingredient)})")
+        expression = " AND ".join(clauses)
+        if not expression:
+            return []
+        conn = self._acquire()
+        if conn is None:
+            return []
 
         try:
-            # 1. Fetch Products
-            cursor.execute("SELECT * FROM products")
-            products = [dict(row) for row in cursor.fetchall()]
-
-            for product in products:
-                p_id = product['id']
-                
-                # 2. Fetch Categories
-                cursor.execute('''
-                    SELECT c.name FROM categories c
-                    JOIN product_categories pc ON c.id = pc.category_id
-                    WHERE pc.product_id = ?
-                ''', (p_id,))
-                product['categories'] = [row['name'] for row in cursor.fetchall()]
-                
-                # 3. Fetch Attributes
-                cursor.execute("SELECT attribute_key, attribute_value FROM product_attributes WHERE product_id = ?", (p_id,))
-                product['attributes'] = {row['attribute_key']: row['attribute_value'] for row in cursor.fetchall()}
-                
-                # 4. Fetch Ingredients
-                cursor.execute("SELECT * FROM product_ingredients WHERE product_id = ?", (p_id,))
-                product['ingredients'] = [dict(row) for row in cursor.fetchall()]
-
-            return products
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'product_search'").fetchone() is None:
+                raise LookupError("Search index has not been built; run the scraper to create it")
+            rows = conn.execute(f'''
+                SELECT p.id, p.sku, p.name, p.url, p.price, p.currency,
+                       -bm25(product_search, {", ".join(map(str, SEARCH_WEIGHTS))}) AS score
+                FROM product_search JOIN products p ON p.id = product_search.rowid
+                WHERE product_search MATCH ?
+                ORDER BY score DESC
+                LIMIT ?
+            ''', (expression, limit))
+            return [dict(row) for row in rows]
         finally:
-            conn.close()
+            self.pool.release(conn)
+
+    def iter_products(self, after_id: Optional[int] = None, limit: Optional[int] = None,
+                      fields: Optional[Sequence[str]] = None, category: Optional[str] = None,
+                      skus: Optional[Sequence[str]] = None,
+                      updated_since: Union[datetime, str, None] = None) -> Iterator[Dict]:
+        """
+        Returns an iterator over fully assembled products, read from server-side cursors.
+
+        Products and each child table are read with one query each, all ordered
+        by product id, and merged in step, so only the current product is held in
+        memory. The generator may be advanced from different threads (e.g. a
+        StreamingResponse), but not concurrently.
+
+        - after_id/limit: keyset pagination; pass the last id of a page to get the next one.
+        - fields: product columns and/or child collections to return (`id` is always included).
+          Unselected columns are not read and unselected child tables are not queried.
+        - category, skus, updated_since: filters on category name, SKU list and last update time.
+
+        Raises ValueError for unknown fields or a malformed `updated_since`.
+        """
+        conn = self._acquire()
+        if conn is None:
+            return iter(())
+
+        try:
+            # Validated up front so bad arguments fail before a response starts streaming.
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(products)")]
+            selected, children = _select_fields(fields, columns)
+            where, params = _product_filters(after_id, category, skus, updated_since, columns)
+        except Exception:
+            self.pool.release(conn)
+            raise
+        page = f"FROM products{where} ORDER BY id" + (" LIMIT ?" if limit is not None else "")
+        if limit is not None:
+            params.append(limit)
+        return _assemble_products(self.pool, conn, selected, children, page, params)
+
+
+def _assemble_products(pool: ReadConnectionPool, conn: sqlite3.Connection, selected: List[str],
+                       children: List[str], page: str, params: List) -> Iterator[Dict]:
+    cursors = []
+
+    def query(sql: str) -> sqlite3.Cursor:
+        cursor = conn.execute(sql, params)
+        cursors.append(cursor)
+        return cursor
+
+    try:
+        # Child rows are restricted to the products on this page.
+        child_filter = f"IN (SELECT id {page})"
+
+        # 1. Fetch Products
+        products = query(f"SELECT {', '.join(selected)} {page}")
+
+        merged = []
+        # 2. Fetch Categories
+        if 'categories' in children:
+            merged.append(('categories', _ChildGroups(groupby(query(f'''
+                SELECT pc.product_id, c.name FROM product_categories pc
+                JOIN categories c ON c.id = pc.category_id
+                WHERE pc.product_id {child_filter}
+                ORDER BY pc.product_id, pc.category_id
+            '''), key=itemgetter(0))), lambda rows: [r['name'] for r in rows]))
+
+        # 3. Fetch Attributes
+        if 'attributes' in children:
+            merged.append(('attributes', _ChildGroups(groupby(query(
+                "SELECT product_id, attribute_key, attribute_value FROM product_attributes "
+                f"WHERE product_id {child_filter} ORDER BY product_id, id"
+            ), key=itemgetter(0))), lambda rows: {r['attribute_key']: r['attribute_value'] for r in rows}))
+
+        # 4. Fetch Ingredients
+        if 'ingredients' in children:
+            merged.append(('ingredients', _ChildGroups(groupby(query(
+                f"SELECT * FROM product_ingredients WHERE product_id {child_filter} ORDER BY product_id, id"
+            ), key=itemgetter('product_id'))), lambda rows: [dict(r) for r in rows]))
+
+        for row in products:
+            product = dict(row)
+            p_id = product['id']
+            for name, child, build in merged:
+                product[name] = build(child.take(p_id))
+            yield product
+    finally:
+        # Finish any half-read statements (client went away) so the pooled
+        # connection does not keep an old read snapshot open.
+        for cursor in cursors:
+            cursor.close()
+        pool.release(conn)
+
+
+def fold_turkish(text: str) -> str:
+    """Lowercases and strips Turkish (and other) diacritics; dotted and dotless i both fold to "i"."""
+    text = text.translate(TURKISH_FOLD).lower()
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def _match_terms(text: str) -> str:
+    """Builds an FTS5 expression requiring every word of `text` as a quoted prefix term."""
+    return " AND ".join(f'"{token}"*' for token in SEARCH_TOKEN_RE.findall(fold_turkish(text)))
+
+
+def _select_fields(fields: Optional[Sequence[str]], columns: List[str]) -> Tuple[List[str], List[str]]:
+    """Splits requested fields into product columns and child collections, validating both."""
+    if not fields:
+        return columns, list(PRODUCT_CHILDREN)
+    unknown = [f for f in fields if f not in columns and f not in PRODUCT_CHILDREN]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    selected = ['id'] + [c for c in columns if c in fields and c != 'id']
+    return selected, [c for c in PRODUCT_CHILDREN if c in fields]
+
+
+def _product_filters(after_id, category, skus, updated_since, columns) -> Tuple[str, List]:
+    clauses, params = [], []
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    if category:
+        clauses.append('''id IN (
+            SELECT pc.product_id FROM product_categories pc
+            JOIN categories c ON c.id = pc.category_id WHERE c.name = ?
+        )''')
+        params.append(category)
+    if skus:
+        clauses.append(f"sku IN ({', '.join('?' for _ in skus)})")
+        params.extend(skus)
+    if updated_since is not None:
+        # Databases scraped before updated_at existed only have created_at.
+        column = 'updated_at' if 'updated_at' in columns else 'created_at'
+        clauses.append(f"{column} >= ?")
+        params.append(_sqlite_timestamp(updated_since))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _sqlite_timestamp(value: Union[datetime, str]) -> str:
+    """Formats a timestamp like SQLite's CURRENT_TIMESTAMP (UTC, 'YYYY-MM-DD HH:MM:SS') for comparison."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class _ChildGroups:
+    """Walks (product_id, rows) groups of a child table sorted by product_id in step with the products."""
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.current = next(groups, None)
+
+    def take(self, product_id: int) -> List[sqlite3.Row]:
+        # Skip orphaned rows whose product no longer exists.
+        while self.current is not None and (self.current[0] is None or self.current[0] < product_id):
+            self.current = next(self.groups, None)
+        if self.current is None or self.current[0] != product_id:
+            return []
+        rows = list(self.current[1])
+        self.current = next(self.groups, None)
+        return rows
@@ -1,16 +1,120 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from .connectors.odata import ODataConnector
 from .connectors.sqlite import SQLiteConnector
+from .deadline import DEADLINE_EXCEEDED_HEADER, DeadlineMiddleware, deadline_exceeded
+from .fastjson import FastJSONResponse, dumps
+from .observability import ObservabilityMiddleware, metrics_response, observe_downstream
+from .order_store import OrderStore, OrderSync
+from .snapshot import ProductSnapshotCache
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+import asyncio
+import logging
 import os
 
-app = FastAPI(title="Antigravity Ingestion Service")
+logger = logging.getLogger(__name__)
 
 # Initialize Connectors
-connector = ODataConnector(base_url="https://mock.sap.corp/odata")
+# Without SAP_ODATA_URL the connector serves built-in mock data.
+SAP_ODATA_URL = os.getenv("SAP_ODATA_URL")
+SAP_ODATA_AUTH = (os.getenv("SAP_ODATA_USER"), os.getenv("SAP_ODATA_PASSWORD")) if os.getenv("SAP_ODATA_USER") else None
+connector = ODataConnector(
+    base_url=SAP_ODATA_URL or "https://mock.sap.corp/odata",
+    auth=SAP_ODATA_AUTH,
+    mock=not SAP_ODATA_URL,
+    page_size=int(os.getenv("SAP_ODATA_PAGE_SIZE", "1000")),
+    concurrency=int(os.getenv("SAP_ODATA_CONCURRENCY", "4")),
+)
+
+def time_sap_call(response, *args, **kwargs):
+    # requests response hook: SAP calls go into the downstream latency histogram and Server-Timing.
+    observe_downstream("sap", response.request.method, response.status_code, response.elapsed.total_seconds())
+
+connector.session.hooks["response"].append(time_sap_call)
+
+# Set to "false" for gateways that do not accept $batch; pages are then fetched as concurrent GETs.
+SAP_ODATA_BATCH = os.getenv("SAP_ODATA_BATCH", "true").lower() != "false"
+# Key used to order $skip pages of the entity sets we bulk-load.
+SAP_ENTITY_KEYS = {"ProductionOrder": "Aufnr", "Material": "Matnr"}
+
+# Production orders are served from a local store that a background task keeps in sync with SAP.
+order_store = OrderStore(os.getenv("ORDER_STORE_PATH", "order_store.db"))
+order_sync = OrderSync(connector, order_store, change_field=os.getenv("SAP_ORDER_CHANGE_FIELD") or None)
+ORDER_SYNC_INTERVAL = float(os.getenv("ORDER_SYNC_INTERVAL", "60"))
+
+async def sync_orders_periodically():
+    while True:
+        try:
+            await asyncio.to_thread(order_sync.run_once)
+        except Exception as e:
+            logger.error(f"Production order sync failed: {e}")
+        await asyncio.sleep(ORDER_SYNC_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sync_task = asyncio.create_task(sync_orders_periodically())
+    yield
+    sync_task.cancel()
+
+app = FastAPI(title="Antigravity Ingestion Service", lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ObservabilityMiddleware)
 
 # SQLite db path (mapped via Docker volume)
 DB_PATH = os.getenv("SEPENATURAL_DB_PATH", "/app/data/sepenatural.db")
-sqlite_connector = SQLiteConnector(db_path=DB_PATH)
+sqlite_connector = SQLiteConnector(db_path=DB_PATH, pool_size=int(os.getenv("SEPENATURAL_DB_POOL_SIZE", "8")))
+# The full catalogue is served from memory and rebuilt only when the scraper changes the DB.
+product_snapshots = ProductSnapshotCache(sqlite_connector)
+
+# Products are buffered into chunks of about this size before being written to the socket.
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+def ndjson_chunks(rows: Iterable[Dict]) -> Iterator[bytes]:
+    """Encodes rows as newline-delimited JSON, grouped into chunks of ~NDJSON_CHUNK_SIZE bytes."""
+    buffer = bytearray()
+    for row in rows:
+        buffer += dumps(row)
+        buffer += b"\n"
+        if len(buffer) >= NDJSON_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+# Upper bound for `limit` on paginated product requests.
+MAX_PAGE_SIZE = 1000
+
+def product_query(
+    after_id: Optional[int] = Query(None, ge=0, description="Return products with id greater than this (keyset cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    fields: Optional[str] = Query(None, description="Comma-separated product columns and/or categories,attributes,ingredients"),
+    category: Optional[str] = Query(None, description="Only products in this category"),
+    skus: Optional[str] = Query(None, description="Comma-separated SKU list"),
+    updated_since: Optional[datetime] = Query(None, description="Only products updated at or after this time"),
+) -> Dict:
+    """Pagination, projection and filter arguments shared by the product endpoints."""
+    return {
+        "after_id": after_id,
+        "limit": limit,
+        "fields": [f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        "category": category,
+        "skus": [s.strip() for s in skus.split(",") if s.strip()] if skus else None,
+        "updated_since": updated_since,
+    }
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def open_products(query: Dict) -> Iterator[Dict]:
+    try:
+        return sqlite_connector.iter_products(**query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/")
 def read_root():
@@ -20,23 +124,189 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
+def check_deadline():
+    """
+    Answers 504 once the caller's deadline (X-Deadline-Ms) has passed. Sync endpoints call it before
+    blocking SAP and SQLite work, which the DeadlineMiddleware cannot interrupt in the worker thread.
+    """
+    if deadline_exceeded():
+        raise HTTPException(status_code=504, detail="Deadline exceeded", headers={DEADLINE_EXCEEDED_HEADER: "true"})
+
+def sap_error(e: Exception) -> HTTPException:
+    """502 for a failed SAP call, or 504 if it failed because the caller's deadline ran out."""
+    check_deadline()
+    return HTTPException(status_code=502, detail=f"SAP OData Error: {str(e)}")
+
+def run_order_sync() -> Dict:
+    check_deadline()
+    try:
+        return order_sync.run_once()
+    except Exception as e:
+        raise sap_error(e)
+
+def odata_list(value: Optional[str]) -> Optional[List[str]]:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
 @app.get("/ingest/production-orders")
-def get_production_orders():
+def get_production_orders(
+    select: Optional[str] = Query(None, alias="$select", description="Comma-separated properties"),
+    filters: Optional[str] = Query(None, alias="$filter", description="OData filter expression"),
+    expand: Optional[str] = Query(None, alias="$expand", description="Comma-separated navigation properties"),
+    top: Optional[int] = Query(None, alias="$top", ge=1),
+):
     """
-    Fetches raw production orders from SAP (Mock).
+    Production orders from the local order store (kept current by delta sync).
+    Requests with OData query options are passed through to SAP (all server-driven pages).
     """
-    data = connector.get_entity_set("ProductionOrder")
+    if select is None and filters is None and expand is None and top is None:
+        if not len(order_store):
+            # First request before the background sync has completed.
+            run_order_sync()
+        data = order_store.all()
+    else:
+        check_deadline()
+        try:
+            data = list(connector.iter_entities(
+                "ProductionOrder", filters=filters, top=top, select=odata_list(select), expand=odata_list(expand)
+            ))
+        except Exception as e:
+            # A SAP failure must not look like "no matching orders".
+            raise sap_error(e)
     if not data:
         raise HTTPException(status_code=404, detail="No orders found")
-    return data
+    return FastJSONResponse(data)
+
+@app.post("/ingest/production-orders/sync")
+def sync_production_orders():
+    """
+    Runs a sync round with SAP now (delta if possible) instead of waiting for the background interval.
+    """
+    result = run_order_sync()
+    return {**result, **{k: v for k, v in order_store.state().items() if k != "delta_link"}}
+
+@app.get("/ingest/production-orders/stream")
+def stream_production_orders(
+    select: Optional[str] = Query(None, alias="$select"),
+    filters: Optional[str] = Query(None, alias="$filter"),
+    expand: Optional[str] = Query(None, alias="$expand"),
+    top: Optional[int] = Query(None, alias="$top", ge=1),
+):
+    """
+    Streams production orders as newline-delimited JSON, forwarding each SAP page as it arrives.
+    """
+    check_deadline()
+    orders = connector.iter_entities(
+        "ProductionOrder", filters=filters, top=top, select=odata_list(select), expand=odata_list(expand)
+    )
+    return StreamingResponse(ndjson_chunks(orders), media_type="application/x-ndjson")
+
+@app.get("/ingest/production-orders/{aufnr}")
+def get_production_order(aufnr: str):
+    """
+    One production order by number, from the order store's index.
+    Orders created since the last sync are read from SAP with a key lookup.
+    """
+    order = order_store.get(aufnr)
+    if order is None:
+        check_deadline()
+        try:
+            order = connector.get_entity("ProductionOrder", aufnr)
+        except Exception as e:
+            raise sap_error(e)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+@app.post("/ingest/production-orders/lookup")
+def lookup_production_orders(aufnrs: List[str]):
+    """
+    Many production orders by number in one call, in request order. Unknown numbers are left out.
+    """
+    if not len(order_store):
+        run_order_sync()
+    orders = []
+    for aufnr in dict.fromkeys(aufnrs):
+        order = order_store.get(aufnr)
+        if order is None:
+            check_deadline()
+            try:
+                order = connector.get_entity("ProductionOrder", aufnr)
+            except Exception as e:
+                raise sap_error(e)
+        if order is not None:
+            orders.append(order)
+    return FastJSONResponse(orders)
+
+@app.get("/ingest/sap/entity-sets")
+def get_sap_entity_sets(
+    sets: str = Query("ProductionOrder,Material", description="Comma-separated entity set names"),
+):
+    """
+    Fetches several complete SAP entity sets at once ($batch + concurrent pages), keyed by set name.
+    """
+    names = odata_list(sets) or []
+    unknown = [name for name in names if name not in SAP_ENTITY_KEYS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown entity sets: {', '.join(unknown)}")
+    check_deadline()
+    try:
+        return FastJSONResponse(connector.fetch_entity_sets(
+            {name: {"orderby": SAP_ENTITY_KEYS[name]} for name in names}, use_batch=SAP_ODATA_BATCH
+        ))
+    except Exception as e:
+        raise sap_error(e)
 
 @app.get("/ingest/sepenatural/products")
-def get_sepenatural_products():
+def get_sepenatural_products(request: Request, query: Dict = Depends(product_query)):
     """
     Fetches raw products from Sepenatural SQLite DB.
+    When `limit` is given and the page is full, `X-Next-After-Id` holds the cursor for the next page.
+    The unfiltered catalogue comes from the in-memory snapshot, with an ETag and If-None-Match 304s.
     """
-    data = sqlite_connector.get_all_products()
-    if not data:
+    check_deadline()
+    if all(value is None for value in query.values()):
+        snapshot = product_snapshots.get()
+        if snapshot is None or not snapshot.count:
+            raise HTTPException(status_code=404, detail="No products found in Sepenatural DB")
+        headers = {"ETag": snapshot.etag}
+        if etag_matches(request.headers.get("If-None-Match"), snapshot.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+    data = list(open_products(query))
+    response = FastJSONResponse(data)
+    if query["limit"] is not None and len(data) == query["limit"]:
+        response.headers["X-Next-After-Id"] = str(data[-1]["id"])
+    return response
+
+@app.get("/ingest/sepenatural/products/stream")
+def stream_sepenatural_products(query: Dict = Depends(product_query)):
+    """
+    Streams products from Sepenatural SQLite DB as newline-delimited JSON, one product per line.
+    Products are read from a server-side cursor, so memory stays flat regardless of catalogue size.
+    """
+    if not os.path.exists(DB_PATH):
         raise HTTPException(status_code=404, detail="No products found in Sepenatural DB")
-    return data
+    check_deadline()
+    return StreamingResponse(ndjson_chunks(open_products(query)), media_type="application/x-ndjson")
 
+@app.get("/ingest/sepenatural/search")
+def search_sepenatural_products(
+    q: Optional[str] = Query(None, description="Words to find in name, SKU, ingredients, categories and usage text"),
+    ingredient: Optional[str] = Query(None, description="Words to find in ingredient names"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    Ranked full-text search over the scraped catalogue (best match first), with Turkish-aware matching.
+    """
+    if not q and not ingredient:
+        raise HTTPException(status_code=400, detail="Provide q and/or ingredient")
+    check_deadline()
+    try:
+        return FastJSONResponse(sqlite_connector.search_products(text=q, ingredient=ingredient, limit=limit))
+    except LookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
@@ -0,0 +1,152 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from .connectors.odata import ODataConnector
+
+logger = logging.getLogger(__name__)
+
+ORDER_ENTITY_SET = "ProductionOrder"
+ORDER_KEY = "Aufnr"
+
+# OData V2 JSON dates: "/Date(1739318400000)/" or "/Date(1739318400000+0000)/"
+V2_DATE_RE = re.compile(r'/Date\((-?\d+)(?:[+-]\d{4})?\)/')
+
+
+class OrderStore:
+    """
+    Local copy of SAP production orders: an in-memory index keyed by order number,
+    persisted to SQLite so a restart does not need a full reload from SAP.
+    Reads never touch SAP or the disk; they are served from memory.
+    """
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS orders (aufnr TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                entity_set TEXT PRIMARY KEY,
+                delta_link TEXT,
+                last_changed TEXT,
+                synced_at TEXT
+            )
+        ''')
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._orders: Dict[str, Dict] = {
+            aufnr: json.loads(data) for aufnr, data in self.conn.execute("SELECT aufnr, data FROM orders ORDER BY aufnr")
+        }
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def get(self, aufnr: str) -> Optional[Dict]:
+        return self._orders.get(aufnr)
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            return [self._orders[aufnr] for aufnr in sorted(self._orders)]
+
+    def state(self) -> Dict[str, Optional[str]]:
+        row = self.conn.execute(
+            "SELECT delta_link, last_changed, synced_at FROM sync_state WHERE entity_set = ?", (ORDER_ENTITY_SET,)
+        ).fetchone()
+        return dict(zip(("delta_link", "last_changed", "synced_at"), row or (None, None, None)))
+
+    def apply(self, changed: Iterable[Dict], deleted_keys: Iterable[str], delta_link: Optional[str],
+              last_changed: Optional[str], replace: bool = False):
+        """Upserts changed orders, removes deleted ones and stores the sync cursor, all in one transaction."""
+        changed = [order for order in changed if order.get(ORDER_KEY)]
+        deleted_keys = list(deleted_keys)
+        synced_at = datetime.now(timezone.utc).isoformat()
+        with self._lock, self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM orders")
+            self.conn.executemany(
+                "INSERT INTO orders (aufnr, data) VALUES (?, ?) ON CONFLICT(aufnr) DO UPDATE SET data = excluded.data",
+                [(order[ORDER_KEY], json.dumps(order, ensure_ascii=False)) for order in changed],
+            )
+            self.conn.executemany("DELETE FROM orders WHERE aufnr = ?", [(key,) for key in deleted_keys])
+            self.conn.execute('''
+                INSERT INTO sync_state (entity_set, delta_link, last_changed, synced_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(entity_set) DO UPDATE SET
+                    delta_link = excluded.delta_link, last_changed = excluded.last_changed, synced_at = excluded.synced_at
+            ''', (ORDER_ENTITY_SET, delta_link, last_changed, synced_at))
+            orders = {} if replace else dict(self._orders)
+            orders.update((order[ORDER_KEY], order) for order in changed)
+            for key in deleted_keys:
+                orders.pop(key, None)
+            # Swap in a new dict so concurrent readers never see a half-applied sync.
+            self._orders = orders
+
+
+class OrderSync:
+    """
+    Keeps an OrderStore current with incremental syncs from SAP.
+
+    Prefers OData delta links (`Prefer: odata.track-changes`). If the service does not
+    issue them and `change_field` is set (a change timestamp such as `ChangedAt`), only
+    orders changed at or after the newest timestamp seen are requested. Otherwise, or when
+    a delta link has expired, the whole entity set is reloaded.
+    """
+    def __init__(self, connector: ODataConnector, store: OrderStore, change_field: Optional[str] = None):
+        self.connector = connector
+        self.store = store
+        self.change_field = change_field
+        self._lock = threading.Lock()
+
+    def _latest_change(self, orders: List[Dict], previous: Optional[str]) -> Optional[str]:
+        if not self.change_field:
+            return None
+        values = [_to_iso(order[self.change_field]) for order in orders if order.get(self.change_field)]
+        return max(values + ([previous] if previous else []), default=None)
+
+    def _changed_since_filter(self, last_changed: str) -> str:
+        # `ge`: orders changed later in the same (whole) second as the last one seen must not be
+        # skipped. Orders already synced at that timestamp come again; the upsert is idempotent.
+        if self.connector.version >= 4:
+            return f"{self.change_field} ge {last_changed}"
+        return f"{self.change_field} ge datetime'{last_changed[:19]}'"
+
+    def run_once(self) -> Dict[str, object]:
+        """Performs one sync round. Returns what was done, for logs and the sync endpoint."""
+        with self._lock:
+            state = self.store.state()
+            mode = "full"
+            if state["delta_link"]:
+                try:
+                    changed, deleted, delta_link = self.connector.fetch_changes(
+                        ORDER_ENTITY_SET, delta_link=state["delta_link"]
+                    )
+                    mode = "delta"
+                except requests.HTTPError as e:
+                    logger.warning(f"Delta link rejected ({e}); reloading all production orders")
+            elif self.change_field and state["last_changed"]:
+                changed = list(self.connector.iter_entities(
+                    ORDER_ENTITY_SET, filters=self._changed_since_filter(state["last_changed"])
+                ))
+                deleted, delta_link, mode = [], None, "changed_since"
+
+            if mode == "full":
+                changed, deleted, delta_link = self.connector.fetch_changes(ORDER_ENTITY_SET)
+
+            deleted_keys = [entity[ORDER_KEY] for entity in deleted if entity.get(ORDER_KEY)]
+            last_changed = self._latest_change(changed, None if mode == "full" else state["last_changed"])
+            self.store.apply(changed, deleted_keys, delta_link, last_changed, replace=mode == "full")
+            result = {"mode": mode, "changed": len(changed), "deleted": len(deleted_keys), "orders": len(self.store)}
+            logger.info(f"Production order sync: {result}")
+            return result
+
+
+def _to_iso(value) -> str:
+    """Normalises OData V2 /Date(ms)/ and ISO timestamps to comparable UTC ISO strings."""
+    match = V2_DATE_RE.fullmatch(str(value))
+    if match:
+        return datetime.fromtimestamp(int(match.group(1)) / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+    return str(value)
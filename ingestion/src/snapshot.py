@@ -0,0 +1,70 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from .connectors.sqlite import SQLiteConnector
+from .fastjson import dumps
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProductSnapshot:
+    """
+    An assembled catalogue, serialized once. Never mutated; a reload builds a new one.
+    Only the serialized body is kept: it is all that is served, and the products as dicts
+    would take several times its size.
+    """
+    body: bytes
+    etag: str
+    count: int
+
+
+class ProductSnapshotCache:
+    """
+    Holds the latest ProductSnapshot and rebuilds it only when the database changes.
+
+    Each `get()` checks `PRAGMA data_version` on a dedicated read-only connection;
+    it changes only when another connection (the scraper) commits. Any such commit
+    reloads the catalogue. If the result is byte-identical (the commit only touched
+    crawl checkpoints or the page cache), the current snapshot and its ETag are kept.
+    """
+    def __init__(self, connector: SQLiteConnector):
+        self.connector = connector
+        self._lock = threading.Lock()
+        self._watcher: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._snapshot: Optional[ProductSnapshot] = None
+
+    def _load(self) -> ProductSnapshot:
+        products = list(self.connector.iter_products())
+        body = dumps(products)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return ProductSnapshot(body=body, etag=etag, count=len(products))
+
+    def get(self) -> Optional[ProductSnapshot]:
+        """Current snapshot, reloaded first if the catalogue changed. None while there is no database yet."""
+        with self._lock:
+            if self._watcher is None:
+                try:
+                    self._watcher = self.connector.pool.acquire()
+                except sqlite3.OperationalError:
+                    return None
+            data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if self._snapshot is None or data_version != self._data_version:
+                try:
+                    self._watcher.execute("SELECT 1 FROM products LIMIT 1")
+                except sqlite3.OperationalError:  # scraper has not created the schema yet
+                    return None
+                snapshot = self._load()
+                if self._snapshot is None or snapshot.etag != self._snapshot.etag:
+                    logger.info(
+                        f"Loaded product snapshot {snapshot.etag}: {snapshot.count} products, "
+                        f"{len(snapshot.body)} bytes"
+                    )
+                    self._snapshot = snapshot
+                self._data_version = data_version
+            return self._snapshot
@@ -0,0 +1,237 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+import pytest
+
+# Tests import the service as the `src` package, as uvicorn does (src.main:app).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The part of the scraper's schema (scraper/main.py) that the ingestion service reads.
+CATALOGUE_SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, sku TEXT UNIQUE, barcode TEXT, name TEXT NOT NULL, url TEXT UNIQUE,
+    price REAL, currency TEXT, description_html TEXT, usage_text TEXT, warnings_text TEXT, storage_text TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME
+);
+CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, parent_id INTEGER);
+CREATE TABLE product_categories (product_id INTEGER, category_id INTEGER, PRIMARY KEY (product_id, category_id));
+CREATE TABLE product_attributes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER, attribute_key TEXT, attribute_value TEXT
+);
+CREATE TABLE product_ingredients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER, raw_text TEXT, ingredient_name TEXT,
+    amount TEXT, unit TEXT, percentage TEXT
+);
+CREATE TABLE page_cache (url TEXT PRIMARY KEY, lastmod TEXT, etag TEXT, last_modified TEXT, checked_at DATETIME);
+"""
+
+
+@pytest.fixture
+def catalogue_db(tmp_path):
+    """Path of a scraper database holding one product, written by a separate connection like the scraper's."""
+    path = str(tmp_path / "sepenatural.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(CATALOGUE_SCHEMA)
+    conn.execute(
+        "INSERT INTO products (sku, name, url, price, currency, created_at, updated_at) "
+        "VALUES ('000935-A', 'Brokoli 200 Kapsül', 'https://example.com/urun/brokoli', 789.99, 'TL', "
+        "'2026-02-12 13:17:12', '2026-02-12 13:17:12')"
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+class StubODataService:
+    """
+    In-process OData service for connector tests. Serves entity sets as V2 (`d.results`,
+    relative `d.__next`) or V4 (`value`, absolute `@odata.nextLink`) JSON and caps every
+    page at `max_page_size`, whatever the client asked for, as SAP Gateway does. Supports
+    $skip/$top/$inlinecount/$count, a `<field> gt|ge` timestamp $filter, $batch with a
+    CSRF token, and change tracking with delta tokens.
+    """
+    def __init__(self, entity_sets, keys, version=2, max_page_size=100, track_changes=True):
+        self.entity_sets = {name: list(rows) for name, rows in entity_sets.items()}
+        self.keys = keys
+        self.version = version
+        self.max_page_size = max_page_size
+        self.track_changes = track_changes
+        self.requests = []  # (method, path) of every HTTP request, $batch parts excluded
+        self.csrf_token = "token-1"
+        self._changes = []  # (change number, entity set, entity or None if deleted, key)
+        self._generation = 1  # bumped to expire every delta link issued so far
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_port}/sap/opu/odata/sap/PP_SRV"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- data changes made by tests ---
+
+    def update(self, name, entity):
+        with self._lock:
+            rows = self.entity_sets[name]
+            key = entity[self.keys[name]]
+            index = next((i for i, row in enumerate(rows) if row[self.keys[name]] == key), None)
+            if index is None:
+                rows.append(entity)
+            else:
+                rows[index] = entity
+            self._changes.append((len(self._changes) + 1, name, entity, key))
+
+    def delete(self, name, key):
+        with self._lock:
+            self.entity_sets[name] = [row for row in self.entity_sets[name] if row[self.keys[name]] != key]
+            self._changes.append((len(self._changes) + 1, name, None, key))
+
+    def expire_delta_links(self):
+        self._generation += 1
+
+    # --- responses ---
+
+    def _token_param(self):
+        return "!deltatoken" if self.version < 4 else "$deltatoken"
+
+    def _link(self, name, params, absolute):
+        link = f"{name}?{urlencode(params, safe='$!,')}"
+        return f"{self.url}/{link}" if absolute else link
+
+    def _filtered(self, name, expression):
+        rows = self.entity_sets[name]
+        if not expression:
+            return rows
+        match = re.fullmatch(r"(\w+) (gt|ge) (?:datetime)?'?([^']+)'?", expression)
+        field, op, value = match.groups()
+        return [row for row in rows if row.get(field) is not None
+                and (row[field] > value if op == "gt" else row[field] >= value)]
+
+    def _payload(self, name, entities, extra):
+        if self.version < 4:
+            return {"d": {"results": entities, **extra}}
+        return {"value": entities, **extra}
+
+    def get(self, target, prefer=""):
+        """(status, payload) for a GET of `target`, relative to the service root."""
+        parsed = urlparse(target)
+        name = unquote(parsed.path.rsplit("/", 1)[-1])
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        with self._lock:
+            if name not in self.entity_sets:
+                return 404, {"error": {"message": f"Resource not found for segment '{name}'"}}
+            if self._token_param() in params:
+                return self._delta(name, params[self._token_param()])
+
+            rows = self._filtered(name, params.get("$filter"))
+            skip = int(params.get("$skip", 0))
+            end = len(rows) if "$top" not in params else min(len(rows), skip + int(params["$top"]))
+            start = skip + int(params.get("$skiptoken", 0))
+            size = self.max_page_size
+            requested = re.search(r"odata\.maxpagesize=(\d+)", prefer)
+            if requested:
+                size = min(size, int(requested.group(1)))
+            extra = {}
+            if params.get("$inlinecount") == "allpages":
+                extra["__count"] = str(len(rows))
+            if params.get("$count") == "true":
+                extra["@odata.count"] = len(rows)
+            if start + size < end:
+                next_link = self._link(name, {**params, "$skiptoken": start + size - skip}, self.version >= 4)
+                extra["__next" if self.version < 4 else "@odata.nextLink"] = next_link
+            elif self.track_changes and "odata.track-changes" in prefer:
+                extra.update(self._delta_link(name))
+            return 200, self._payload(name, rows[start:min(start + size, end)], extra)
+
+    def _delta_link(self, name):
+        token = f"{self._generation}-{len(self._changes)}"
+        link = self._link(name, {self._token_param(): token}, self.version >= 4)
+        return {"__delta": link} if self.version < 4 else {"@odata.deltaLink": link}
+
+    def _delta(self, name, token):
+        generation, since = (int(part) for part in token.split("-"))
+        if generation != self._generation:
+            return 410, {"error": {"message": "Delta token expired"}}
+        latest = {}
+        for number, change_set, entity, key in self._changes:
+            if number > since and change_set == name:
+                latest[key] = entity
+        changed = [entity for entity in latest.values() if entity is not None]
+        removed = [key for key, entity in latest.items() if entity is None]
+        key_field = self.keys[name]
+        if self.version < 4:
+            return 200, self._payload(name, changed, {
+                "__deleted": [{key_field: key} for key in removed], **self._delta_link(name)
+            })
+        entities = changed + [{"@removed": {"reason": "deleted"}, key_field: key} for key in removed]
+        return 200, self._payload(name, entities, self._delta_link(name))
+
+    def batch(self, body):
+        parts = []
+        for target in re.findall(r"^GET (\S+) HTTP/1\.1", body, re.M):
+            status, payload = self.get(target)
+            parts.append(
+                "--batchresponse_1\r\nContent-Type: application/http\r\nContent-Transfer-Encoding: binary\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        return "".join(parts) + "--batchresponse_1--\r\n"
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def reply(self, status, body, content_type="application/json", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                service.requests.append(("GET", self.path))
+                if self.headers.get("X-CSRF-Token") == "Fetch":
+                    return self.reply(200, "{}", headers={"X-CSRF-Token": service.csrf_token})
+                target = self.path.split("/PP_SRV/", 1)[-1]
+                status, payload = service.get(target, self.headers.get("Prefer", ""))
+                self.reply(status, json.dumps(payload))
+
+            def do_POST(self):
+                service.requests.append(("POST", self.path))
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                if self.headers.get("X-CSRF-Token") != service.csrf_token:
+                    return self.reply(403, "", headers={"X-CSRF-Token": "Required"})
+                self.reply(202, service.batch(body), 'multipart/mixed; boundary="batchresponse_1"')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def odata_service():
+    """Factory for StubODataService instances; all are shut down after the test."""
+    services = []
+
+    def start(**kwargs):
+        service = StubODataService(**kwargs)
+        services.append(service)
+        return service
+
+    yield start
+    for service in services:
+        service.close()
@@ -0,0 +1,125 @@
+import asyncio
+import importlib
+import time
+
+import httpx
+import pytest
+import requests
+
+from src.connectors.odata import ODataConnector
+from src.deadline import DEADLINE_EXCEEDED_HEADER, DEADLINE_HEADER, Deadline, _deadline_var
+from src.order_store import OrderStore, OrderSync
+
+ORDER_KEYS = {"ProductionOrder": "Aufnr", "Material": "Matnr"}
+ORDERS = [{"Aufnr": f"{1000000 + i}", "Matnr": "MAT-1", "SystemStatus": "REL"} for i in range(300)]
+
+
+@pytest.fixture
+def deadline():
+    """Sets the current request's deadline `seconds` from now, as DeadlineMiddleware does."""
+    tokens = []
+
+    def set_deadline(seconds):
+        tokens.append(_deadline_var.set(Deadline(time.monotonic() + seconds)))
+
+    yield set_deadline
+    for token in reversed(tokens):
+        _deadline_var.reset(token)
+
+
+def slow(service, seconds):
+    serve = service.get
+
+    def serve_slowly(target, prefer=""):
+        time.sleep(seconds)
+        return serve(target, prefer)
+
+    service.get = serve_slowly
+
+
+def test_timeouts_are_capped_by_the_deadline(deadline):
+    connector = ODataConnector("http://sap.invalid", timeout=(5.0, 60.0))
+    assert connector._timeout() == (5.0, 60.0)
+
+    deadline(2.0)
+    connect, read = connector._timeout()
+
+    assert 1.5 < connect <= 2.0 and 1.5 < read <= 2.0
+
+
+def test_no_sap_calls_once_the_deadline_has_passed(odata_service, deadline):
+    service = odata_service(entity_sets={"ProductionOrder": ORDERS}, keys=ORDER_KEYS)
+    connector = ODataConnector(service.url, retries=0)
+    deadline(-1)
+
+    with pytest.raises(requests.Timeout):
+        list(connector.iter_entities("ProductionOrder"))
+    with pytest.raises(requests.Timeout):
+        # First pages are fetched from a thread pool, which must see the deadline too.
+        connector.fetch_entity_sets({"ProductionOrder": {"orderby": "Aufnr"}}, use_batch=False)
+
+    assert service.requests == []
+
+
+def test_slow_sap_call_gives_up_at_the_deadline(odata_service, deadline):
+    service = odata_service(entity_sets={"ProductionOrder": ORDERS}, keys=ORDER_KEYS)
+    slow(service, 2.0)
+    connector = ODataConnector(service.url, retries=0)
+    deadline(0.3)
+
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        connector.fetch_entity_sets({"ProductionOrder": {"orderby": "Aufnr"}})
+
+    assert time.monotonic() - started < 1.5
+
+
+@pytest.fixture
+def ingestion(tmp_path, monkeypatch, catalogue_db, odata_service):
+    """The ingestion app with its order store and SAP connector pointed at test doubles."""
+    monkeypatch.setenv("ORDER_STORE_PATH", str(tmp_path / "order_store.db"))
+    monkeypatch.setenv("SEPENATURAL_DB_PATH", catalogue_db)
+    main = importlib.import_module("src.main")
+    service = odata_service(entity_sets={"ProductionOrder": ORDERS}, keys=ORDER_KEYS)
+    connector = ODataConnector(service.url, retries=0)
+    store = OrderStore(str(tmp_path / "orders.db"))
+    monkeypatch.setattr(main, "connector", connector)
+    monkeypatch.setattr(main, "order_store", store)
+    monkeypatch.setattr(main, "order_sync", OrderSync(connector, store))
+    return main, service
+
+
+def get(app, path, deadline_ms):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ingestion") as client:
+            return await client.get(path, headers={DEADLINE_HEADER: str(deadline_ms)})
+    return asyncio.run(run())
+
+
+def test_order_sync_is_cut_short_by_the_callers_deadline(ingestion):
+    main, service = ingestion
+    slow(service, 2.0)
+
+    started = time.monotonic()
+    response = get(main.app, "/ingest/production-orders", deadline_ms=300)
+
+    assert time.monotonic() - started < 1.5
+    assert response.status_code == 504 and response.headers[DEADLINE_EXCEEDED_HEADER] == "true"
+
+
+def test_sap_errors_within_the_deadline_are_502(ingestion):
+    main, service = ingestion
+    service.close()
+
+    response = get(main.app, "/ingest/production-orders", deadline_ms=5000)
+
+    assert response.status_code == 502 and DEADLINE_EXCEEDED_HEADER not in response.headers
+
+
+def test_sap_errors_on_filtered_queries_are_502(ingestion):
+    main, service = ingestion
+    service.close()
+
+    response = get(main.app, "/ingest/production-orders?$filter=SystemStatus eq 'REL'", deadline_ms=5000)
+
+    assert response.status_code == 502
@@ -0,0 +1,153 @@
+import pytest
+import requests
+
+from src.connectors.odata import ODataConnector
+
+ORDER_KEYS = {"ProductionOrder": "Aufnr", "Material": "Matnr"}
+
+
+def orders(count):
+    return [{"Aufnr": f"{1000000 + i}", "Matnr": f"MAT-{i % 7}", "SystemStatus": "REL"} for i in range(count)]
+
+
+def materials(count):
+    return [{"Matnr": f"MAT-{i}", "Maktx": f"Material {i}"} for i in range(count)]
+
+
+def connector_for(service, **kwargs):
+    return ODataConnector(service.url, version=service.version, retries=0, **kwargs)
+
+
+@pytest.mark.parametrize("version", [2, 4])
+def test_iter_entities_follows_next_links_of_capped_pages(odata_service, version):
+    service = odata_service(entity_sets={"ProductionOrder": orders(2500)}, keys=ORDER_KEYS,
+                            version=version, max_page_size=100)
+    connector = connector_for(service, page_size=1000)
+
+    result = list(connector.iter_entities("ProductionOrder"))
+
+    assert [o["Aufnr"] for o in result] == [o["Aufnr"] for o in orders(2500)]
+    assert len(service.requests) == 25
+
+
+@pytest.mark.parametrize("version", [2, 4])
+def test_iter_pages_stops_at_top(odata_service, version):
+    service = odata_service(entity_sets={"ProductionOrder": orders(2500)}, keys=ORDER_KEYS,
+                            version=version, max_page_size=100)
+    connector = connector_for(service)
+
+    pages = list(connector.iter_pages("ProductionOrder", top=250))
+
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert pages[-1][-1]["Aufnr"] == "1000249"
+
+
+def test_batch_returns_payloads_in_request_order(odata_service):
+    service = odata_service(entity_sets={"ProductionOrder": orders(10), "Material": materials(5)}, keys=ORDER_KEYS)
+    connector = connector_for(service)
+
+    payloads = connector.batch([
+        ("Material", {"$format": "json", "$top": "2"}),
+        ("ProductionOrder", {"$format": "json", "$skip": "3", "$top": "2", "$inlinecount": "allpages"}),
+    ])
+
+    assert [m["Matnr"] for m in payloads[0]["d"]["results"]] == ["MAT-0", "MAT-1"]
+    assert [o["Aufnr"] for o in payloads[1]["d"]["results"]] == ["1000003", "1000004"]
+    assert ODataConnector._total_count(payloads[1]) == 10
+    assert [method for method, _ in service.requests] == ["GET", "POST"]  # CSRF token fetch, then $batch
+
+
+def test_batch_refetches_an_expired_csrf_token(odata_service):
+    service = odata_service(entity_sets={"Material": materials(5)}, keys=ORDER_KEYS)
+    connector = connector_for(service)
+    connector.batch([("Material", None)])
+
+    service.csrf_token = "token-2"
+    payloads = connector.batch([("Material", None)])
+
+    assert len(payloads[0]["d"]["results"]) == 5
+    assert [method for method, _ in service.requests] == ["GET", "POST", "POST", "GET", "POST"]
+
+
+def test_batch_part_failure_raises(odata_service):
+    service = odata_service(entity_sets={"Material": materials(5)}, keys=ORDER_KEYS)
+    connector = connector_for(service)
+
+    with pytest.raises(requests.HTTPError, match="404"):
+        connector.batch([("Material", None), ("NoSuchSet", None)])
+
+
+@pytest.mark.parametrize("version", [2, 4])
+def test_delta_links_round_trip(odata_service, version):
+    service = odata_service(entity_sets={"ProductionOrder": orders(250)}, keys=ORDER_KEYS,
+                            version=version, max_page_size=100)
+    connector = connector_for(service)
+
+    changed, deleted, delta_link = connector.fetch_changes("ProductionOrder")
+    assert len(changed) == 250 and deleted == [] and delta_link
+
+    service.update("ProductionOrder", {"Aufnr": "1000007", "Matnr": "MAT-0", "SystemStatus": "TECO"})
+    service.update("ProductionOrder", {"Aufnr": "2000000", "Matnr": "MAT-1", "SystemStatus": "CRTD"})
+    service.delete("ProductionOrder", "1000008")
+
+    changed, deleted, next_delta_link = connector.fetch_changes("ProductionOrder", delta_link=delta_link)
+    assert sorted((o["Aufnr"], o["SystemStatus"]) for o in changed) == [("1000007", "TECO"), ("2000000", "CRTD")]
+    assert [entity["Aufnr"] for entity in deleted] == ["1000008"]
+    assert next_delta_link and next_delta_link != delta_link
+
+    assert connector.fetch_changes("ProductionOrder", delta_link=next_delta_link)[:2] == ([], [])
+
+
+def test_expired_delta_link_raises(odata_service):
+    service = odata_service(entity_sets={"ProductionOrder": orders(10)}, keys=ORDER_KEYS)
+    connector = connector_for(service)
+    _, _, delta_link = connector.fetch_changes("ProductionOrder")
+
+    service.expire_delta_links()
+
+    with pytest.raises(requests.HTTPError) as error:
+        connector.fetch_changes("ProductionOrder", delta_link=delta_link)
+    assert error.value.response.status_code == 410
+
+
+@pytest.mark.parametrize("use_batch", [True, False])
+@pytest.mark.parametrize("version", [2, 4])
+def test_fetch_entity_sets_with_server_capped_pages(odata_service, version, use_batch):
+    service = odata_service(entity_sets={"ProductionOrder": orders(2500), "Material": materials(230)},
+                            keys=ORDER_KEYS, version=version, max_page_size=100)
+    connector = connector_for(service, page_size=1000)
+
+    result = connector.fetch_entity_sets(
+        {"ProductionOrder": {"orderby": "Aufnr"}, "Material": {"orderby": "Matnr", "top": 150}}, use_batch=use_batch
+    )
+
+    assert [o["Aufnr"] for o in result["ProductionOrder"]] == [o["Aufnr"] for o in orders(2500)]
+    assert [m["Matnr"] for m in result["Material"]] == [m["Matnr"] for m in materials(150)]
+
+
+def test_fetch_entity_sets_drains_next_links_of_follow_up_pages(odata_service):
+    # Follow-up pages are requested with the first page's size; if the server then returns
+    # fewer entities (a lower cap under load), each follow-up page's next link has the rest.
+    service = odata_service(entity_sets={"ProductionOrder": orders(1000)}, keys=ORDER_KEYS, max_page_size=200)
+    serve = service.get
+
+    def serve_then_lower_cap(target, prefer=""):
+        response = serve(target, prefer)
+        service.max_page_size = 70
+        return response
+
+    service.get = serve_then_lower_cap
+    connector = connector_for(service, page_size=1000)
+
+    result = connector.fetch_entity_sets({"ProductionOrder": {"orderby": "Aufnr"}}, use_batch=False)
+
+    assert [o["Aufnr"] for o in result["ProductionOrder"]] == [o["Aufnr"] for o in orders(1000)]
+
+
+def test_mock_get_entity_matches_only_the_key():
+    connector = ODataConnector("https://mock.sap.corp/odata", mock=True)
+
+    assert connector.get_entity("ProductionOrder", "1000002")["Matnr"] == "MAT-PAINT-RED"
+    assert connector.get_entity("Material", "MAT-PUMP-001")["Maktx"] == "Industrial Pump X100"
+    for value in ("PP01", "MAT-PUMP-001", "1000", "REL MSCP"):
+        assert connector.get_entity("ProductionOrder", value) is None
@@ -0,0 +1,33 @@
+import pytest
+
+from src.connectors.odata import ODataConnector
+from src.order_store import OrderStore, OrderSync
+
+KEYS = {"ProductionOrder": "Aufnr"}
+
+
+def order(aufnr, changed_at, status="REL"):
+    return {"Aufnr": aufnr, "SystemStatus": status, "ChangedAt": changed_at}
+
+
+@pytest.mark.parametrize("version", [2, 4])
+def test_changed_since_sync_picks_up_changes_in_the_same_second(odata_service, tmp_path, version):
+    # Without delta links the sync filters on ChangedAt, which SAP keeps in whole seconds.
+    service = odata_service(
+        entity_sets={"ProductionOrder": [order("1000001", "2026-03-01T10:00:00"),
+                                         order("1000002", "2026-03-01T09:00:00")]},
+        keys=KEYS, version=version, track_changes=False,
+    )
+    store = OrderStore(str(tmp_path / "orders.db"))
+    sync = OrderSync(ODataConnector(service.url, version=version, retries=0), store, change_field="ChangedAt")
+    assert sync.run_once()["mode"] == "full"
+
+    # Changed after the first sync, but within the same second as the newest order it saw.
+    service.update("ProductionOrder", order("1000002", "2026-03-01T10:00:00", status="TECO"))
+    service.update("ProductionOrder", order("1000003", "2026-03-01T10:00:00"))
+    result = sync.run_once()
+
+    assert result["mode"] == "changed_since"
+    assert store.get("1000002")["SystemStatus"] == "TECO"
+    assert store.get("1000003") is not None
+    assert len(store) == 3
@@ -0,0 +1,48 @@
+import sqlite3
+
+from src.connectors.sqlite import SQLiteConnector
+from src.fastjson import loads
+from src.snapshot import ProductSnapshotCache
+
+
+def write(path: str, *statements: str):
+    conn = sqlite3.connect(path)
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+
+
+def test_update_within_the_same_second_reloads(catalogue_db):
+    cache = ProductSnapshotCache(SQLiteConnector(catalogue_db))
+    before = cache.get()
+    assert loads(before.body)[0]["price"] == 789.99
+    assert before.count == 1
+
+    # Same updated_at as the existing row, so count/max id/max updated_at do not change.
+    write(catalogue_db, "UPDATE products SET price = 699.99 WHERE id = 1")
+
+    after = cache.get()
+    assert loads(after.body)[0]["price"] == 699.99
+    assert after.etag != before.etag
+
+
+def test_child_table_change_reloads(catalogue_db):
+    cache = ProductSnapshotCache(SQLiteConnector(catalogue_db))
+    before = cache.get()
+
+    write(catalogue_db, "INSERT INTO product_attributes (product_id, attribute_key, attribute_value) "
+                        "VALUES (1, 'Marka', 'Sepe Natural')")
+
+    after = cache.get()
+    assert loads(after.body)[0]["attributes"] == {"Marka": "Sepe Natural"}
+    assert after.etag != before.etag
+
+
+def test_commit_without_product_changes_keeps_snapshot(catalogue_db):
+    cache = ProductSnapshotCache(SQLiteConnector(catalogue_db))
+    before = cache.get()
+
+    write(catalogue_db, "INSERT INTO page_cache (url, etag) VALUES ('https://example.com/urun/brokoli', 'abc')")
+
+    assert cache.get() is before
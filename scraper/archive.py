@@ -0,0 +1,68 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import zlib
+from typing import Dict, Optional, Tuple
+
+from parsers import parse_product
+
+logger = logging.getLogger("SepenaturalScraper")
+
+ARCHIVE_DIR = "html_archive"
+
+
+class HtmlArchive:
+    """
+    Content-addressed store of raw product pages: `<root>/<sha[:2]>/<sha256>.html.gz`.
+
+    Identical pages are stored once. Which URL a blob was fetched from, and when,
+    is recorded in the `page_archive` table by the writer.
+    """
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.html.gz")
+
+    def store(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial blob.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(content, compresslevel=6))
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return digest
+
+    def load(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            return gzip.decompress(f.read())
+
+
+# Module-level helpers so they can run in ProcessPoolExecutor workers.
+
+def archive_and_parse(archive_root: Optional[str], backend: Optional[str],
+                      content: bytes, url: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """Archives a fetched page (unless `archive_root` is None) and parses it. Returns (sha256, product_data)."""
+    digest = HtmlArchive(archive_root).store(content) if archive_root else None
+    return digest, parse_product(content, url, backend)
+
+def reparse_archived(archive_root: str, backend: Optional[str], url: str, digest: str) -> Optional[Dict]:
+    """Parses an archived page without touching the network. Returns None if the blob is missing or corrupt."""
+    try:
+        content = HtmlArchive(archive_root).load(digest)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, zlib.error) as e:  # truncated or corrupt .html.gz
+        logger.error(f"Corrupt archived page {digest} for {url}: {e}")
+        return None
+    return parse_product(content, url, backend)
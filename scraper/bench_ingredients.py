@@ -0,0 +1,90 @@
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+from ingredients import clear_cache, parse_ingredients, parse_ingredients_bulk
+
+GOLDEN_FILE = "ingredients_golden.json"
+
+def load_raw_texts(db_name):
+    """Distinct ingredient lines, plus each product's lines joined back into one block."""
+    conn = sqlite3.connect(db_name)
+    try:
+        lines = [row[0] for row in conn.execute(
+            "SELECT DISTINCT raw_text FROM product_ingredients WHERE raw_text != '' ORDER BY raw_text"
+        )]
+        blocks = [row[0] for row in conn.execute(
+            "SELECT group_concat(raw_text, ', ') FROM product_ingredients GROUP BY product_id ORDER BY product_id"
+        )]
+    finally:
+        conn.close()
+    return lines + blocks
+
+def build_golden(db_name, path):
+    cases = [{"raw": raw, "expected": parse_ingredients(raw)} for raw in load_raw_texts(db_name)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cases, f, ensure_ascii=False, indent=1)
+    print(f"Wrote {len(cases)} golden cases to {path}")
+
+def check_golden(path):
+    with open(path, encoding='utf-8') as f:
+        cases = json.load(f)
+    failures = 0
+    for case in cases:
+        actual = parse_ingredients(case["raw"])
+        if actual != case["expected"]:
+            failures += 1
+            print(f"MISMATCH {case['raw']!r}\n  expected {case['expected']}\n  actual   {actual}")
+    bulk = parse_ingredients_bulk(case["raw"] for case in cases)
+    failures += sum(1 for case, actual in zip(cases, bulk) if actual != case["expected"])
+    print(f"{len(cases)} golden cases, {failures} mismatches")
+    return cases, failures
+
+def time_it(fn, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingredient parser golden check and micro-benchmark")
+    parser.add_argument("--golden", default=GOLDEN_FILE, help="Golden case file")
+    parser.add_argument("--build-golden", metavar="DB",
+                        help="Regenerate the golden file from product_ingredients.raw_text in this database")
+    parser.add_argument("--rounds", type=int, default=5, help="Timing rounds (best is reported)")
+    parser.add_argument("--repeat", type=int, default=50,
+                        help="How many times the golden inputs are repeated per round, like lines shared across SKUs")
+    args = parser.parse_args()
+
+    if args.build_golden:
+        build_golden(args.build_golden, args.golden)
+        return 0
+
+    cases, failures = check_golden(args.golden)
+    raws = [case["raw"] for case in cases] * args.repeat
+
+    def cold():
+        for raw in raws:
+            clear_cache()
+            parse_ingredients(raw)
+
+    def warm():
+        for raw in raws:
+            parse_ingredients(raw)
+
+    timings = {
+        "uncached": time_it(cold, args.rounds),
+        "cached": time_it(warm, args.rounds),
+        "bulk": time_it(lambda: parse_ingredients_bulk(raws), args.rounds),
+    }
+    for name, seconds in timings.items():
+        print(f"{name:>8}: {seconds * 1e6 / len(raws):8.2f} us/string  "
+              f"({timings['uncached'] / seconds:.1f}x vs uncached)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
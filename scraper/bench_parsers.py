@@ -0,0 +1,65 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+from parsers import PARSER_BACKENDS, parse_product
+
+def load_pages(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.html')
+        paths.extend(sorted(glob.glob(pattern)))
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append((path, f.read()))
+    return pages
+
+def time_backend(backend, pages, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for path, content in pages:
+            parse_product(content, path, backend)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse-time benchmark and parity check for the parser backends")
+    parser.add_argument("pages", nargs="+", help="Saved product pages (.html files, globs or directories)")
+    parser.add_argument("--rounds", type=int, default=3, help="Timing rounds per backend (best is reported)")
+    args = parser.parse_args()
+
+    # The parsers log every captured ingredient block; keep the benchmark output readable.
+    logging.disable(logging.INFO)
+
+    pages = load_pages(args.pages)
+    if not pages:
+        print("No pages found.")
+        return 1
+
+    backends = list(PARSER_BACKENDS)
+    reference = backends[0]
+    mismatches = 0
+    for path, content in pages:
+        expected = parse_product(content, path, reference)
+        for backend in backends[1:]:
+            actual = parse_product(content, path, backend)
+            if actual != expected:
+                mismatches += 1
+                fields = sorted(k for k in (expected or {}) if (actual or {}).get(k) != expected[k])
+                print(f"MISMATCH {backend} vs {reference}: {path} {fields}")
+
+    print(f"{len(pages)} pages, {mismatches} parity mismatches")
+    timings = {backend: time_backend(backend, pages, args.rounds) for backend in backends}
+    for backend, seconds in timings.items():
+        print(f"{backend:>6}: {seconds * 1000 / len(pages):8.2f} ms/page  "
+              f"({timings[reference] / seconds:.1f}x vs {reference})")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import asyncio
+import inspect
+import logging
+import random
+import time
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, Optional, Sized, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger("SepenaturalScraper")
+
+# Status codes worth retrying: throttling and transient server-side failures.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+PageHandler = Callable[[str, httpx.Response], Union[None, Awaitable[None]]]
+UrlSource = Union[Iterable[str], AsyncIterable[str]]
+
+
+class TokenBucket:
+    """
+    Async token bucket. `rate` tokens are added per second up to `capacity`;
+    each request consumes one token and waits when the bucket is empty.
+    """
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncCrawler:
+    """
+    Concurrent page fetcher with per-host rate limiting and bounded per-host parallelism.
+
+    - `concurrency`: number of worker tasks (total in-flight requests).
+    - `per_host`: max in-flight requests against a single host.
+    - `rate` / `burst`: token bucket per host (requests per second). The default of
+      1 req/s matches the serial scraper's `time.sleep(1)` politeness budget.
+    - `max_retries` / `backoff`: retries on transport errors and 429/5xx with
+      exponential backoff (honours `Retry-After` when present).
+    - `transport`: httpx transport to send requests through (default: the network).
+
+    Rate limits are kept across `crawl` calls on the same instance.
+    """
+    def __init__(self, headers: Optional[Dict[str, str]] = None, concurrency: int = 8,
+                 per_host: int = 4, rate: float = 1.0, burst: float = 1.0,
+                 max_retries: int = 3, backoff: float = 1.0, timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.headers = headers or {}
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.transport = transport
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _bucket(self, host: str) -> TokenBucket:
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def _slots(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    async def fetch(self, client: httpx.AsyncClient, url: str,
+                    headers: Optional[Dict[str, str]] = None) -> Optional[httpx.Response]:
+        """Fetches a single URL, retrying transient failures. Returns None when all attempts fail."""
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_retries + 1):
+            await self._bucket(host).acquire()
+            response = None
+            try:
+                async with self._slots(host):
+                    response = await client.get(url, headers=headers)
+                if response.status_code == 304:
+                    # Conditional request hit: the caller decides what "unchanged" means.
+                    return response
+                if response.status_code not in RETRYABLE_STATUSES:
+                    response.raise_for_status()
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except httpx.HTTPStatusError as e:
+                logger.error(f"Error fetching {url}: {e}")
+                return None
+            except httpx.TransportError as e:
+                reason = str(e) or e.__class__.__name__
+
+            if attempt == self.max_retries:
+                logger.error(f"Giving up on {url} after {attempt + 1} attempts: {reason}")
+                return None
+            delay = self._retry_delay(attempt, response)
+            logger.warning(f"Retrying {url} in {delay:.1f}s ({reason})")
+            await asyncio.sleep(delay)
+        return None
+
+    async def crawl(self, urls: UrlSource, handler: PageHandler,
+                    headers_for: Optional[Callable[[str], Optional[Dict[str, str]]]] = None) -> int:
+        """
+        Fetches all URLs concurrently and passes each successful (or 304) response to
+        `handler` (sync or async). `headers_for` supplies extra per-URL request headers,
+        e.g. conditional GET validators. Returns the number of pages handed to the handler.
+
+        `urls` may also be an async iterable. It is only advanced while fewer than
+        `concurrency` URLs are waiting for a worker, so a source that hands out work as it
+        is iterated (such as claiming crawl shards) is not drained ahead of the fetching.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        total = f"/{len(urls)}" if isinstance(urls, Sized) else ""
+        handled = 0
+
+        async def feed():
+            try:
+                if isinstance(urls, AsyncIterable):
+                    async for url in urls:
+                        await queue.put(url)
+                else:
+                    for url in urls:
+                        await queue.put(url)
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        async def worker(client: httpx.AsyncClient):
+            nonlocal handled
+            while True:
+                url = await queue.get()
+                if url is None:
+                    return
+                try:
+                    response = await self.fetch(client, url, headers_for(url) if headers_for else None)
+                    if response is not None:
+                        result = handler(url, response)
+                        if inspect.isawaitable(result):
+                            await result
+                        handled += 1
+                        logger.info(f"Fetched {handled}{total}: {url}")
+                except Exception as e:
+                    logger.error(f"Error handling {url}: {e}")
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=limits,
+                                     follow_redirects=True, transport=self.transport) as client:
+            feeder = asyncio.create_task(feed())
+            try:
+                await asyncio.gather(*(worker(client) for _ in range(self.concurrency)))
+            finally:
+                if not feeder.done():
+                    feeder.cancel()
+            await feeder  # re-raises a failure of the URL source
+        return handled
@@ -0,0 +1,98 @@
+import functools
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Compiled once at import instead of on every ingredient part.
+BULLET_RE = re.compile(r'^[•\-\*]\s*')
+PERCENT_RE = re.compile(r'\(?([<>≤≥=]?\s*\d+(?:[.,]\d+)?\s*%|%\s*\d+(?:[.,]\d+)?)\)?')
+AMOUNT_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*([a-zA-Z]{1,3}|softgel|kapsül|adet)$', re.I)
+NEWLINE_TABLE = str.maketrans({'\r': ' ', '\n': ' '})
+
+# Header/footer fragments such as "Beher kapsül", "Günlük miktarı", "... tutarında".
+SKIP_WORDS = ('beher', 'miktarı', 'tutar')
+
+CACHE_SIZE = 8192
+
+# Cached results are immutable tuples; callers always get fresh dicts.
+ParsedPart = Tuple[str, str, Optional[str], Optional[str], Optional[str]]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_part(part: str) -> Optional[ParsedPart]:
+    # Örn: "Standardize Kara Mürver Ekstresi (30%) 270 mg"
+    part = BULLET_RE.sub('', part)
+    lowered = part.lower()
+    if any(word in lowered for word in SKIP_WORDS):
+        return None
+
+    # 1. Yüzdeyi bul (Örn: %30, 30%, (30%), >=4%)
+    percentage = None
+    clean_part = part
+    pct_match = PERCENT_RE.search(part)
+    if pct_match:
+        percentage = pct_match.group(1).strip()
+        clean_part = part.replace(pct_match.group(0), ' ').strip()
+
+    # 2. Miktar ve Birimi bul (Örn: 270 mg, 1000mg)
+    amount = None
+    unit = None
+    name_part = clean_part
+    amt_match = AMOUNT_RE.search(clean_part)
+    if amt_match:
+        amount = amt_match.group(1).replace(',', '.')
+        unit = amt_match.group(2).strip()
+        name_part = clean_part[:amt_match.start()]
+
+    # 3. Kalan isimdir
+    name = name_part.strip().strip(' :;.,-')
+    if not (name or amount):
+        return None
+    return part, name or "Bilinmeyen", percentage, amount, unit
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_cached(raw_string: str) -> Tuple[ParsedPart, ...]:
+    parsed = []
+    # Genellikle virgülle ayrılırlar
+    for part in raw_string.translate(NEWLINE_TABLE).split(','):
+        part = part.strip()
+        if part:
+            result = _parse_part(part)
+            if result is not None:
+                parsed.append(result)
+    return tuple(parsed)
+
+
+def _as_dicts(parsed: Tuple[ParsedPart, ...]) -> List[Dict]:
+    return [
+        {"raw": raw, "name": name, "percentage": percentage, "amount": amount, "unit": unit}
+        for raw, name, percentage, amount, unit in parsed
+    ]
+
+
+def parse_ingredients(raw_string: str) -> List[Dict]:
+    """
+    Gelişmiş içerik ayrıştırma. Yüzdelik oranları ve birimleri hassas bir şekilde yakalar.
+
+    Results are memoized by raw text: the same ingredient lines repeat across many SKUs.
+    """
+    if not raw_string:
+        return []
+    return _as_dicts(_parse_cached(raw_string))
+
+
+def parse_ingredients_bulk(raw_strings: Iterable[str]) -> List[List[Dict]]:
+    """Parses many ingredient strings at once, each distinct string only once. Output order matches input."""
+    raw_strings = list(raw_strings)
+    parsed = {raw: _parse_cached(raw) for raw in set(raw_strings) if raw}
+    return [_as_dicts(parsed[raw]) if raw else [] for raw in raw_strings]
+
+
+def cache_info() -> Dict[str, Tuple]:
+    """Hit/miss statistics of the block and part caches."""
+    return {"blocks": _parse_cached.cache_info(), "parts": _parse_part.cache_info()}
+
+
+def clear_cache():
+    _parse_cached.cache_clear()
+    _parse_part.cache_clear()
@@ -1,13 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
 import sqlite3
-import re
 import time
 import logging
+import argparse
+import asyncio
+import functools
+import socket
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
+from archive import ARCHIVE_DIR, archive_and_parse, reparse_archived
+from crawler import AsyncCrawler
+from ingredients import parse_ingredients
+from parsers import DEFAULT_BACKEND, PARSER_BACKENDS, parse_product
+from pipeline import ScrapePipeline
+from search_index import SEARCH_TABLE_SQL, index_product, rebuild_search_index
+
 # Configuration & Logging setup
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +42,8 @@ def init_db():
     
     # Enable foreign keys
     cursor.execute("PRAGMA foreign_keys = ON;")
+    # WAL lets the ingestion service read while the scraper writes (persistent per DB file)
+    cursor.execute("PRAGMA journal_mode = WAL;")
 
     # 1. Products Table
     cursor.execute('''
@@ -47,9 +59,16 @@ def init_db():
             usage_text TEXT,
             warnings_text TEXT,
             storage_text TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    # Databases created before updated_at existed (ALTER TABLE cannot use a CURRENT_TIMESTAMP default)
+    if 'updated_at' not in {row[1] for row in cursor.execute("PRAGMA table_info(products)")}:
+        cursor.execute("ALTER TABLE products ADD COLUMN updated_at DATETIME")
+    # The upsert always sets updated_at; backfill rows inserted without it by earlier versions.
+    cursor.execute("UPDATE products SET updated_at = created_at WHERE updated_at IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at)")
 
     # 2. Categories Table
     cursor.execute('''
@@ -97,6 +116,55 @@ def init_db():
         )
     ''')
 
+    # Child-table lookups by product (API reads, and the writer's delete-and-rebuild).
+    # product_categories is already covered by its (product_id, category_id) primary key.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_attributes_product_id ON product_attributes (product_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_ingredients_product_id ON product_ingredients (product_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_categories_category_id ON product_categories (category_id)")
+
+    # 6. HTTP cache metadata per product URL (incremental recrawl)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS page_cache (
+            url TEXT PRIMARY KEY,
+            lastmod TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            checked_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 7. Raw HTML archive index (blobs live in the content-addressed archive directory)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS page_archive (
+            url TEXT,
+            sha256 TEXT,
+            fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (url, sha256)
+        )
+    ''')
+
+    # 8. Crawl checkpoints: per-URL progress of the current crawl, shared by all scraper processes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            url TEXT PRIMARY KEY,
+            lastmod TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            claimed_by TEXT,
+            claimed_at DATETIME,
+            fetched_at DATETIME
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_state_status ON crawl_state (status)")
+
+    # 9. Full-text search index over products (FTS5, Turkish-folded text), kept up to date by ProductWriter
+    cursor.execute(SEARCH_TABLE_SQL)
+    if cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM product_search)").fetchone()[0]:
+        indexed = rebuild_search_index(conn)
+        if indexed:
+            logger.info(f"Built search index for {indexed} existing products.")
+
     conn.commit()
     conn.close()
     logger.info("Database initialized successfully.")
@@ -104,14 +172,15 @@ def init_db():
 # --- SCRAPING & PARSING LOGIC ---
 
 class SepenaturalScraper:
-    def __init__(self):
+    def __init__(self, parser_backend: Optional[str] = None):
+        self.parser_backend = parser_backend
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         })
 
-    def get_product_urls(self) -> List[str]:
-        """Fetches all product URLs from the sitemap."""
+    def get_sitemap_entries(self) -> List[Tuple[str, Optional[str]]]:
+        """Fetches all product URLs from the sitemap together with their <lastmod> (if any)."""
         logger.info(f"Fetching sitemap: {PRODUCT_SITEMAP_URL}")
         try:
             response = self.session.get(PRODUCT_SITEMAP_URL)
@@ -119,335 +188,568 @@ class SepenaturalScraper:
             root = ET.fromstring(response.content)
             # Handle XML namespaces
             namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-            urls = [url.find('ns:loc', namespace).text for url in root.findall('ns:url', namespace)]
-            logger.info(f"Found {len(urls)} product URLs in sitemap.")
-            return urls
+            entries = []
+            for url in root.findall('ns:url', namespace):
+                lastmod = url.findtext('ns:lastmod', default=None, namespaces=namespace)
+                entries.append((url.find('ns:loc', namespace).text, lastmod.strip() if lastmod else None))
+            logger.info(f"Found {len(entries)} product URLs in sitemap.")
+            return entries
         except Exception as e:
             logger.error(f"Failed to fetch sitemap: {e}")
             return []
 
+    def get_product_urls(self) -> List[str]:
+        """Fetches all product URLs from the sitemap."""
+        return [url for url, _ in self.get_sitemap_entries()]
+
     def parse_ingredients(self, raw_string: str) -> List[Dict]:
-        """
-        Gelişmiş içerik ayrıştırma. Yüzdelik oranları ve birimleri hassas bir şekilde yakalar.
-        """
-        if not raw_string:
-            return []
-        
-        # Temizlik
-        raw_string = raw_string.replace('\r', ' ').replace('\n', ' ')
-        
-        # Genellikle virgülle ayrılırlar
-        parts = [p.strip() for p in raw_string.split(',') if p.strip()]
-        
-        ingredients = []
-        for part in parts:
-            # Örn: "Standardize Kara Mürver Ekstresi (30%) 270 mg"
-            
-            # Başta olabilecek işaretleri temizle
-            part = re.sub(r'^[•\-\*]\s*', '', part)
-            if any(x in part.lower() for x in ['beher', 'miktarı', 'tutar']):
-                continue
-            
-            # 1. Yüzdeyi bul (Örn: %30, 30%, (30%), >=4%)
-            percentage = None
-            pct_match = re.search(r'\(?([<>≤≥=]?\s*\d+(?:[.,]\d+)?\s*%|%\s*\d+(?:[.,]\d+)?)\)?', part)
-            if pct_match:
-                percentage = pct_match.group(1).strip()
-                # İsmi temizlemek için yüzde kısmını çıkar
-                clean_part = part.replace(pct_match.group(0), ' ').strip()
-            else:
-                clean_part = part
-            
-            # 2. Miktar ve Birimi bul (Örn: 270 mg, 1000mg)
-            amount = None
-            unit = None
-            amt_match = re.search(r'(\d+(?:[.,]\d+)?)\s*([a-zA-Z]{1,3}|softgel|kapsül|adet)$', clean_part, re.I)
-            if amt_match:
-                amount = amt_match.group(1).replace(',', '.')
-                unit = amt_match.group(2).strip()
-                name_part = clean_part[:amt_match.start()].strip()
-            else:
-                name_part = clean_part
-
-            # 3. Kalan isimdir
-            name = name_part.strip(' :;.,-')
-            
-            if name or amount:
-                ingredients.append({
-                    "raw": part,
-                    "name": name if name else "Bilinmeyen",
-                    "percentage": percentage,
-                    "amount": amount,
-                    "unit": unit
-                })
-        return ingredients
+        return parse_ingredients(raw_string)
 
-    def scrape_product(self, url: str) -> Optional[Dict]:
-        """Scrapes a single product page with robust selection logic."""
+    def fetch_product(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """Fetches a product page. A 304 response is returned as-is for conditional requests."""
         try:
             time.sleep(1) # Politeness
-            response = self.session.get(url)
+            response = self.session.get(url, headers=headers)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Core Data
-            name_tag = soup.find('h1', {'class': 'product-name'}) or soup.find('h1')
-            name = name_tag.text.strip() if name_tag else "N/A"
-            
-            # Categories (Breadcrumbs)
-            categories = []
-            breadcrumb_tags = soup.find_all(['div', 'nav', 'ul'], class_=re.compile(r'breadcrumb|path', re.I))
-            for bt in breadcrumb_tags:
-                links = bt.find_all('a')
-                for link in links:
-                    cat_name = link.text.strip()
-                    if cat_name and cat_name.lower() not in ['anasayfa', 'home']:
-                        categories.append(cat_name)
-                if categories: break
-            
-            # If no breadcrumb container, try any links in parent containers above H1
-            if not categories:
-                parent = name_tag.parent if name_tag else None
-                while parent and not categories:
-                    links = parent.find_all('a')
-                    for l in links:
-                        c_name = l.text.strip()
-                        if c_name and c_name.lower() not in ['anasayfa', 'home'] and l.get('href', '').find('/kategori/') != -1:
-                            categories.append(c_name)
-                    parent = parent.parent
-
-            # Price (Primary Selector: Schema.org meta tags)
-            price_meta = soup.find('meta', {'itemprop': 'price'})
-            curr_meta = soup.find('meta', {'itemprop': 'priceCurrency'})
-            
-            price = 0.0
-            if price_meta:
-                try:
-                    price_val = price_meta.get('content', '0').replace(',', '.')
-                    price = float(re.sub(r'[^\d.]', '', price_val))
-                except ValueError: pass
-            
-            currency = curr_meta.get('content', 'TL') if curr_meta else "TL"
-            if currency == "TRY": currency = "TL"
-
-            # SKU & Barcode
-            sku = "N/A"
-            barcode = "N/A"
-            sku_tag = (soup.find(None, {'itemprop': 'sku'}) or 
-                       soup.find(None, {'itemprop': 'barcode'}) or
-                       soup.find(class_='product-barcode'))
-            
-            if sku_tag:
-                sku = sku_tag.text.strip()
-                barcode = sku
-            
-            info_area = soup.find(['div', 'ul'], class_=re.compile(r'codes|attributes|info', re.I))
-            if info_area:
-                info_text = info_area.text
-                sku_m = re.search(r'(?:SKU|Kod|Stok):\s*([a-zA-Z\d-]+)', info_text, re.I)
-                bar_m = re.search(r'(?:Barkod|EAN):\s*(\d+)', info_text, re.I)
-                if sku_m: sku = sku_m.group(1)
-                if bar_m: barcode = bar_m.group(1)
-
-            # --- Description Anchors ---
-            def get_section(keywords):
-                results = []
-                # Search for all elements matching any keyword
-                anchors = soup.find_all(['span', 'strong', 'h1', 'h2', 'h3', 'h4', 'b', 'div', 'p'], string=re.compile('|'.join(keywords), re.I))
-                
-                for anchor in anchors:
-                    curr = anchor
-                    for _ in range(5):
-                        nxt = curr.find_next(['div', 'p', 'span', 'ul', 'li'])
-                        if not nxt: break
-                        txt = nxt.get_text(strip=True)
-                        if len(txt) < 15: 
-                            curr = nxt
-                            continue
-                        # Use a score based on number of ingredient-like patterns
-                        matches = re.findall(r'\d+\s*(mg|g|ml|%)', txt, re.I)
-                        score = len(matches)
-                        if score > 0:
-                            results.append((score, txt))
-                        curr = nxt
-                
-                if results:
-                    # Return the one with the most matches (the most detailed ingredient list)
-                    results.sort(key=lambda x: x[0], reverse=True)
-                    return results[0][1]
-                return ""
-
-            # Improved Description Extraction
-            description_tag = (
-                soup.find('div', id=re.compile(r'description|details|tab', re.I)) or
-                soup.find('div', class_=re.compile(r'product-detail|product-feature|product-details|description', re.I)) or
-                soup.find('div', id='product-details') or
-                soup.find('div', class_='product-description')
-            )
-            
-            description_html = ""
-            if description_tag:
-                # Clean up if it's a huge container
-                description_html = str(description_tag)
-
-            data = {
-                "name": name, "sku": sku, "barcode": barcode, "price": price, 
-                "currency": currency, "url": url, "categories": categories,
-                "description_html": description_html,
-                "usage_text": get_section(['Kullanım Önerisi', 'Nasıl Kullanılır', 'Kullanımı']),
-                "warnings_text": get_section(['Uyarılar', 'Önemli Uyarılar', 'Dikkat']),
-                "storage_text": get_section(['Muhafaza', 'Saklama', 'Depolama']),
-                "attributes": {}, "ingredients": []
-            }
-
-            # --- Attribute Extraction (Technical Specs) ---
-            # Try IdeaSoft specific list pattern first
-            attr_rows = soup.find_all('div', class_='product-list-row')
-            if attr_rows:
-                for row in attr_rows:
-                    title_tag = row.find(['div', 'span'], class_='product-list-title')
-                    content_tag = row.find(['div', 'span'], class_='product-list-content')
-                    if title_tag and content_tag:
-                        key = title_tag.text.strip().replace(':', '')
-                        val = content_tag.text.strip()
-                        if key and val and len(key) < 50:
-                            data["attributes"][key] = val
-            
-            # Fallback to general containers if nothing found
-            if not data["attributes"]:
-                attr_container = (soup.find('table', class_=re.compile(r'specs|attributes', re.I)) or 
-                                  soup.find('ul', class_=re.compile(r'specs|features|attributes', re.I)) or
-                                  soup.find('div', class_=re.compile(r'product-info', re.I)))
-                
-                if attr_container:
-                    for row in attr_container.find_all(['tr', 'li', 'div'], recursive=False if attr_container.name != 'div' else True):
-                        cols = row.find_all(['td', 'span', 'strong'], recursive=True)
-                        if len(cols) >= 2:
-                            key = cols[0].text.strip().replace(':', '')
-                            val = cols[1].text.strip()
-                            if key and val and len(key) < 50:
-                                data["attributes"][key] = val
-                        elif ':' in row.text:
-                            parts = row.text.split(':', 1)
-                            key, val = parts[0].strip(), parts[1].strip()
-                            if key and val and len(key) < 50:
-                                data["attributes"][key] = val
-
-            # Ingredients Search (Broader)
-            ing_marker = soup.find(['div', 'span', 'strong', 'h3', 'h4'], string=re.compile(r'İçindekiler|Beher|Bileşen|İçerik', re.I))
-            if ing_marker:
-                # Try finding a table or a list nearby
-                ing_container = ing_marker.find_next(['table', 'ul', 'div', 'p']) or ing_marker.parent
-                ing_text = ing_container.text.strip()
-                # If table, handle rows specially
-                if ing_container.name == 'table':
-                    ing_text = " | ".join([row.text.strip().replace('\n', ' ') for row in ing_container.find_all('tr')])
-                
-                logger.info(f"Captured ingredient text for {sku}: {ing_text[:100]}...")
-                data["ingredients"] = self.parse_ingredients(ing_text)
-            else:
-                # Last resort: search for keywords anywhere and take the block
-                for kw in ['İçindekiler', 'Beher', 'Bileşen']:
-                    found = soup.find(string=re.compile(kw, re.I))
-                    if found and len(found.parent.text) > 20:
-                        data["ingredients"] = self.parse_ingredients(found.parent.text)
-                        break
-
-            return data
-
+            return response
         except Exception as e:
             logger.error(f"Error scraping {url}: {e}")
             return None
 
+    def scrape_product(self, url: str) -> Optional[Dict]:
+        """Scrapes a single product page with robust selection logic."""
+        response = self.fetch_product(url)
+        if response is None:
+            return None
+        return self.parse_product(response.content, url)
+
+    def parse_product(self, content: bytes, url: str) -> Optional[Dict]:
+        """Extracts product data from an already fetched product page."""
+        return parse_product(content, url, self.parser_backend)
+
 # --- DATABASE OPERATIONS ---
 
-def save_product(product_data: Dict):
-    """Inserts or updates product data and categories."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("SELECT id FROM products WHERE sku = ? OR url = ?", (product_data['sku'], product_data['url']))
-        existing = cursor.fetchone()
-        
-        if existing:
-            product_id = existing[0]
-            cursor.execute('''
-                UPDATE products SET 
-                sku=?, barcode=?, name=?, url=?, price=?, currency=?, 
-                description_html=?, usage_text=?, warnings_text=?, storage_text=?
-                WHERE id=?
-            ''', (
-                product_data['sku'], product_data['barcode'], product_data['name'], product_data['url'], 
-                product_data['price'], product_data['currency'], product_data['description_html'],
-                product_data['usage_text'], product_data['warnings_text'], product_data['storage_text'],
-                product_id
-            ))
-        else:
-            cursor.execute('''
-                INSERT INTO products 
-                (sku, barcode, name, url, price, currency, description_html, usage_text, warnings_text, storage_text)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                product_data['sku'], product_data['barcode'], product_data['name'], 
+PRODUCT_UPSERT_SQL = '''
+    INSERT INTO products
+    (sku, barcode, name, url, price, currency, description_html, usage_text, warnings_text, storage_text, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(url) DO UPDATE SET
+        sku=excluded.sku, barcode=excluded.barcode, name=excluded.name, price=excluded.price,
+        currency=excluded.currency, description_html=excluded.description_html,
+        usage_text=excluded.usage_text, warnings_text=excluded.warnings_text, storage_text=excluded.storage_text,
+        updated_at=CURRENT_TIMESTAMP
+    ON CONFLICT(sku) DO UPDATE SET
+        barcode=excluded.barcode, name=excluded.name, url=excluded.url, price=excluded.price,
+        currency=excluded.currency, description_html=excluded.description_html,
+        usage_text=excluded.usage_text, warnings_text=excluded.warnings_text, storage_text=excluded.storage_text,
+        updated_at=CURRENT_TIMESTAMP
+    RETURNING id
+'''
+
+PAGE_CACHE_UPSERT_SQL = '''
+    INSERT INTO page_cache (url, lastmod, etag, last_modified, checked_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(url) DO UPDATE SET
+        lastmod = excluded.lastmod,
+        etag = COALESCE(excluded.etag, page_cache.etag),
+        last_modified = COALESCE(excluded.last_modified, page_cache.last_modified),
+        checked_at = CURRENT_TIMESTAMP
+'''
+
+class ProductWriter:
+    """
+    Persistent, batched writer for scraped products.
+
+    Keeps one connection open in WAL mode (readers such as the ingestion service are
+    not blocked while the scraper writes), upserts products, resolves category ids
+    from an in-memory cache and commits every `batch_size` products instead of once
+    per product. Each product is written inside a savepoint, so one bad record is
+    rolled back and logged without losing the rest of the batch. A batch is also
+    committed once it is `max_batch_age` seconds old, so the write lock is never
+    held long enough to starve other scraper processes sharing the database.
+
+    Not thread-safe: use it from a single thread (the pipeline's writer thread).
+    """
+    def __init__(self, db_name: str = DB_NAME, batch_size: int = 100, max_batch_age: float = 2.0):
+        self.batch_size = max(1, batch_size)
+        self.max_batch_age = max_batch_age
+        # Created on the caller's thread but used from the pipeline writer thread.
+        self.conn = sqlite3.connect(db_name, timeout=30, check_same_thread=False)
+        self.conn.isolation_level = None  # explicit transactions below
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.category_ids: Dict[str, int] = dict(self.conn.execute("SELECT name, id FROM categories"))
+        self.pending = 0
+        self.batch_started = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _begin(self):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+            self.batch_started = time.monotonic()
+
+    def _maybe_commit(self):
+        if self.pending >= self.batch_size or time.monotonic() - self.batch_started >= self.max_batch_age:
+            self.commit()
+
+    def _category_id(self, cursor: sqlite3.Cursor, name: str) -> int:
+        cat_id = self.category_ids.get(name)
+        if cat_id is None:
+            cursor.execute(
+                "INSERT INTO categories (name) VALUES (?) ON CONFLICT(name) DO UPDATE SET name=excluded.name RETURNING id",
+                (name,),
+            )
+            cat_id = self.category_ids[name] = cursor.fetchone()[0]
+        return cat_id
+
+    def save_product(self, product_data: Dict) -> bool:
+        """Queues a product write; commits when the batch is full. Returns False if the product failed."""
+        self._begin()
+        cursor = self.conn.cursor()
+        cursor.execute("SAVEPOINT product")
+        try:
+            cursor.execute(PRODUCT_UPSERT_SQL, (
+                product_data['sku'], product_data['barcode'], product_data['name'],
                 product_data['url'], product_data['price'], product_data['currency'],
-                product_data['description_html'], product_data['usage_text'], 
+                product_data['description_html'], product_data['usage_text'],
                 product_data['warnings_text'], product_data['storage_text']
             ))
-            product_id = cursor.lastrowid
-
-        # --- Categories ---
-        cursor.execute("DELETE FROM product_categories WHERE product_id = ?", (product_id,))
-        for cat_name in product_data.get('categories', []):
-            cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (cat_name,))
-            cursor.execute("SELECT id FROM categories WHERE name = ?", (cat_name,))
-            cat_id = cursor.fetchone()[0]
-            cursor.execute("INSERT OR IGNORE INTO product_categories (product_id, category_id) VALUES (?, ?)", (product_id, cat_id))
-
-        # Clear and rebuild attributes
-        cursor.execute("DELETE FROM product_attributes WHERE product_id = ?", (product_id,))
-        for key, val in product_data['attributes'].items():
-            cursor.execute("INSERT INTO product_attributes (product_id, attribute_key, attribute_value) VALUES (?, ?, ?)",
-                           (product_id, key, val))
-
-        # Clear and rebuild ingredients
-        cursor.execute("DELETE FROM product_ingredients WHERE product_id = ?", (product_id,))
-        for ing in product_data['ingredients']:
-            cursor.execute('''
+            product_id = cursor.fetchone()[0]
+
+            # Clear and rebuild categories, attributes and ingredients
+            cursor.execute("DELETE FROM product_categories WHERE product_id = ?", (product_id,))
+            cursor.execute("DELETE FROM product_attributes WHERE product_id = ?", (product_id,))
+            cursor.execute("DELETE FROM product_ingredients WHERE product_id = ?", (product_id,))
+
+            cat_ids = [self._category_id(cursor, name) for name in product_data.get('categories', [])]
+            cursor.executemany(
+                "INSERT OR IGNORE INTO product_categories (product_id, category_id) VALUES (?, ?)",
+                [(product_id, cat_id) for cat_id in cat_ids],
+            )
+            cursor.executemany(
+                "INSERT INTO product_attributes (product_id, attribute_key, attribute_value) VALUES (?, ?, ?)",
+                [(product_id, key, val) for key, val in product_data['attributes'].items()],
+            )
+            cursor.executemany('''
                 INSERT INTO product_ingredients (product_id, raw_text, ingredient_name, amount, unit, percentage)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (product_id, ing['raw'], ing['name'], ing['amount'], ing['unit'], ing['percentage']))
+            ''', [
+                (product_id, ing['raw'], ing['name'], ing['amount'], ing['unit'], ing['percentage'])
+                for ing in product_data['ingredients']
+            ])
+            index_product(cursor, product_id, product_data)
+            cursor.execute("RELEASE SAVEPOINT product")
+        except Exception as e:
+            logger.error(f"DB Error for SKU {product_data['sku']}: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT product")
+            cursor.execute("RELEASE SAVEPOINT product")
+            # Categories inserted in the rolled back savepoint no longer exist.
+            self.category_ids = dict(self.conn.execute("SELECT name, id FROM categories"))
+            return False
+
+        self.pending += 1
+        self._maybe_commit()
+        return True
+
+    def save_page_cache(self, url: str, lastmod: Optional[str], headers=None):
+        """Records sitemap lastmod and response validators for a URL. `headers=None` keeps the stored validators."""
+        etag = headers.get('ETag') if headers is not None else None
+        last_modified = headers.get('Last-Modified') if headers is not None else None
+        self._begin()
+        try:
+            self.conn.execute(PAGE_CACHE_UPSERT_SQL, (url, lastmod, etag, last_modified))
+        except Exception as e:
+            logger.error(f"DB Error updating page cache for {url}: {e}")
+
+    def record_archive(self, url: str, digest: str):
+        """Records that `url` was fetched now and its body is archived under `digest`."""
+        self._begin()
+        self.conn.execute('''
+            INSERT INTO page_archive (url, sha256, fetched_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(url, sha256) DO UPDATE SET fetched_at = CURRENT_TIMESTAMP
+        ''', (url, digest))
+
+    def mark_crawled(self, url: str, error: Optional[str] = None):
+        """Checkpoints a claimed URL as done, or as failed with `error`, in the same transaction as its data."""
+        self._begin()
+        if error is None:
+            self.conn.execute(
+                "UPDATE crawl_state SET status = 'done', last_error = NULL, claimed_by = NULL, "
+                "fetched_at = CURRENT_TIMESTAMP WHERE url = ?", (url,)
+            )
+        else:
+            self.conn.execute(
+                "UPDATE crawl_state SET status = 'failed', attempts = attempts + 1, last_error = ?, "
+                "claimed_by = NULL WHERE url = ?", (error, url)
+            )
+        self._maybe_commit()
+
+    def commit(self):
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+class CrawlState:
+    """
+    Resumable, shardable crawl progress stored in the `crawl_state` table.
+
+    A crawl seeds one `pending` row per URL. Scraper processes then repeatedly
+    claim fixed-size shards of pending URLs (an atomic UPDATE ... RETURNING), so
+    several processes can split one sitemap without overlapping work. The writer
+    marks each URL `done` or `failed` as it is persisted. A crawl that dies midway
+    leaves its rows pending or claimed and the next run resumes from there; claims
+    older than `lease` seconds, or held by this `worker_id`, are handed out again.
+    """
+    def __init__(self, worker_id: str, lease: float = 1800, db_name: str = DB_NAME):
+        self.worker_id = worker_id
+        self.lease = lease
+        # The async crawl claims shards from a worker thread; calls are never concurrent.
+        self.conn = sqlite3.connect(db_name, timeout=30, check_same_thread=False)
+        self.conn.isolation_level = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.close()
+
+    def _outstanding(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM crawl_state WHERE status IN ('pending', 'claimed')"
+        ).fetchone()[0]
+
+    def prepare(self, retry_failed: bool = False, max_attempts: int = 3) -> int:
+        """Releases this worker's stale claims and optionally requeues failures. Returns the outstanding URL count."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE crawl_state SET status = 'pending', claimed_by = NULL "
+                "WHERE status = 'claimed' AND claimed_by = ?", (self.worker_id,)
+            )
+            if retry_failed:
+                self.conn.execute(
+                    "UPDATE crawl_state SET status = 'pending' WHERE status = 'failed' AND attempts < ?",
+                    (max_attempts,)
+                )
+            outstanding = self._outstanding()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return outstanding
+
+    def seed(self, entries: List[Tuple[str, Optional[str]]]) -> bool:
+        """Starts a new crawl over `entries` unless another process already started one. Returns True if seeded."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._outstanding():
+                self.conn.execute("COMMIT")
+                return False
+            self.conn.executemany('''
+                INSERT INTO crawl_state (url, lastmod, status, attempts) VALUES (?, ?, 'pending', 0)
+                ON CONFLICT(url) DO UPDATE SET
+                    lastmod = excluded.lastmod, status = 'pending', attempts = 0,
+                    last_error = NULL, claimed_by = NULL, claimed_at = NULL
+            ''', entries)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def claim(self, size: int) -> List[Tuple[str, Optional[str]]]:
+        """Atomically claims up to `size` pending (or expired) URLs for this worker."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute('''
+                UPDATE crawl_state SET status = 'claimed', claimed_by = ?, claimed_at = CURRENT_TIMESTAMP
+                WHERE url IN (
+                    SELECT url FROM crawl_state
+                    WHERE status = 'pending' OR (status = 'claimed' AND claimed_at < datetime('now', ?))
+                    ORDER BY url LIMIT ?
+                )
+                RETURNING url, lastmod
+            ''', (self.worker_id, f"-{int(self.lease)} seconds", max(1, size))).fetchall()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return sorted(rows)
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM crawl_state GROUP BY status"))
 
-        conn.commit()
-    except Exception as e:
-        logger.error(f"DB Error for SKU {product_data['sku']}: {e}")
-        conn.rollback()
+def save_product(product_data: Dict):
+    """Inserts or updates a single product. Use ProductWriter when saving many."""
+    with ProductWriter(batch_size=1) as writer:
+        writer.save_product(product_data)
+
+def load_page_cache() -> Dict[str, Dict]:
+    """Returns the stored HTTP cache metadata keyed by URL."""
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute("SELECT url, lastmod, etag, last_modified FROM page_cache").fetchall()
+        return {row['url']: dict(row) for row in rows}
+    finally:
+        conn.close()
+
+def load_archived_pages() -> List[Tuple[str, str]]:
+    """Returns (url, sha256) of the most recently fetched archived page for every URL."""
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        return conn.execute('''
+            SELECT url, sha256 FROM (
+                SELECT url, sha256, ROW_NUMBER() OVER (PARTITION BY url ORDER BY fetched_at DESC) AS rn
+                FROM page_archive
+            ) WHERE rn = 1 ORDER BY url
+        ''').fetchall()
     finally:
         conn.close()
 
+def conditional_headers(cached: Optional[Dict]) -> Dict[str, str]:
+    """Builds If-None-Match / If-Modified-Since headers from stored validators."""
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
 # --- MAIN EXECUTION ---
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sepenatural product scraper")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Run the pipelined scraper: concurrent fetch, parallel parse, single writer")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Number of concurrent fetch workers in async mode")
+    parser.add_argument("--per-host", type=int, default=4,
+                        help="Max in-flight requests per host in async mode")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Requests per second per host in async mode (token bucket)")
+    parser.add_argument("--burst", type=float, default=1.0,
+                        help="Token bucket capacity per host in async mode")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries with exponential backoff for transient fetch errors")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Parser processes in async mode (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Bound of the queues between pipeline stages in async mode")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND,
+                        help="HTML parser backend used to extract product data")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="Products written per SQLite transaction")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR,
+                        help="Directory of the compressed, content-addressed raw HTML archive")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="Do not archive fetched product pages")
+    parser.add_argument("--reparse", action="store_true",
+                        help="Rebuild product tables from the HTML archive without fetching anything")
+    parser.add_argument("--shard-size", type=int, default=100,
+                        help="URLs claimed from the crawl checkpoint table at a time")
+    parser.add_argument("--worker-id", default=socket.gethostname(),
+                        help="Name of this scraper process in crawl_state (must differ per process on one host)")
+    parser.add_argument("--lease", type=float, default=1800,
+                        help="Seconds after which another process may take over an unfinished shard")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Only re-crawl URLs that failed in the last crawl")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="Give up on a URL after this many failed attempts with --retry-failed")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore stored lastmod/ETag/Last-Modified and re-fetch every product")
+    return parser.parse_args(argv)
+
+def plan_crawl(entries: List[Tuple[str, Optional[str]]], cache: Dict[str, Dict],
+               stats: Dict[str, int], full: bool = False) -> List[Tuple[str, Optional[str]]]:
+    """Drops URLs whose sitemap <lastmod> matches the one stored on the last successful fetch."""
+    if full:
+        return entries
+    planned = []
+    for url, lastmod in entries:
+        cached = cache.get(url)
+        if lastmod and cached and cached.get('lastmod') == lastmod:
+            stats['skipped'] += 1
+            continue
+        planned.append((url, lastmod))
+    return planned
+
+def crawl_serial(scraper: SepenaturalScraper, writer: ProductWriter, entries: List[Tuple[str, Optional[str]]],
+                 cache: Dict[str, Dict], stats: Dict[str, int], archive_dir: Optional[str]) -> int:
+    count = 0
+    for i, (url, lastmod) in enumerate(entries):
+        logger.info(f"Processing URL {i+1}/{len(entries)}: {url}")
+        response = scraper.fetch_product(url, headers=conditional_headers(cache.get(url)))
+        if response is None:
+            stats['failed'] += 1
+            writer.mark_crawled(url, "fetch failed")
+            continue
+        if response.status_code == 304:
+            stats['not_modified'] += 1
+            writer.save_page_cache(url, lastmod)
+            writer.mark_crawled(url)
+            continue
+
+        digest, product_data = archive_and_parse(archive_dir, scraper.parser_backend, response.content, url)
+        if digest:
+            writer.record_archive(url, digest)
+        if product_data and writer.save_product(product_data):
+            writer.save_page_cache(url, lastmod, response.headers)
+            writer.mark_crawled(url)
+            stats['parsed'] += 1
+            count += 1
+        else:
+            stats['failed'] += 1
+            writer.mark_crawled(url, "parse or write failed")
+    return count
+
+def crawl_async(scraper: SepenaturalScraper, writer: ProductWriter, state: CrawlState,
+                cache: Dict[str, Dict], stats: Dict[str, int], archive_dir: Optional[str],
+                args: argparse.Namespace) -> int:
+    """
+    Crawls every shard this worker can claim through one pipeline, so the parser processes,
+    per-host rate limits and HTTP connections are shared by the whole run. The next shard is
+    claimed when the fetch stage runs low on URLs rather than after the previous one drains.
+    """
+    crawler = AsyncCrawler(
+        headers=dict(scraper.session.headers),
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        rate=args.rate,
+        burst=args.burst,
+        max_retries=args.retries,
+    )
+    lastmods: Dict[str, Optional[str]] = {}
+    written = set()
+    count = 0
+
+    async def claimed_urls():
+        while True:
+            shard = await asyncio.to_thread(state.claim, args.shard_size)
+            if not shard:
+                return
+            logger.info(f"Worker {args.worker_id} claimed a shard of {len(shard)} URLs")
+            lastmods.update(shard)
+            for url, _ in shard:
+                yield url
+
+    def write_result(url: str, status: int, parsed: Optional[Tuple], headers):
+        # Runs on the pipeline's single writer thread.
+        nonlocal count
+        written.add(url)
+        digest, product_data = parsed or (None, None)
+        if digest:
+            writer.record_archive(url, digest)
+        if status == 304:
+            stats['not_modified'] += 1
+            writer.save_page_cache(url, lastmods.get(url))
+            writer.mark_crawled(url)
+        elif product_data and writer.save_product(product_data):
+            writer.save_page_cache(url, lastmods.get(url), headers)
+            writer.mark_crawled(url)
+            stats['parsed'] += 1
+            count += 1
+        else:
+            stats['failed'] += 1
+            writer.mark_crawled(url, "parse or write failed")
+
+    pipeline = ScrapePipeline(
+        crawler, functools.partial(archive_and_parse, archive_dir, scraper.parser_backend), write_result,
+        parse_workers=args.parse_workers, queue_size=args.queue_size,
+    )
+    fetched = asyncio.run(pipeline.run(
+        claimed_urls(), headers_for=lambda url: conditional_headers(cache.get(url))
+    ))
+    stats['failed'] += len(lastmods) - fetched
+    for url in lastmods:
+        if url not in written:
+            writer.mark_crawled(url, "fetch failed")
+    return count
+
+def reparse(writer: ProductWriter, args: argparse.Namespace) -> int:
+    """Re-extracts every archived page in parallel and rewrites the product tables."""
+    pages = load_archived_pages()
+    logger.info(f"Re-parsing {len(pages)} archived pages from {args.archive_dir}")
+    count = 0
+    with ProcessPoolExecutor(max_workers=args.parse_workers) as pool:
+        parse = functools.partial(reparse_archived, args.archive_dir, args.parser)
+        results = pool.map(parse, [url for url, _ in pages], [digest for _, digest in pages], chunksize=8)
+        for (url, _), product_data in zip(pages, results):
+            if product_data and writer.save_product(product_data):
+                count += 1
+            else:
+                logger.warning(f"Could not re-parse archived page for {url}")
+    return count
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
     logger.info("Starting Sepenatural Scraper...")
     init_db()
-    
-    scraper = SepenaturalScraper()
-    urls = scraper.get_product_urls()
-    
-    if not urls:
-        logger.warning("No URLs found. Exiting.")
-        return
 
-    count = 0
-    for url in urls:
-        logger.info(f"Processing URL {count+1}/{len(urls)}: {url}")
-        product_data = scraper.scrape_product(url)
-        
-        if product_data:
-            save_product(product_data)
-            count += 1
-            
-    logger.info(f"Finished. Total products processed: {count}")
+    if args.reparse:
+        started = time.monotonic()
+        with ProductWriter(batch_size=args.batch_size) as writer:
+            count = reparse(writer, args)
+        logger.info(f"Finished re-parse. Total products processed: {count} in {time.monotonic() - started:.1f}s")
+        return
+    
+    scraper = SepenaturalScraper(parser_backend=args.parser)
+    stats = {'skipped': 0, 'not_modified': 0, 'parsed': 0, 'failed': 0}
+    cache = {} if args.full else load_page_cache()
+
+    with CrawlState(args.worker_id, lease=args.lease) as state:
+        outstanding = state.prepare(retry_failed=args.retry_failed, max_attempts=args.max_attempts)
+        if outstanding:
+            logger.info(f"Resuming crawl: {outstanding} URLs not yet crawled")
+        elif args.retry_failed:
+            logger.info("No failed URLs left to retry. Exiting.")
+            return
+        else:
+            entries = scraper.get_sitemap_entries()
+            if not entries:
+                logger.warning("No URLs found. Exiting.")
+                return
+            if not state.seed(plan_crawl(entries, cache, stats, full=args.full)):
+                logger.info("Another scraper process started this crawl; joining it")
+
+        started = time.monotonic()
+        archive_dir = None if args.no_archive else args.archive_dir
+        count = 0
+        with ProductWriter(batch_size=args.batch_size) as writer:
+            if args.async_mode:
+                # Progress is checkpointed with each written batch.
+                count = crawl_async(scraper, writer, state, cache, stats, archive_dir, args)
+            else:
+                while True:
+                    shard = state.claim(args.shard_size)
+                    if not shard:
+                        break
+                    logger.info(f"Worker {args.worker_id} claimed a shard of {len(shard)} URLs")
+                    count += crawl_serial(scraper, writer, shard, cache, stats, archive_dir)
+                    # Checkpoint the shard before claiming the next one.
+                    writer.commit()
+        progress = state.summary()
+
+    logger.info(f"Finished. Total products processed: {count} in {time.monotonic() - started:.1f}s")
+    logger.info(
+        f"Crawl state: {progress.get('done', 0)} done, {progress.get('failed', 0)} failed, "
+        f"{progress.get('pending', 0) + progress.get('claimed', 0)} outstanding"
+    )
+    logger.info(
+        f"Incremental summary: {stats['skipped']} skipped (sitemap lastmod unchanged), "
+        f"{stats['not_modified']} not modified (304), {stats['parsed']} re-parsed, {stats['failed']} failed"
+    )
 
 if __name__ == "__main__":
     main()
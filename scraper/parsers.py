@@ -0,0 +1,650 @@
+import re
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from typing import Callable, List, Dict, Optional, Tuple
+
+from bs4 import BeautifulSoup, UnicodeDammit
+
+from ingredients import parse_ingredients
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the BeautifulSoup backend always works
+    etree = None
+
+# Parsing is kept free of network and database state so it can run in worker
+# processes (see pipeline.py).
+logger = logging.getLogger("SepenaturalScraper")
+
+# --- SELECTORS ---
+# Compiled once at import; both backends match against the same patterns.
+
+BREADCRUMB_CLASS_RE = re.compile(r'breadcrumb|path', re.I)
+INFO_CLASS_RE = re.compile(r'codes|attributes|info', re.I)
+DESCRIPTION_ID_RE = re.compile(r'description|details|tab', re.I)
+DESCRIPTION_CLASS_RE = re.compile(r'product-detail|product-feature|product-details|description', re.I)
+SPECS_TABLE_CLASS_RE = re.compile(r'specs|attributes', re.I)
+SPECS_LIST_CLASS_RE = re.compile(r'specs|features|attributes', re.I)
+PRODUCT_INFO_CLASS_RE = re.compile(r'product-info', re.I)
+
+USAGE_RE = re.compile('|'.join(['Kullanım Önerisi', 'Nasıl Kullanılır', 'Kullanımı']), re.I)
+WARNINGS_RE = re.compile('|'.join(['Uyarılar', 'Önemli Uyarılar', 'Dikkat']), re.I)
+STORAGE_RE = re.compile('|'.join(['Muhafaza', 'Saklama', 'Depolama']), re.I)
+INGREDIENT_MARKER_RE = re.compile(r'İçindekiler|Beher|Bileşen|İçerik', re.I)
+INGREDIENT_FALLBACK_RES = [re.compile(kw, re.I) for kw in ['İçindekiler', 'Beher', 'Bileşen']]
+
+SECTION_ANCHOR_TAGS = ['span', 'strong', 'h1', 'h2', 'h3', 'h4', 'b', 'div', 'p']
+SECTION_BODY_TAGS = ['div', 'p', 'span', 'ul', 'li']
+INGREDIENT_MARKER_TAGS = ['div', 'span', 'strong', 'h3', 'h4']
+INGREDIENT_BODY_TAGS = ['table', 'ul', 'div', 'p']
+SECTION_ANCHOR_SET = set(SECTION_ANCHOR_TAGS)
+SECTION_BODY_SET = set(SECTION_BODY_TAGS)
+INGREDIENT_MARKER_SET = set(INGREDIENT_MARKER_TAGS)
+INGREDIENT_BODY_SET = set(INGREDIENT_BODY_TAGS)
+
+PRICE_STRIP_RE = re.compile(r'[^\d.]')
+SKU_TEXT_RE = re.compile(r'(?:SKU|Kod|Stok):\s*([a-zA-Z\d-]+)', re.I)
+BARCODE_TEXT_RE = re.compile(r'(?:Barkod|EAN):\s*(\d+)', re.I)
+DOSE_RE = re.compile(r'\d+\s*(mg|g|ml|%)', re.I)
+
+HOME_LINKS = ['anasayfa', 'home']
+
+def normalize_newlines(content: bytes) -> bytes:
+    """
+    CRLF / CR -> LF, as browsers do before tokenising. Keeps both backends' text identical.
+    Stored description_html and section texts of CRLF pages therefore have LF line endings
+    (they kept CR before; pinned in tests/test_parsers.py).
+    """
+    return content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+def parse_price(raw: str) -> float:
+    try:
+        return float(PRICE_STRIP_RE.sub('', raw.replace(',', '.')))
+    except ValueError:
+        return 0.0
+
+def normalize_currency(currency: str) -> str:
+    return "TL" if currency == "TRY" else currency
+
+def codes_from_info(info_text: str, sku: str, barcode: str) -> Tuple[str, str]:
+    """Overrides SKU / barcode with values spelled out in an info block ("SKU: ...", "Barkod: ...")."""
+    sku_m = SKU_TEXT_RE.search(info_text)
+    bar_m = BARCODE_TEXT_RE.search(info_text)
+    if sku_m: sku = sku_m.group(1)
+    if bar_m: barcode = bar_m.group(1)
+    return sku, barcode
+
+def best_section(results: List[Tuple[int, str]]) -> str:
+    if results:
+        # Return the one with the most matches (the most detailed ingredient list)
+        results.sort(key=lambda x: x[0], reverse=True)
+        return results[0][1]
+    return ""
+
+# --- PARSER BACKENDS ---
+
+class ProductParser(ABC):
+    """
+    Base class for product page parser backends. `parse` turns a fetched page into
+    the product dict consumed by `save_product`, or returns None on failure.
+    """
+    name = ""
+
+    @abstractmethod
+    def parse(self, content: bytes, url: str) -> Optional[Dict]:
+        ...
+
+class SoupParser(ProductParser):
+    """Reference backend: BeautifulSoup with the pure Python `html.parser`."""
+    name = "soup"
+
+    def parse(self, content: bytes, url: str) -> Optional[Dict]:
+        try:
+            soup = BeautifulSoup(normalize_newlines(content), 'html.parser')
+
+            # Core Data
+            name_tag = soup.find('h1', {'class': 'product-name'}) or soup.find('h1')
+            name = name_tag.text.strip() if name_tag else "N/A"
+
+            # Categories (Breadcrumbs)
+            categories = []
+            breadcrumb_tags = soup.find_all(['div', 'nav', 'ul'], class_=BREADCRUMB_CLASS_RE)
+            for bt in breadcrumb_tags:
+                links = bt.find_all('a')
+                for link in links:
+                    cat_name = link.text.strip()
+                    if cat_name and cat_name.lower() not in HOME_LINKS:
+                        categories.append(cat_name)
+                if categories: break
+
+            # If no breadcrumb container, try any links in parent containers above H1
+            if not categories:
+                parent = name_tag.parent if name_tag else None
+                while parent and not categories:
+                    links = parent.find_all('a')
+                    for l in links:
+                        c_name = l.text.strip()
+                        if c_name and c_name.lower() not in HOME_LINKS and l.get('href', '').find('/kategori/') != -1:
+                            categories.append(c_name)
+                    parent = parent.parent
+
+            # Price (Primary Selector: Schema.org meta tags)
+            price_meta = soup.find('meta', {'itemprop': 'price'})
+            curr_meta = soup.find('meta', {'itemprop': 'priceCurrency'})
+
+            price = parse_price(price_meta.get('content', '0')) if price_meta else 0.0
+            currency = normalize_currency(curr_meta.get('content', 'TL') if curr_meta else "TL")
+
+            # SKU & Barcode
+            sku = "N/A"
+            barcode = "N/A"
+            sku_tag = (soup.find(None, {'itemprop': 'sku'}) or 
+                       soup.find(None, {'itemprop': 'barcode'}) or
+                       soup.find(class_='product-barcode'))
+
+            if sku_tag:
+                sku = sku_tag.text.strip()
+                barcode = sku
+
+            info_area = soup.find(['div', 'ul'], class_=INFO_CLASS_RE)
+            if info_area:
+                sku, barcode = codes_from_info(info_area.text, sku, barcode)
+
+            # --- Description Anchors ---
+            def get_section(pattern):
+                results = []
+                # Search for all elements matching any keyword
+                anchors = soup.find_all(SECTION_ANCHOR_TAGS, string=pattern)
+
+                for anchor in anchors:
+                    curr = anchor
+                    for _ in range(5):
+                        nxt = curr.find_next(SECTION_BODY_TAGS)
+                        if not nxt: break
+                        txt = nxt.get_text(strip=True)
+                        if len(txt) < 15: 
+                            curr = nxt
+                            continue
+                        # Use a score based on number of ingredient-like patterns
+                        score = len(DOSE_RE.findall(txt))
+                        if score > 0:
+                            results.append((score, txt))
+                        curr = nxt
+
+                return best_section(results)
+
+            # Improved Description Extraction
+            description_tag = (
+                soup.find('div', id=DESCRIPTION_ID_RE) or
+                soup.find('div', class_=DESCRIPTION_CLASS_RE) or
+                soup.find('div', id='product-details') or
+                soup.find('div', class_='product-description')
+            )
+
+            description_html = ""
+            if description_tag:
+                # Clean up if it's a huge container
+                description_html = str(description_tag)
+
+            data = {
+                "name": name, "sku": sku, "barcode": barcode, "price": price, 
+                "currency": currency, "url": url, "categories": categories,
+                "description_html": description_html,
+                "usage_text": get_section(USAGE_RE),
+                "warnings_text": get_section(WARNINGS_RE),
+                "storage_text": get_section(STORAGE_RE),
+                "attributes": {}, "ingredients": []
+            }
+
+            # --- Attribute Extraction (Technical Specs) ---
+            # Try IdeaSoft specific list pattern first
+            attr_rows = soup.find_all('div', class_='product-list-row')
+            if attr_rows:
+                for row in attr_rows:
+                    title_tag = row.find(['div', 'span'], class_='product-list-title')
+                    content_tag = row.find(['div', 'span'], class_='product-list-content')
+                    if title_tag and content_tag:
+                        key = title_tag.text.strip().replace(':', '')
+                        val = content_tag.text.strip()
+                        if key and val and len(key) < 50:
+                            data["attributes"][key] = val
+
+            # Fallback to general containers if nothing found
+            if not data["attributes"]:
+                attr_container = (soup.find('table', class_=SPECS_TABLE_CLASS_RE) or 
+                                  soup.find('ul', class_=SPECS_LIST_CLASS_RE) or
+                                  soup.find('div', class_=PRODUCT_INFO_CLASS_RE))
+
+                if attr_container:
+                    for row in attr_container.find_all(['tr', 'li', 'div'], recursive=False if attr_container.name != 'div' else True):
+                        cols = row.find_all(['td', 'span', 'strong'], recursive=True)
+                        if len(cols) >= 2:
+                            key = cols[0].text.strip().replace(':', '')
+                            val = cols[1].text.strip()
+                            if key and val and len(key) < 50:
+                                data["attributes"][key] = val
+                        elif ':' in row.text:
+                            parts = row.text.split(':', 1)
+                            key, val = parts[0].strip(), parts[1].strip()
+                            if key and val and len(key) < 50:
+                                data["attributes"][key] = val
+
+            # Ingredients Search (Broader)
+            ing_marker = soup.find(['div', 'span', 'strong', 'h3', 'h4'], string=INGREDIENT_MARKER_RE)
+            if ing_marker:
+                # Try finding a table or a list nearby
+                ing_container = ing_marker.find_next(['table', 'ul', 'div', 'p']) or ing_marker.parent
+                ing_text = ing_container.text.strip()
+                # If table, handle rows specially
+                if ing_container.name == 'table':
+                    ing_text = " | ".join([row.text.strip().replace('\n', ' ') for row in ing_container.find_all('tr')])
+
+                logger.info(f"Captured ingredient text for {sku}: {ing_text[:100]}...")
+                data["ingredients"] = parse_ingredients(ing_text)
+            else:
+                # Last resort: search for keywords anywhere and take the block
+                for kw_pattern in INGREDIENT_FALLBACK_RES:
+                    found = soup.find(string=kw_pattern)
+                    if found and len(found.parent.text) > 20:
+                        data["ingredients"] = parse_ingredients(found.parent.text)
+                        break
+
+            return data
+
+        except Exception as e:
+            logger.error(f"Error scraping {url}: {e}")
+            return None
+
+# Strings inside these tags are not part of an enclosing tag's text in BeautifulSoup.
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+# Serialised as <br/> etc. by BeautifulSoup.
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer',
+}
+# Whitespace-separated attributes that BeautifulSoup splits and re-joins with single spaces.
+MULTI_VALUED_ATTRS = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'}, 'link': {'rel', 'rev'}, 'area': {'rel'},
+    'td': {'headers'}, 'th': {'headers'}, 'form': {'accept-charset'},
+    'object': {'archive'}, 'icon': {'sizes'}, 'iframe': {'sandbox'}, 'output': {'for'},
+}
+
+_MULTI_VALUED_ANY = MULTI_VALUED_ATTRS['*']
+_MULTI_VALUED = {tag: _MULTI_VALUED_ANY | attrs for tag, attrs in MULTI_VALUED_ATTRS.items()}
+
+if etree is not None:
+    # Plain etree elements: lxml.html's custom element classes cost a Python lookup per node.
+    _HTML_PARSER = etree.HTMLParser()
+    _TEXT = etree.XPath(
+        "descendant::text()[not(ancestor::script or ancestor::style or ancestor::template"
+        " or ancestor::rt or ancestor::rp)]",
+        smart_strings=False,
+    )
+    _ALL_STRINGS = etree.XPath("descendant::text() | descendant::comment()")
+
+def _decode(content: bytes) -> str:
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return UnicodeDammit(content, is_html=True).unicode_markup
+
+def _classes(el) -> Optional[List[str]]:
+    value = el.get('class')
+    return None if value is None else value.split()
+
+def _class_matches(classes: Optional[List[str]], test: Callable[[str], object]) -> bool:
+    # Like BeautifulSoup's class_ filter: any single class, then the whole class string.
+    if classes is None:
+        return False
+    if any(test(c) for c in classes):
+        return True
+    return len(classes) != 1 and bool(test(' '.join(classes)))
+
+def _text(el) -> str:
+    """Equivalent of BeautifulSoup's Tag.text."""
+    if el.tag in NON_TEXT_TAGS:
+        return ''.join(el.itertext())
+    return ''.join(_TEXT(el))
+
+def _stripped_text(el) -> str:
+    """Equivalent of BeautifulSoup's Tag.get_text(strip=True)."""
+    return ''.join(s for s in (s.strip() for s in _TEXT(el)) if s)
+
+def _single_string(el) -> Optional[str]:
+    """Equivalent of BeautifulSoup's Tag.string: the only string inside `el`, through single children."""
+    while True:
+        if len(el) == 0:
+            return el.text
+        if len(el) > 1 or el.text:
+            return None
+        child = el[0]
+        if child.tail:
+            return None
+        if not isinstance(child.tag, str):
+            return child.text
+        el = child
+
+def _escape(text: str) -> str:
+    if '&' in text or '<' in text or '>' in text:
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return text
+
+def _quote_attr(value: str) -> str:
+    value = _escape(value)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+def _serialize(el, parts: List[str]):
+    tag = el.tag
+    if not isinstance(tag, str):
+        if tag is etree.Comment:
+            parts.append('<!--' + (el.text or '') + '-->')
+        elif tag is etree.ProcessingInstruction:
+            parts.append('<?' + el.target + (' ' + el.text if el.text else '') + '>')
+        return
+    attrs = ''
+    if el.attrib:
+        multi = _MULTI_VALUED.get(tag, _MULTI_VALUED_ANY)
+        for key, value in sorted(el.items()):
+            if key in multi:
+                value = ' '.join(value.split())
+            attrs += ' ' + key + '=' + _quote_attr(value)
+    if tag in VOID_TAGS:
+        parts.append('<' + tag + attrs + '/>')
+        return
+    parts.append('<' + tag + attrs + '>')
+    raw = tag in ('script', 'style')
+    if el.text:
+        parts.append(el.text if raw else _escape(el.text))
+    for child in el:
+        _serialize(child, parts)
+        if child.tail:
+            parts.append(child.tail if raw else _escape(child.tail))
+    parts.append('</' + tag + '>')
+
+def _outer_html(el) -> str:
+    """Serialises `el` the way str() does for a BeautifulSoup tag (minimal formatter)."""
+    parts: List[str] = []
+    _serialize(el, parts)
+    return ''.join(parts)
+
+class LxmlParser(ProductParser):
+    """
+    Fast backend on libxml2 (lxml). Every selector the soup backend uses is collected
+    in a single pass over the tree; "find next" lookups use document-order positions
+    instead of walking the tree again. Output matches SoupParser field for field
+    (check with bench_parsers.py), except where libxml2 repairs markup differently
+    than html.parser, e.g. block elements nested inside <p>.
+    """
+    name = "lxml"
+
+    def parse(self, content: bytes, url: str) -> Optional[Dict]:
+        try:
+            root = etree.fromstring(_decode(normalize_newlines(content)), _HTML_PARSER)
+            if root is None:
+                root = etree.fromstring('<html></html>', _HTML_PARSER)
+
+            order = []
+            position = {}
+            section_body_positions = []
+            ingredient_body_positions = []
+            h1_named = h1_first = None
+            price_meta = curr_meta = None
+            sku_tag = barcode_tag = barcode_class_tag = None
+            info_area = None
+            breadcrumb_tags = []
+            description_candidates = [None, None, None, None]
+            attr_rows = []
+            spec_candidates = [None, None, None]
+            section_anchors = {USAGE_RE: [], WARNINGS_RE: [], STORAGE_RE: []}
+            ing_marker = None
+
+            # --- Single traversal ---
+            for el in root.iter():
+                tag = el.tag
+                if not isinstance(tag, str):
+                    continue
+                i = len(order)
+                order.append(el)
+                position[el] = i
+                if tag in SECTION_BODY_SET:
+                    section_body_positions.append(i)
+                if tag in INGREDIENT_BODY_SET:
+                    ingredient_body_positions.append(i)
+
+                classes = _classes(el)
+                itemprop = el.get('itemprop')
+                if itemprop is not None:
+                    if itemprop == 'sku' and sku_tag is None:
+                        sku_tag = el
+                    elif itemprop == 'barcode' and barcode_tag is None:
+                        barcode_tag = el
+                    if tag == 'meta':
+                        if itemprop == 'price' and price_meta is None:
+                            price_meta = el
+                        elif itemprop == 'priceCurrency' and curr_meta is None:
+                            curr_meta = el
+                if tag == 'h1':
+                    if h1_first is None:
+                        h1_first = el
+                    if h1_named is None and _class_matches(classes, 'product-name'.__eq__):
+                        h1_named = el
+
+                if classes is not None:
+                    if barcode_class_tag is None and _class_matches(classes, 'product-barcode'.__eq__):
+                        barcode_class_tag = el
+                    if tag in ('div', 'nav', 'ul') and _class_matches(classes, BREADCRUMB_CLASS_RE.search):
+                        breadcrumb_tags.append(el)
+                    if tag in ('div', 'ul') and info_area is None and _class_matches(classes, INFO_CLASS_RE.search):
+                        info_area = el
+
+                if tag == 'div':
+                    el_id = el.get('id')
+                    if el_id is not None:
+                        if description_candidates[0] is None and DESCRIPTION_ID_RE.search(el_id):
+                            description_candidates[0] = el
+                        if description_candidates[2] is None and el_id == 'product-details':
+                            description_candidates[2] = el
+                    if classes is not None:
+                        if description_candidates[1] is None and _class_matches(classes, DESCRIPTION_CLASS_RE.search):
+                            description_candidates[1] = el
+                        if description_candidates[3] is None and _class_matches(classes, 'product-description'.__eq__):
+                            description_candidates[3] = el
+                        if _class_matches(classes, 'product-list-row'.__eq__):
+                            attr_rows.append(el)
+                        if spec_candidates[2] is None and _class_matches(classes, PRODUCT_INFO_CLASS_RE.search):
+                            spec_candidates[2] = el
+                elif tag == 'table':
+                    if spec_candidates[0] is None and _class_matches(classes, SPECS_TABLE_CLASS_RE.search):
+                        spec_candidates[0] = el
+                elif tag == 'ul':
+                    if spec_candidates[1] is None and _class_matches(classes, SPECS_LIST_CLASS_RE.search):
+                        spec_candidates[1] = el
+
+                if tag in SECTION_ANCHOR_SET or tag in INGREDIENT_MARKER_SET:
+                    string = _single_string(el)
+                    if string is not None:
+                        if tag in SECTION_ANCHOR_SET:
+                            for pattern, anchors in section_anchors.items():
+                                if pattern.search(string):
+                                    anchors.append(el)
+                        if ing_marker is None and tag in INGREDIENT_MARKER_SET and INGREDIENT_MARKER_RE.search(string):
+                            ing_marker = el
+
+            def find_next(el, positions):
+                k = bisect_right(positions, position[el])
+                return order[positions[k]] if k < len(positions) else None
+
+            # Core Data
+            name_tag = h1_named if h1_named is not None else h1_first
+            name = _text(name_tag).strip() if name_tag is not None else "N/A"
+
+            # Categories (Breadcrumbs)
+            categories = []
+            for bt in breadcrumb_tags:
+                for link in bt.iter('a'):
+                    cat_name = _text(link).strip()
+                    if cat_name and cat_name.lower() not in HOME_LINKS:
+                        categories.append(cat_name)
+                if categories: break
+
+            if not categories:
+                parent = name_tag.getparent() if name_tag is not None else None
+                while parent is not None and not categories:
+                    for l in parent.iter('a'):
+                        if l is parent:
+                            continue
+                        c_name = _text(l).strip()
+                        if c_name and c_name.lower() not in HOME_LINKS and l.get('href', '').find('/kategori/') != -1:
+                            categories.append(c_name)
+                    parent = parent.getparent()
+
+            # Price
+            price = parse_price(price_meta.get('content', '0')) if price_meta is not None else 0.0
+            currency = normalize_currency(curr_meta.get('content', 'TL') if curr_meta is not None else "TL")
+
+            # SKU & Barcode
+            sku = "N/A"
+            barcode = "N/A"
+            sku_tag = next((t for t in (sku_tag, barcode_tag, barcode_class_tag) if t is not None), None)
+            if sku_tag is not None:
+                sku = _text(sku_tag).strip()
+                barcode = sku
+            if info_area is not None:
+                sku, barcode = codes_from_info(_text(info_area), sku, barcode)
+
+            # --- Description Anchors ---
+            def get_section(pattern):
+                results = []
+                for anchor in section_anchors[pattern]:
+                    curr = anchor
+                    for _ in range(5):
+                        nxt = find_next(curr, section_body_positions)
+                        if nxt is None: break
+                        txt = _stripped_text(nxt)
+                        if len(txt) < 15:
+                            curr = nxt
+                            continue
+                        score = len(DOSE_RE.findall(txt))
+                        if score > 0:
+                            results.append((score, txt))
+                        curr = nxt
+                return best_section(results)
+
+            description_tag = next((t for t in description_candidates if t is not None), None)
+            description_html = _outer_html(description_tag) if description_tag is not None else ""
+
+            data = {
+                "name": name, "sku": sku, "barcode": barcode, "price": price,
+                "currency": currency, "url": url, "categories": categories,
+                "description_html": description_html,
+                "usage_text": get_section(USAGE_RE),
+                "warnings_text": get_section(WARNINGS_RE),
+                "storage_text": get_section(STORAGE_RE),
+                "attributes": {}, "ingredients": []
+            }
+
+            # --- Attribute Extraction (Technical Specs) ---
+            for row in attr_rows:
+                title_tag = content_tag = None
+                for child in row.iter('div', 'span'):
+                    if child is row:
+                        continue
+                    child_classes = _classes(child)
+                    if title_tag is None and _class_matches(child_classes, 'product-list-title'.__eq__):
+                        title_tag = child
+                    if content_tag is None and _class_matches(child_classes, 'product-list-content'.__eq__):
+                        content_tag = child
+                if title_tag is not None and content_tag is not None:
+                    key = _text(title_tag).strip().replace(':', '')
+                    val = _text(content_tag).strip()
+                    if key and val and len(key) < 50:
+                        data["attributes"][key] = val
+
+            if not data["attributes"]:
+                attr_container = next((t for t in spec_candidates if t is not None), None)
+                if attr_container is not None:
+                    if attr_container.tag == 'div':
+                        rows = [r for r in attr_container.iter('tr', 'li', 'div') if r is not attr_container]
+                    else:
+                        rows = [r for r in attr_container if r.tag in ('tr', 'li', 'div')]
+                    for row in rows:
+                        cols = [c for c in row.iter('td', 'span', 'strong') if c is not row]
+                        row_text = _text(row)
+                        if len(cols) >= 2:
+                            key = _text(cols[0]).strip().replace(':', '')
+                            val = _text(cols[1]).strip()
+                            if key and val and len(key) < 50:
+                                data["attributes"][key] = val
+                        elif ':' in row_text:
+                            parts = row_text.split(':', 1)
+                            key, val = parts[0].strip(), parts[1].strip()
+                            if key and val and len(key) < 50:
+                                data["attributes"][key] = val
+
+            # Ingredients Search (Broader)
+            if ing_marker is not None:
+                ing_container = find_next(ing_marker, ingredient_body_positions)
+                if ing_container is None:
+                    ing_container = ing_marker.getparent()
+                ing_text = _text(ing_container).strip()
+                if ing_container.tag == 'table':
+                    ing_text = " | ".join([_text(row).strip().replace('\n', ' ') for row in ing_container.iter('tr')])
+
+                logger.info(f"Captured ingredient text for {sku}: {ing_text[:100]}...")
+                data["ingredients"] = parse_ingredients(ing_text)
+            else:
+                strings = None
+                for kw_pattern in INGREDIENT_FALLBACK_RES:
+                    if strings is None:
+                        strings = _document_strings(root)
+                    found = next(((s, p) for s, p in strings if kw_pattern.search(s)), None)
+                    if found and len(_text(found[1])) > 20:
+                        data["ingredients"] = parse_ingredients(_text(found[1]))
+                        break
+
+            return data
+
+        except Exception as e:
+            logger.error(f"Error scraping {url}: {e}")
+            return None
+
+def _document_strings(root) -> List[Tuple[str, object]]:
+    """All strings (text, tails, comments) in document order with their parent element."""
+    strings = []
+    for node in _ALL_STRINGS(root):
+        if isinstance(node, str):
+            parent = node.getparent()
+            if node.is_tail:
+                parent = parent.getparent()
+            strings.append((str(node), parent))
+        else:
+            strings.append((node.text or '', node.getparent()))
+    return strings
+
+PARSER_BACKENDS = {SoupParser.name: SoupParser, LxmlParser.name: LxmlParser}
+# lxml builds a different tree than html.parser for some malformed markup (see tests/test_parsers.py),
+# so it stays opt-in (--parser lxml).
+DEFAULT_BACKEND = SoupParser.name
+
+_parsers: Dict[str, ProductParser] = {}
+
+def get_parser(backend: Optional[str] = None) -> ProductParser:
+    backend = backend or DEFAULT_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}'. Choose from: {', '.join(PARSER_BACKENDS)}")
+    if backend == LxmlParser.name and etree is None:
+        raise ValueError("The lxml parser backend requires the 'lxml' package")
+    if backend not in _parsers:
+        _parsers[backend] = PARSER_BACKENDS[backend]()
+    return _parsers[backend]
+
+def parse_product(content: bytes, url: str, backend: Optional[str] = None) -> Optional[Dict]:
+    """Extracts product data from an already fetched product page."""
+    return get_parser(backend).parse(content, url)
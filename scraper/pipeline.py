@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from crawler import AsyncCrawler, UrlSource
+
+logger = logging.getLogger("SepenaturalScraper")
+
+# Marks the end of a stage's input.
+_DONE = object()
+
+ParseFn = Callable[[bytes, str], Any]
+# write(url, status_code, parse_result, response_headers); parse_result is None for 304s and parse errors.
+WriteFn = Callable[[str, int, Any, Mapping[str, str]], None]
+
+
+class ScrapePipeline:
+    """
+    Three-stage scrape pipeline connected by bounded queues:
+
+    1. fetch:  AsyncCrawler workers download pages concurrently.
+    2. parse:  pages are parsed in a ProcessPoolExecutor across cores.
+    3. write:  a single writer thread persists results in arrival order.
+
+    When parsing or writing falls behind, the bounded queues fill up and the
+    upstream stage blocks on `put`, so memory stays bounded by `queue_size`.
+    `parse` must be a picklable module-level function.
+    """
+    def __init__(self, crawler: AsyncCrawler, parse: ParseFn, write: WriteFn,
+                 parse_workers: Optional[int] = None, queue_size: int = 64):
+        self.crawler = crawler
+        self.parse = parse
+        self.write = write
+        self.parse_workers = max(1, parse_workers or os.cpu_count() or 1)
+        self.queue_size = max(1, queue_size)
+
+    async def _parse_stage(self, pool: ProcessPoolExecutor, pages: asyncio.Queue, results: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await pages.get()
+            if item is _DONE:
+                return
+            url, status, content, headers = item
+            parsed = None
+            if status != 304:
+                try:
+                    parsed = await loop.run_in_executor(pool, self.parse, content, url)
+                except Exception as e:
+                    logger.error(f"Error parsing {url}: {e}")
+            await results.put((url, status, parsed, headers))
+
+    async def _write_stage(self, writer: ThreadPoolExecutor, results: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await results.get()
+            if item is _DONE:
+                return
+            try:
+                await loop.run_in_executor(writer, self.write, *item)
+            except Exception as e:
+                logger.error(f"Error writing {item[0]}: {e}")
+
+    async def run(self, urls: UrlSource,
+                  headers_for: Optional[Callable[[str], Optional[Dict[str, str]]]] = None) -> int:
+        """
+        Runs all stages to completion. Returns the number of pages fetched. `urls` may be an
+        async iterable that yields more work as the fetch stage runs low (see AsyncCrawler.crawl);
+        the parser processes and writer thread are shared by all of it.
+        """
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def enqueue(url, response):
+            await pages.put((url, response.status_code, response.content, response.headers))
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer") as writer:
+            parsers = [asyncio.create_task(self._parse_stage(pool, pages, results))
+                       for _ in range(self.parse_workers)]
+            write_task = asyncio.create_task(self._write_stage(writer, results))
+            try:
+                fetched = await self.crawler.crawl(urls, enqueue, headers_for=headers_for)
+                for _ in parsers:
+                    await pages.put(_DONE)
+                await asyncio.gather(*parsers)
+                await results.put(_DONE)
+                await write_task
+            except BaseException:
+                for task in parsers + [write_task]:
+                    task.cancel()
+                raise
+        return fetched
@@ -0,0 +1,70 @@
+import sqlite3
+import unicodedata
+from typing import Dict, Iterable
+
+# The ingestion service folds search queries with the same rules
+# (ingestion/src/connectors/sqlite.py); keep the two in sync.
+TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i', 'Ş': 's', 'ş': 's', 'Ğ': 'g', 'ğ': 'g',
+    'Ç': 'c', 'ç': 'c', 'Ö': 'o', 'ö': 'o', 'Ü': 'u', 'ü': 'u',
+})
+
+# Indexed text is folded in Python, so the tokenizer only has to split words.
+SEARCH_TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        name, sku, ingredients, body,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+'''
+
+def fold_turkish(text: str) -> str:
+    """
+    Lowercases and strips Turkish (and other) diacritics: "İÇİNDEKİLER", "içindekiler"
+    and "icindekiler" all fold to "icindekiler". Dotted and dotless i are both folded
+    to "i", because product text is not consistent about them.
+    """
+    text = text.translate(TURKISH_FOLD).lower()
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+def _join(parts: Iterable) -> str:
+    return fold_turkish(' '.join(part for part in parts if part))
+
+def index_product(cursor: sqlite3.Cursor, product_id: int, product_data: Dict):
+    """Replaces the search document of one product; the rowid is the product id."""
+    cursor.execute("DELETE FROM product_search WHERE rowid = ?", (product_id,))
+    cursor.execute(
+        "INSERT INTO product_search (rowid, name, sku, ingredients, body) VALUES (?, ?, ?, ?, ?)",
+        (
+            product_id,
+            _join([product_data.get('name')]),
+            _join([product_data.get('sku'), product_data.get('barcode')]),
+            _join(ing['name'] for ing in product_data.get('ingredients', [])),
+            _join(list(product_data.get('categories', [])) + [
+                product_data.get('usage_text'), product_data.get('warnings_text'), product_data.get('storage_text'),
+            ]),
+        ),
+    )
+
+def rebuild_search_index(conn: sqlite3.Connection) -> int:
+    """Re-indexes every product from the relational tables. Returns the number of products indexed."""
+    conn.row_factory = sqlite3.Row
+    try:
+        products = {row['id']: dict(row, categories=[], ingredients=[]) for row in conn.execute(
+            "SELECT id, name, sku, barcode, usage_text, warnings_text, storage_text FROM products"
+        )}
+        for row in conn.execute('''
+            SELECT pc.product_id, c.name FROM product_categories pc JOIN categories c ON c.id = pc.category_id
+        '''):
+            if row['product_id'] in products:
+                products[row['product_id']]['categories'].append(row['name'])
+        for row in conn.execute("SELECT product_id, ingredient_name AS name FROM product_ingredients ORDER BY id"):
+            if row['product_id'] in products:
+                products[row['product_id']]['ingredients'].append(dict(row))
+    finally:
+        conn.row_factory = None
+
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM product_search")
+    for product_id, product_data in products.items():
+        index_product(cursor, product_id, product_data)
+    return len(products)
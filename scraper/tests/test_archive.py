@@ -0,0 +1,68 @@
+import glob
+import gzip
+import logging
+import os
+
+import pytest
+
+import main
+from archive import HtmlArchive, reparse_archived
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PRODUCT_PAGES = sorted(glob.glob(os.path.join(FIXTURES, "product_*.html")))
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def corrupt_truncated(data):
+    return data[:len(data) // 2]
+
+
+def corrupt_not_gzip(data):
+    return b"<html>not compressed</html>"
+
+
+def corrupt_deflate_stream(data):
+    middle = len(data) // 2
+    return data[:middle] + bytes(b ^ 0xFF for b in data[middle:middle + 64]) + data[middle + 64:]
+
+
+@pytest.mark.parametrize("corrupt", [corrupt_truncated, corrupt_not_gzip, corrupt_deflate_stream])
+def test_corrupt_archive_file_is_skipped_and_logged(tmp_path, caplog, corrupt):
+    archive = HtmlArchive(str(tmp_path))
+    digest = archive.store(read(PRODUCT_PAGES[0]))
+    path = archive.path(digest)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(corrupt(data))
+
+    with caplog.at_level(logging.ERROR, logger="SepenaturalScraper"):
+        assert reparse_archived(str(tmp_path), None, "https://shop.test/urun/1", digest) is None
+
+    assert digest in caplog.text and "https://shop.test/urun/1" in caplog.text
+
+
+def test_missing_archive_file_is_skipped(tmp_path):
+    assert reparse_archived(str(tmp_path), None, "https://shop.test/urun/1", "ab" * 32) is None
+
+
+def test_reparse_continues_past_corrupt_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DB_NAME", str(tmp_path / "archive.db"))
+    main.init_db()
+    archive_dir = str(tmp_path / "html_archive")
+    archive = HtmlArchive(archive_dir)
+    with main.ProductWriter(main.DB_NAME) as writer:
+        for i, path in enumerate(PRODUCT_PAGES):
+            writer.record_archive(f"https://shop.test/urun/{i}", archive.store(read(path)))
+        broken = archive.store(b"<html>broken</html>")
+        writer.record_archive("https://shop.test/urun/broken", broken)
+    with open(archive.path(broken), "r+b") as f:
+        f.truncate(10)
+
+    args = main.parse_args(["--reparse", "--archive-dir", archive_dir, "--parse-workers", "2"])
+    with main.ProductWriter(main.DB_NAME) as writer:
+        assert main.reparse(writer, args) == len(PRODUCT_PAGES)
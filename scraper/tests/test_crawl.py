@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import glob
+import os
+
+import httpx
+import pytest
+
+import main
+import pipeline
+from crawler import AsyncCrawler
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PRODUCT_PAGES = sorted(glob.glob(os.path.join(FIXTURES, "product_*.html")))
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_async_url_source_is_advanced_as_workers_free_up():
+    handled = []
+    ahead = []
+
+    async def source():
+        for i in range(40):
+            ahead.append(i - len(handled))
+            yield f"https://shop.test/urun/{i}"
+
+    async def slow_handler(url, response):
+        await asyncio.sleep(0.001)
+        handled.append(url)
+
+    crawler = AsyncCrawler(concurrency=2, per_host=2, rate=10000, burst=10000,
+                           transport=httpx.MockTransport(lambda request: httpx.Response(200, text="ok")))
+
+    assert asyncio.run(crawler.crawl(source(), slow_handler)) == 40
+    # Two URLs being fetched, two queued and one waiting to be queued.
+    assert max(ahead) <= 5
+
+
+class CountingPool(pipeline.ProcessPoolExecutor):
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingPool.created += 1
+        super().__init__(*args, **kwargs)
+
+
+@pytest.fixture
+def crawl_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DB_NAME", str(tmp_path / "crawl.db"))
+    main.init_db()
+    return main.DB_NAME
+
+
+def test_async_crawl_runs_every_shard_through_one_pipeline(crawl_db, monkeypatch):
+    pages = {f"https://shop.test/urun/{os.path.basename(path)}": read(path) for path in PRODUCT_PAGES}
+    missing = "https://shop.test/urun/missing"
+
+    def site(request):
+        body = pages.get(str(request.url))
+        return httpx.Response(200, content=body) if body is not None else httpx.Response(404)
+
+    monkeypatch.setattr(main, "AsyncCrawler", functools.partial(AsyncCrawler, transport=httpx.MockTransport(site)))
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", CountingPool)
+    CountingPool.created = 0
+    args = main.parse_args(["--async", "--shard-size", "2", "--rate", "10000", "--burst", "10000",
+                            "--parse-workers", "1", "--retries", "0"])
+    stats = {'skipped': 0, 'not_modified': 0, 'parsed': 0, 'failed': 0}
+
+    with main.CrawlState("test-worker", db_name=crawl_db) as state:
+        state.seed([(url, None) for url in [*pages, missing]])
+        with main.ProductWriter(crawl_db, batch_size=1) as writer:
+            count = main.crawl_async(main.SepenaturalScraper(), writer, state, {}, stats, None, args)
+        summary = state.summary()
+
+    assert CountingPool.created == 1
+    assert count == len(pages) and stats['parsed'] == len(pages) and stats['failed'] == 1
+    assert summary == {"done": len(pages), "failed": 1}
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+import main
+
+# The products table as scraped before updated_at existed.
+LEGACY_PRODUCTS_SCHEMA = '''
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, sku TEXT UNIQUE, barcode TEXT, name TEXT NOT NULL, url TEXT UNIQUE,
+        price REAL, currency TEXT, description_html TEXT, usage_text TEXT, warnings_text TEXT, storage_text TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def product(sku):
+    return {
+        "sku": sku, "barcode": sku, "name": f"Product {sku}", "url": f"{main.BASE_URL}/urun/{sku.lower()}",
+        "price": 100.0, "currency": "TL", "description_html": "<p>Açıklama</p>", "usage_text": "", "warnings_text": "",
+        "storage_text": "", "categories": ["Kapsül Gıda Takviyeleri"], "attributes": {"Marka": "Sepe Natural"},
+        "ingredients": [],
+    }
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    db_name = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_name)
+    conn.execute(LEGACY_PRODUCTS_SCHEMA)
+    conn.execute("INSERT INTO products (sku, name, url, created_at) VALUES ('OLD-1', 'Old', '/old-1', '2025-01-01 10:00:00')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(main, "DB_NAME", db_name)
+    return db_name
+
+
+def updated_since(db_name, timestamp):
+    # The ingestion service's updated_since filter (connectors/sqlite.py).
+    with sqlite3.connect(db_name) as conn:
+        return [sku for sku, in conn.execute("SELECT sku FROM products WHERE updated_at >= ? ORDER BY id", (timestamp,))]
+
+
+def test_migration_backfills_updated_at(legacy_db):
+    main.init_db()
+
+    assert updated_since(legacy_db, "2025-01-01 10:00:00") == ["OLD-1"]
+
+
+def test_products_inserted_into_a_migrated_database_have_updated_at(legacy_db):
+    main.init_db()
+
+    with main.ProductWriter(legacy_db) as writer:
+        assert writer.save_product(product("NEW-1"))
+        assert writer.save_product(product("OLD-1"))  # conflict on sku: the update branch
+
+    assert updated_since(legacy_db, "2020-01-01 00:00:00") == ["OLD-1", "NEW-1"]
+    with sqlite3.connect(legacy_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM products WHERE updated_at IS NULL").fetchone()[0] == 0
+
+
+def test_init_db_backfills_rows_left_without_updated_at(legacy_db):
+    main.init_db()
+    with sqlite3.connect(legacy_db) as conn:
+        conn.execute("INSERT INTO products (sku, name, url, created_at) VALUES ('NULL-1', 'x', '/n', '2026-01-01 00:00:00')")
+
+    main.init_db()
+
+    assert updated_since(legacy_db, "2026-01-01 00:00:00") == ["NULL-1"]
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from ingredients import clear_cache, parse_ingredients, parse_ingredients_bulk
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ingredients_golden.json")
+
+with open(GOLDEN_FILE, encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def test_parse_ingredients_matches_golden_set():
+    # Twice: the second pass is served from the caches.
+    for _ in range(2):
+        mismatches = [case["raw"] for case in GOLDEN if parse_ingredients(case["raw"]) != case["expected"]]
+        assert mismatches == []
+
+
+def test_parse_ingredients_bulk_matches_golden_set():
+    raws = [case["raw"] for case in GOLDEN]
+    expected = [case["expected"] for case in GOLDEN]
+
+    assert parse_ingredients_bulk(raws) == expected
+    assert parse_ingredients_bulk(raws + raws) == expected + expected
+
+
+def test_mutating_results_does_not_change_cached_ones():
+    case = next(case for case in GOLDEN if case["expected"])
+    result = parse_ingredients(case["raw"])
+    result[0]["name"] = "changed"
+    result.append({"raw": "extra"})
+
+    assert parse_ingredients(case["raw"]) == case["expected"]
+
+    first, second = parse_ingredients_bulk([case["raw"], case["raw"]])
+    first[0]["amount"] = "0"
+    assert second == case["expected"]
+    assert parse_ingredients_bulk([case["raw"]]) == [case["expected"]]
+
+
+def test_empty_input():
+    assert parse_ingredients("") == []
+    assert parse_ingredients_bulk(["", None]) == [[], []]
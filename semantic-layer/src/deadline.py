@@ -0,0 +1,92 @@
+# Generated from shared/deadline.py by shared/sync.py; edit that file, not this copy.
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+# Remaining time budget of a request in milliseconds, as sent by the caller.
+DEADLINE_HEADER = "X-Deadline-Ms"
+# Set on 504s caused by the caller's own deadline, so they are not mistaken for an unhealthy service.
+DEADLINE_EXCEEDED_HEADER = "X-Deadline-Exceeded"
+
+
+class Deadline:
+    def __init__(self, expires_at: Optional[float]):
+        self.expires_at = expires_at  # time.monotonic() value; None once the response has started
+
+    def remaining(self) -> Optional[float]:
+        return None if self.expires_at is None else self.expires_at - time.monotonic()
+
+
+_deadline_var: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current request's deadline, or None if it has none."""
+    deadline = _deadline_var.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def deadline_exceeded() -> bool:
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def _deadline_exceeded_response() -> JSONResponse:
+    return JSONResponse({"detail": "Deadline exceeded"}, status_code=504, headers={DEADLINE_EXCEEDED_HEADER: "true"})
+
+
+class DeadlineMiddleware:
+    """
+    Enforces a per-request deadline: the smaller of `default_timeout` and the caller's
+    X-Deadline-Ms budget. Requests that arrive with no time left are rejected with 504 without
+    running; otherwise the handler is cancelled, and 504 returned, when the deadline passes
+    before the response has started. Sync endpoints cannot be interrupted in their worker
+    thread; they can check `remaining_time()`/`deadline_exceeded()` before expensive work.
+    The deadline covers producing a response, not streaming it.
+    """
+    def __init__(self, app, default_timeout: Optional[float] = None):
+        self.app = app
+        self.default_timeout = default_timeout
+
+    def _budget(self, scope) -> Optional[float]:
+        budgets = [self.default_timeout] if self.default_timeout else []
+        header = Headers(scope=scope).get(DEADLINE_HEADER)
+        if header:
+            try:
+                budgets.append(float(header) / 1000)
+            except ValueError:
+                pass
+        return min(budgets) if budgets else None
+
+    async def __call__(self, scope, receive, send):
+        budget = self._budget(scope) if scope["type"] == "http" else None
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        if budget <= 0:
+            await _deadline_exceeded_response()(scope, receive, send)
+            return
+
+        deadline = Deadline(time.monotonic() + budget)
+        token = _deadline_var.set(deadline)
+        started = False
+        with anyio.CancelScope(deadline=anyio.current_time() + budget) as cancel_scope:
+            async def send_and_lift_deadline(message):
+                nonlocal started
+                if message["type"] == "http.response.start":
+                    started = True
+                    cancel_scope.deadline = math.inf
+                    deadline.expires_at = None
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_and_lift_deadline)
+            finally:
+                _deadline_var.reset(token)
+        if cancel_scope.cancelled_caught and not started:
+            await _deadline_exceeded_response()(scope, receive, send)
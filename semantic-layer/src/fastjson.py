@@ -0,0 +1,31 @@
+# Generated from shared/fastjson.py by shared/sync.py; edit that file, not this copy.
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # output is the same, only slower
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, as JSONResponse renders it; via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(content: bytes) -> Any:
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `dumps`. Used as every app's default response class; endpoints
+    with large payloads of plain JSON types return it directly, which also skips FastAPI's
+    jsonable_encoder pass over the result.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
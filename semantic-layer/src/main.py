@@ -2,9 +2,14 @@ from fastapi import FastAPI, HTTPException, Header
 from typing import Dict, Any, Optional, List
 from .mappings.sap_mapper import SAPMapper
 from .mappings.sepenatural_mapper import SepenaturalMapper
-from .models.domain import ProductionOrder, Product
+from .models.domain import OrderMapping, ProductionOrder, Product
+from .fastjson import FastJSONResponse
+from .deadline import DeadlineMiddleware
+from .observability import ObservabilityMiddleware, metrics_response
 
-app = FastAPI(title="Antigravity Semantic Layer Service")
+app = FastAPI(title="Antigravity Semantic Layer Service", default_response_class=FastJSONResponse)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ObservabilityMiddleware)
 
 @app.get("/")
 def read_root():
@@ -14,6 +19,10 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 @app.post("/semantic/map/order", response_model=ProductionOrder)
 def map_order(raw_data: Dict[str, Any], x_tenant_id: Optional[str] = Header(None)):
     """
@@ -26,6 +35,23 @@ def map_order(raw_data: Dict[str, Any], x_tenant_id: Optional[str] = Header(None
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/semantic/map/orders", response_model=List[OrderMapping])
+def map_orders(raw_data: List[Dict[str, Any]], x_tenant_id: Optional[str] = Header(None)):
+    """
+    Maps a list of raw SAP Order dicts to Domain Models. One result per order, in request order;
+    an order that cannot be mapped gets an "error" instead of an "order".
+    """
+    tenant_id = x_tenant_id or "default_tenant"
+    results = []
+    for raw_order in raw_data:
+        result = OrderMapping(tenant_id=tenant_id, order_id=raw_order.get("Aufnr"))
+        try:
+            result.order = SAPMapper.map_production_order(raw_order)
+        except Exception as e:
+            result.error = f"Mapping Error: {str(e)}"
+        results.append(result)
+    return results
+
 @app.post("/semantic/map/sepenatural/products", response_model=List[Product])
 def map_sepenatural_products(raw_data: List[Dict[str, Any]], x_tenant_id: Optional[str] = Header(None)):
     """
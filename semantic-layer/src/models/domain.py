@@ -23,6 +23,15 @@ class ProductionOrder(BaseModel):
     is_process_order: bool = Field(False, description="True if Process Industry Order")
     has_shortage: bool = Field(False, description="Derived from status MSCP")
 
+class OrderMapping(BaseModel):
+    """
+    Result of mapping one order of a batch: the mapped `order`, or the `error` that prevented it.
+    """
+    tenant_id: str
+    order_id: Optional[str] = Field(None, description="SAP Order Number (AUFNR) of the raw order")
+    order: Optional[ProductionOrder] = None
+    error: Optional[str] = None
+
 class Material(BaseModel):
     """
     Canonical Domain Model for Material (MARC/MARA).
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the service as the `src` package, as uvicorn does (src.main:app).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+
+from src.main import app
+
+
+def post(path, payload, headers=None):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://semantic") as client:
+            return await client.post(path, json=payload, headers=headers)
+    return asyncio.run(send())
+
+
+def raw_order(aufnr, **overrides):
+    order = {"Aufnr": aufnr, "Auart": "PP01", "Matnr": "MAT-PUMP-001", "Werks": "1000", "Gamng": 10.0,
+             "Gmein": "PC", "Gltrp": "/Date(1739318400000)/", "SystemStatus": "REL MSCP"}
+    order.update(overrides)
+    return order
+
+
+def test_map_orders_reports_unmappable_orders_individually():
+    orders = [raw_order("1000001"), raw_order("1000002", Auart=None), raw_order("1000003", Gamng="ten")]
+    orders.append(raw_order("1000004", Auart="PI01"))
+
+    response = post("/semantic/map/orders", orders, headers={"X-Tenant-ID": "acme"})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["order_id"] for r in results] == ["1000001", "1000002", "1000003", "1000004"]
+    assert [r["error"] is None for r in results] == [True, False, False, True]
+    assert results[0]["order"]["has_shortage"] is True
+    assert results[3]["order"]["is_process_order"] is True
+    assert results[1]["order"] is None and results[1]["error"].startswith("Mapping Error")
+    assert all(r["tenant_id"] == "acme" for r in results)
+
+
+def test_map_order_still_rejects_an_unmappable_order():
+    response = post("/semantic/map/order", raw_order("1000002", Auart=None))
+    assert response.status_code == 400
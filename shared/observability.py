@@ -0,0 +1,144 @@
+import bisect
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Set for the duration of each HTTP request by ObservabilityMiddleware.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_timings_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timings", default=None)
+
+
+class Histogram:
+    """Minimal thread-safe Prometheus histogram with fixed label names."""
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Sequence[str], seconds: float):
+        key = tuple(str(label) for label in labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve HTTP requests, by route template.", ("method", "route", "status")
+)
+DOWNSTREAM_LATENCY = Histogram(
+    "downstream_request_duration_seconds", "Time until a downstream service answered.", ("service", "method", "status")
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def current_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+def record_timing(name: str, seconds: float):
+    """Adds an entry to the current request's Server-Timing header (no-op outside a request)."""
+    timings = _timings_var.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def observe_downstream(service: str, method: str, status, seconds: float):
+    """Records one call to another service in the histogram and in the current request's Server-Timing."""
+    DOWNSTREAM_LATENCY.observe((service, method, status), seconds)
+    record_timing(service, seconds)
+
+
+def render_metrics() -> str:
+    return "\n".join(REQUEST_LATENCY.render() + DOWNSTREAM_LATENCY.render()) + "\n"
+
+
+def metrics_response() -> Response:
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    # Repeated calls to the same service are summed into one entry.
+    durations: Dict[str, float] = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()]
+    return ", ".join(entries + [f"total;dur={total * 1000:.1f}"])
+
+
+class ObservabilityMiddleware:
+    """
+    ASGI middleware: times every request into REQUEST_LATENCY (labelled with the route template,
+    not the raw path), adds a Server-Timing header with the downstream/stage timings recorded
+    while handling it, and propagates X-Request-ID (taken from the request or generated).
+    For streamed responses, Server-Timing covers the time until the response started.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        timings: List[Tuple[str, float]] = []
+        id_token = request_id_var.set(request_id)
+        timings_token = _timings_var.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers[REQUEST_ID_HEADER] = request_id
+                headers.append("Server-Timing", _server_timing(timings, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                (scope["method"], getattr(route, "path", "unmatched"), status), time.perf_counter() - started
+            )
+            request_id_var.reset(id_token)
+            _timings_var.reset(timings_token)
@@ -0,0 +1,68 @@
+"""
+Generates the copies of the modules shared by every service.
+
+Each service is built from its own directory (see docker-compose.yml), so it cannot import
+modules from outside it. The shared modules live here instead and are copied into every
+service's `src` package. Edit them here, then run `python shared/sync.py`;
+`python shared/sync.py --check` (and shared/tests) fail while a copy is out of date.
+"""
+import argparse
+import os
+import sys
+from typing import List, Tuple
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SHARED_DIR)
+SERVICES = ("api", "ingestion", "semantic-layer", "brain")
+MODULES = ("observability.py", "deadline.py", "fastjson.py")
+
+
+def generated(module: str) -> str:
+    """The content of every copy of `module`."""
+    with open(os.path.join(SHARED_DIR, module), encoding="utf-8") as f:
+        source = f.read()
+    return f"# Generated from shared/{module} by shared/sync.py; edit that file, not this copy.\n" + source
+
+
+def copies() -> List[Tuple[str, str]]:
+    """(path, expected content) of every copy."""
+    return [
+        (os.path.join(ROOT, service, "src", module), generated(module))
+        for module in MODULES for service in SERVICES
+    ]
+
+
+def stale_copies() -> List[str]:
+    """Paths of the copies that are missing or differ from their source."""
+    stale = []
+    for path, content in copies():
+        try:
+            with open(path, encoding="utf-8") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != content:
+            stale.append(os.path.relpath(path, ROOT))
+    return stale
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Copy the shared modules into every service")
+    parser.add_argument("--check", action="store_true", help="Only report copies that are out of date")
+    args = parser.parse_args(argv)
+
+    stale = stale_copies()
+    if args.check:
+        for path in stale:
+            print(f"out of date: {path}")
+        return 1 if stale else 0
+    for path, content in copies():
+        if os.path.relpath(path, ROOT) in stale:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            print(f"updated {os.path.relpath(path, ROOT)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
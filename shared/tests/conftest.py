@@ -0,0 +1,5 @@
+import os
+import sys
+
+# sync.py is a script in the shared directory, imported here as a top-level module.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+import os
+import shutil
+
+import sync
+
+
+def test_service_copies_match_the_shared_modules():
+    assert sync.stale_copies() == [], "run `python shared/sync.py` after editing a shared module"
+
+
+def test_edited_and_missing_copies_are_reported(tmp_path, monkeypatch):
+    for path, _ in sync.copies():
+        target = tmp_path / os.path.relpath(path, sync.ROOT)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(path, target)
+    monkeypatch.setattr(sync, "ROOT", str(tmp_path))
+    module = sync.MODULES[0]
+    with open(tmp_path / "api" / "src" / module, "a", encoding="utf-8") as f:
+        f.write("# local change\n")
+    os.remove(tmp_path / "brain" / "src" / module)
+
+    assert sync.stale_copies() == [os.path.join("api", "src", module), os.path.join("brain", "src", module)]
+    assert sync.main(["--check"]) == 1
+
+    sync.main([])
+
+    assert sync.stale_copies() == []